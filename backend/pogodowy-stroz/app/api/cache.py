@@ -0,0 +1,102 @@
+# backend/app/api/cache.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+
+class AsyncTTLCache:
+    """
+    Asynchroniczny cache z TTL per wpis, limitem rozmiaru (LRU) i łączeniem zapytań.
+
+    Równoczesne chybienia dla tego samego klucza czekają na JEDNO zapytanie w locie
+    (coalescing). Błędy nie są cache'owane - dostają je wszyscy oczekujący.
+    Zwracane obiekty są współdzielone, więc wywołujący nie mogą ich modyfikować.
+
+    Degradacja (stale_ttl > 0): przeterminowany wpis jest trzymany jeszcze stale_ttl
+    sekund. Gdy odświeżenie się nie uda (stale_if(błąd)) albo trwa dłużej niż
+    stale_wait sekund, wywołujący dostaje starą wartość, a zapytanie w tle i tak
+    kończy się i odświeża cache.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.stale_served = 0
+
+    async def get_or_fetch(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]],
+                           stale_ttl: float = 0, stale_wait: float | None = None,
+                           stale_if: Callable[[BaseException], bool] | None = None) -> Any:
+        entry = self._entries.get(key)
+        stale = None
+        if entry is not None:
+            now = time.monotonic()
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if stale_ttl and entry[0] + stale_ttl > now: stale = entry
+            else: del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.create_task(self._fetch_and_store(key, ttl, fetch))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # shield: anulowanie jednego klienta nie przerywa zapytania, na które czekają inni
+        if stale is None: return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), stale_wait)
+        except asyncio.TimeoutError:
+            self.stale_served += 1
+            return stale[1]
+        except Exception as e:
+            if stale_if is not None and not stale_if(e): raise
+            self.stale_served += 1
+            return stale[1]
+
+    async def _fetch_and_store(self, key: str, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            self._store(key, ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: str, ttl: float, value: Any):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str | None = None):
+        if key is None: self._entries.clear()
+        else: self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "stale_served": self.stale_served,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _consume_exception(task: asyncio.Task):
+    # Gdy wszyscy oczekujący zostali anulowani, wyjątek nie trafi do logów jako "never retrieved"
+    if not task.cancelled(): task.exception()
@@ -1,41 +1,269 @@
 # app/api/imgw_client.py
+import asyncio
+import importlib.util
+import os
+import random
+import time
+from collections import deque
 import httpx
 from fastapi import HTTPException
+from app.api.cache import AsyncTTLCache
+from app.core.log import LOG_SAMPLE_RATE, get_logger
+from app.core.metrics import IMGW_ERRORS, IMGW_REQUEST_SECONDS
+
+log = get_logger("imgw")
+
+DEFAULT_BASE_URL = "https://danepubliczne.imgw.pl/api/data"
+
+# TTL (sekundy) per endpoint: SYNOP odświeżany co godzinę, hydro co 10-60 min
+CACHE_TTL = {
+    "synop": 600,
+    "hydro": 300,
+    "warnings": 300,
+}
+# Jak długo po wygaśnięciu trzymamy odpowiedź na wypadek awarii / spowolnienia IMGW
+STALE_TTL = float(os.getenv("IMGW_STALE_TTL", "3600"))
+# Ile czekamy na odświeżenie, gdy w cache jest stara odpowiedź (potem oddajemy starą)
+STALE_WAIT = float(os.getenv("IMGW_STALE_WAIT", "2"))
+
+# Osobne limity czasu: szybko wykrywamy martwe połączenie, dłużej czekamy na treść
+CONNECT_TIMEOUT = float(os.getenv("IMGW_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("IMGW_READ_TIMEOUT", "8"))
+POOL_TIMEOUT = float(os.getenv("IMGW_POOL_TIMEOUT", "2"))
+# Pula keep-alive: jeden host, więc kilka stałych połączeń wystarczy
+MAX_CONNECTIONS = int(os.getenv("IMGW_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("IMGW_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("IMGW_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 (multipleksacja na jednym połączeniu) wymaga pakietu h2: pip install "httpx[http2]"
+HTTP2 = os.getenv("IMGW_HTTP2", "0") in ("1", "true", "yes")
+
+# Ponowienia: tylko błędy sieci, 429 i 5xx; opóźnienie "full jitter" w budżecie czasu całego zapytania
+RETRIES = int(os.getenv("IMGW_RETRIES", "2"))
+RETRY_BASE_DELAY = 0.2
+REQUEST_BUDGET = float(os.getenv("IMGW_REQUEST_BUDGET", "10"))
+# Bezpiecznik: po BREAKER_THRESHOLD kolejnych porażkach przez BREAKER_COOLDOWN s nie pytamy IMGW wcale
+BREAKER_THRESHOLD = int(os.getenv("IMGW_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("IMGW_BREAKER_COOLDOWN", "30"))
+
+# Ile ostatnich czasów odpowiedzi trzymamy do percentyli w /stats
+LATENCY_WINDOW = 512
+
+
+class CircuitBreaker:
+    """closed -> (threshold porażek) -> open -> (cooldown) -> half_open: jedno zapytanie próbne."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None: return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed": return True
+        if state == "open" or self.trial_in_flight: return False
+        self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.threshold:
+            if self.opened_at is None or self.trial_in_flight: self.opened += 1
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """Zapytanie próbne skończyło się bez werdyktu (anulowanie) - następne może spróbować."""
+        self.trial_in_flight = False
+
+
+def _is_unavailable(e: BaseException) -> bool:
+    """Błąd, przy którym lepiej oddać starą odpowiedź niż żaden (nie 404 / 4xx)."""
+    return isinstance(e, HTTPException) and (e.status_code >= 500 or e.status_code == 429)
+
 
 class ImgwApiClient:
-    def __init__(self):
-        self.base_url = "https://danepubliczne.imgw.pl/api/data"
-        # Timeout zwiększony dla bezpieczeństwa
-        self.async_client = httpx.AsyncClient(timeout=20.0)
+    def __init__(self, base_url: str | None = None, ttl: dict | None = None, cache_size: int = 512):
+        # IMGW_BASE_URL pozwala podpiąć lokalny serwer-atrapę (testy, obciążenie)
+        self.base_url = (base_url or os.getenv("IMGW_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.ttl = {**CACHE_TTL, **(ttl or {})}
+        self.cache = AsyncTTLCache(maxsize=cache_size)
+        self.breaker = CircuitBreaker()
+        # Klient HTTP powstaje w start() (lifespan FastAPI) albo leniwie przy pierwszym zapytaniu
+        self.async_client: httpx.AsyncClient | None = None
+        self.http2 = HTTP2 and importlib.util.find_spec("h2") is not None
+        if HTTP2 and not self.http2: log.warning("http2_unavailable", reason="brak pakietu h2", fallback="HTTP/1.1")
+        self.in_flight = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"requests": 0, "failures": 0, "retries": 0, "short_circuited": 0}
+
+    async def start(self):
+        if self.async_client is None: self.async_client = self._build_client()
+
+    async def close(self):
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT, write=READ_TIMEOUT, pool=POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            http2=self.http2,
+        )
 
     async def get_synop_data(self, station_id: str):
         """Pobiera dane pogodowe (SYNOP) dla stacji."""
         url = f"{self.base_url}/synop/id/{station_id}"
-        return await self._get(url, "API Pogodowe")
+        return await self._cached_get("synop", url, "API Pogodowe")
 
     async def get_hydro_data(self, station_id: str):
         """Pobiera dane hydrologiczne dla stacji."""
         url = f"{self.base_url}/hydro/id/{station_id}"
-        return await self._get(url, "API Hydrologiczne")
+        return await self._cached_get("hydro", url, "API Hydrologiczne")
 
     async def get_meteo_warnings(self):
         """
-        Pobiera surową listę ostrzeżeń z https://danepubliczne.imgw.pl/api/data/meteo/worn.
+        Pobiera surową listę ostrzeżeń z {base_url}/meteo/worn.
         Filtrowanie odbywa się po stronie DataService.
         """
-        url = "https://danepubliczne.imgw.pl/api/data/meteo/worn" # Pełny URL dla pewności
-        return await self._get(url, "API Ostrzeżeń")
+        url = f"{self.base_url}/meteo/worn"
+        return await self._cached_get("warnings", url, "API Ostrzeżeń")
+
+    async def get_synop_feed(self):
+        """Pełny feed SYNOP (wszystkie stacje). Bez cache - trzyma go StationSnapshot."""
+        return await self._get(f"{self.base_url}/synop", "API Pogodowe")
+
+    async def get_hydro_feed(self):
+        """Pełny feed hydrologiczny (wszystkie stacje). Bez cache - trzyma go StationSnapshot."""
+        return await self._get(f"{self.base_url}/hydro/", "API Hydrologiczne")
+
+    async def get_cached_hydro_feed(self):
+        """
+        Pełny feed hydro przez cache TTL (łączenie zapytań, shield, stara odpowiedź przy awarii).
+        Dla zapytań użytkownika: wait_for wywołującego nie przerywa samego pobrania.
+        """
+        return await self._cached_get("hydro", f"{self.base_url}/hydro/", "API Hydrologiczne")
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    def stats(self) -> dict:
+        """Zapytania, ponowienia, bezpiecznik, czasy odpowiedzi i stan puli połączeń."""
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float):
+            if not latencies: return None
+            return round(latencies[min(int(p * len(latencies)), len(latencies) - 1)] * 1000, 1)
+
+        return {
+            **self.counters,
+            "in_flight": self.in_flight,
+            "breaker": {"state": self.breaker.state, "failures": self.breaker.failures, "opened": self.breaker.opened},
+            "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "pool": self._pool_stats(),
+            "http2": self.http2,
+        }
+
+    def _pool_stats(self) -> dict | None:
+        # httpx nie wystawia stanu puli publicznie - sięgamy do puli httpcore, jeśli jest
+        pool = getattr(getattr(self.async_client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None: return None
+        idle = sum(1 for c in connections if c.is_idle())
+        return {"connections": len(connections), "idle": idle, "active": len(connections) - idle,
+                "max_connections": MAX_CONNECTIONS, "max_keepalive": MAX_KEEPALIVE}
+
+    async def _cached_get(self, endpoint: str, url: str, service_name: str):
+        return await self.cache.get_or_fetch(
+            url, self.ttl[endpoint], lambda: self._get(url, service_name),
+            stale_ttl=STALE_TTL, stale_wait=STALE_WAIT, stale_if=_is_unavailable,
+        )
+
+    def _endpoint(self, url: str) -> str:
+        """Etykieta metryk: synop / synop_station / hydro / hydro_station / meteo (bez id stacji)."""
+        path = url[len(self.base_url):].strip("/")
+        kind = path.split("/", 1)[0]
+        return f"{kind}_station" if "/id/" in path else kind
 
     async def _get(self, url: str, service_name: str):
+        endpoint = self._endpoint(url)
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            IMGW_ERRORS.inc(endpoint, "breaker_open")
+            raise HTTPException(status_code=503, detail=f"Serwis {service_name} chwilowo niedostępny.")
+        # allow() w stanie half_open oddał nam jedyne zapytanie próbne
+        trial = self.breaker.trial_in_flight
+        try:
+            return await self._get_with_retries(url, endpoint, service_name)
+        finally:
+            # CancelledError (np. wait_for wywołującego) omija record_success / record_failure
+            if trial and self.breaker.trial_in_flight: self.breaker.release_trial()
+
+    async def _get_with_retries(self, url: str, endpoint: str, service_name: str):
+        if self.async_client is None: await self.start()
+        deadline = time.monotonic() + REQUEST_BUDGET
+        attempt = 0
+        while True:
+            try:
+                # Budżet ogranicza też trwającą próbę, nie tylko decyzję o kolejnej
+                data = await asyncio.wait_for(self._attempt(url, endpoint), max(deadline - time.monotonic(), 0))
+                self.breaker.record_success()
+                return data
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                IMGW_ERRORS.inc(endpoint, str(status))
+                if status == 404:
+                    # Brak stacji to poprawna odpowiedź serwisu, nie awaria
+                    self.breaker.record_success()
+                    raise HTTPException(status_code=404, detail=f"Brak danych dla {service_name}.")
+                error = HTTPException(status_code=status, detail=f"Błąd {service_name}: {e.response.text}")
+                retryable = status == 429 or status >= 500
+            except Exception as e:
+                # Pełne liczby są w metrykach; do logu trafia próbka (przy awarii IMGW byłaby to lawina)
+                IMGW_ERRORS.inc(endpoint, type(e).__name__)
+                log.warning("imgw_request_failed", url=url, attempt=attempt, error=repr(e), sample=LOG_SAMPLE_RATE)
+                error = HTTPException(status_code=503, detail=f"Serwis {service_name} niedostępny lub błąd sieci.")
+                retryable = True
+
+            delay = random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt)
+            if not retryable or attempt >= RETRIES or time.monotonic() + delay >= deadline:
+                self.counters["failures"] += 1
+                if retryable: self.breaker.record_failure()
+                else: self.breaker.record_success()
+                raise error
+            attempt += 1
+            self.counters["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, url: str, endpoint: str):
+        self.counters["requests"] += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        outcome = "error"
         try:
             response = await self.async_client.get(url)
+            outcome = str(response.status_code)
             response.raise_for_status()
             return response.json()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                raise HTTPException(status_code=404, detail=f"Brak danych dla {service_name}.")
-            raise HTTPException(status_code=e.response.status_code, detail=f"Błąd {service_name}: {e.response.text}")
-        except Exception as e:
-            # Logujemy błąd wewnętrznie
-            print(f"CRITICAL ERROR connecting to {url}: {e}")
-            raise HTTPException(status_code=503, detail=f"Serwis {service_name} niedostępny lub błąd sieci.")
+        finally:
+            self.in_flight -= 1
+            elapsed = time.perf_counter() - started
+            self.latencies.append(elapsed)
+            IMGW_REQUEST_SECONDS.observe(elapsed, endpoint, outcome)
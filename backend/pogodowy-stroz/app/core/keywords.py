@@ -0,0 +1,78 @@
+# backend/app/core/keywords.py
+"""
+Wielowzorcowe wyszukiwanie słów kluczowych (Aho-Corasick) dla nlp.py i data_service.py.
+
+Zamiast `any(kw in text for kw in keywords)` dla każdej listy osobno i pętli po
+słowach szukających rzek - jeden przebieg po tekście znajduje wszystkie wzorce
+naraz, niezależnie od ich liczby.
+"""
+from collections import deque
+from collections.abc import Iterable
+
+
+class KeywordMatcher:
+    """
+    Automat Aho-Corasick ze wzorcami pogrupowanymi w etykiety.
+
+    - grupy zwykłe: dopasowanie jako podciąg (jak `kw in text`),
+    - grupy z `whole_word`: tylko całe słowa rozdzielone białymi znakami
+      (jak `word in words` po `text.split()`).
+    scan(text) -> {etykieta: {dopasowane wzorce}} - tylko etykiety, które wystąpiły.
+    """
+
+    def __init__(self, groups: dict[str, Iterable[str]], whole_word: Iterable[str] = ()):
+        self.whole_word = frozenset(whole_word)
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[tuple[str, str]]] = [[]]
+
+        for label, patterns in groups.items():
+            for pattern in patterns:
+                # Wzorzec ze spacją nigdy nie będzie równy pojedynczemu słowu
+                if not pattern or (label in self.whole_word and any(c.isspace() for c in pattern)): continue
+                state = 0
+                for c in pattern:
+                    nxt = goto[state].get(c)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][c] = nxt
+                        goto.append({})
+                        out.append([])
+                    state = nxt
+                out[state].append((label, pattern))
+
+        # Linki "fail" (BFS) i pełna tablica przejść automatu deterministycznego:
+        # w scan() jeden słownik na znak, bez cofania się po linkach fail.
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [root] * len(goto)  # pozostałe stany nadpisuje BFS
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            f = fail[state]
+            delta[state] = dict(delta[f])
+            for c, nxt in goto[state].items():
+                # Stan fail dla nxt: przejście po c ze stanu fail[state] (albo z korzenia)
+                fail[nxt] = delta[f].get(c, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+                delta[state][c] = nxt
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+        self.states = len(goto)
+
+    def scan(self, text: str) -> dict[str, set[str]]:
+        delta, out, whole_word = self._delta, self._out, self.whole_word
+        found: dict[str, set[str]] = {}
+        state = 0
+        n = len(text)
+        for i, c in enumerate(text):
+            state = delta[state].get(c, 0)
+            if not out[state]: continue
+            for label, pattern in out[state]:
+                if label in whole_word:
+                    start = i - len(pattern) + 1
+                    if start > 0 and not text[start - 1].isspace(): continue
+                    if i + 1 < n and not text[i + 1].isspace(): continue
+                found.setdefault(label, set()).add(pattern)
+        return found
@@ -0,0 +1,102 @@
+# backend/app/core/log.py
+"""
+Logi strukturalne (jedna linia JSON na zdarzenie) zamiast print().
+
+Zapis na stderr robi osobny wątek (QueueHandler -> QueueListener), więc ścieżka
+zapytania tylko wkłada rekord do kolejki. Zdarzenia z gorącej ścieżki logujemy
+z próbkowaniem (sample=LOG_SAMPLE_RATE): pełne liczby i tak są w /metrics,
+a pominięte zdarzenia liczy pogodowy_log_sampled_out_total.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from app.core.metrics import LOG_SAMPLED_OUT
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json - jedna linia JSON na zdarzenie; text - czytelnie w konsoli (skrypty, praca lokalna)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Jaki ułamek zdarzeń próbkowanych trafia do logu (1 = wszystkie)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.05"))
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info: payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{k}={v}" for k, v in getattr(record, "fields", {}).items())
+        when = time.strftime("%H:%M:%S", time.localtime(record.created))
+        line = f"{when} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        return f"{line} {fields}" if fields else line
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Wkłada do kolejki sam rekord. Domyślne QueueHandler.prepare() formatuje go w wątku
+    wołającym i wkleja traceback do msg (znika exc_info, a "event" przestaje być nazwą
+    zdarzenia) - tu całe formatowanie robi wątek QueueListenera.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging():
+    """Konfiguruje logger 'pogodowy' raz na proces (także w workerach puli procesów)."""
+    global _listener
+    if _listener is not None: return
+    # stderr: stdout należy do wyników skryptów (bench_*.py czytają z niego ostatnią linię JSON)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger("pogodowy")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+class EventLogger:
+    """logger.info("zdarzenie", pole=wartość, sample=0.1) - pola trafiają do JSON jako klucze."""
+
+    def __init__(self, name: str):
+        setup_logging()
+        self._logger = logging.getLogger(f"pogodowy.{name}")
+
+    def log(self, level: int, event: str, sample: float | None = None, exc_info=None, **fields):
+        if not self._logger.isEnabledFor(level): return
+        if sample is not None and sample < 1:
+            if random.random() >= sample:
+                LOG_SAMPLED_OUT.inc(event)
+                return
+            fields["sample_rate"] = sample
+        self._logger.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+    def debug(self, event: str, **fields): self.log(logging.DEBUG, event, **fields)
+    def info(self, event: str, **fields): self.log(logging.INFO, event, **fields)
+    def warning(self, event: str, **fields): self.log(logging.WARNING, event, **fields)
+    def error(self, event: str, **fields): self.log(logging.ERROR, event, **fields)
+
+
+def get_logger(name: str) -> EventLogger:
+    return EventLogger(name)
@@ -0,0 +1,71 @@
+# backend/app/core/loop_monitor.py
+import asyncio
+import os
+import resource
+import time
+from collections import deque
+
+# Co ile sekund sprawdzamy pętlę i ile ostatnich pomiarów trzymamy (domyślnie 60 s historii)
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+LOOP_MONITOR_WINDOW = int(os.getenv("LOOP_MONITOR_WINDOW", "600"))
+
+
+def process_rss_bytes() -> int:
+    """Bieżące RSS procesu (/proc); poza Linuksem - szczytowe RSS z getrusage."""
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoopLagMonitor:
+    """
+    Opóźnienie pętli zdarzeń: zadanie w tle śpi `interval` sekund i mierzy, o ile
+    później się obudziło. Lag to czas, przez który pętla była zajęta czymś innym
+    (blokujący kod, długie wywołania CPU) - o tyle spóźnia się każde inne zadanie.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, window: int = LOOP_MONITOR_WINDOW):
+        self.interval = interval
+        self.samples: deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None: return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            self.samples.append(lag)
+            if lag > self.max_lag: self.max_lag = lag
+
+    def stats(self) -> dict:
+        samples = sorted(self.samples)
+
+        def percentile(p: float):
+            if not samples: return None
+            return round(samples[min(int(p * len(samples)), len(samples) - 1)] * 1000, 2)
+
+        return {
+            "interval_ms": self.interval * 1000,
+            "window_s": round(len(samples) * self.interval, 1),
+            "lag_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max": percentile(1.0)},
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "rss_mib": round(process_rss_bytes() / 2**20, 1),
+        }
+
+
+LOOP_MONITOR = LoopLagMonitor()
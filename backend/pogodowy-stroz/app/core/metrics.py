@@ -0,0 +1,147 @@
+# backend/app/core/metrics.py
+"""
+Metryki w formacie tekstowym Prometheusa (GET /metrics) bez zewnętrznych zależności.
+
+Na ścieżce zapytania tylko Counter.inc / Histogram.observe (słownik + bisect).
+Wszystko, co aplikacja i tak liczy w /stats (sesje, cache, bezpiecznik, lag pętli),
+zbierają collectory - wołane dopiero przy odczycie /metrics.
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Granice kubełków (sekundy): od mikrosekund (cache, formatowanie) do sekund (IMGW, geokoder)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names: tuple, values: tuple, extra: tuple = ()) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"): return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        for values, value in sorted(self.values.items()):
+            yield f"{self.name}{_labels_text(self.labels, values)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.buckets = tuple(buckets)
+        # wartości etykiet -> [liczniki kubełków (nieskumulowane) + nadmiar, suma, liczba]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None: series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> Iterable[str]:
+        for values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels_text(self.labels, values, (('le', _number(bound)),))} {cumulative}"
+            yield f"{self.name}_sum{_labels_text(self.labels, values)} {_number(total)}"
+            yield f"{self.name}_count{_labels_text(self.labels, values)} {count}"
+
+
+class Span:
+    """`with Span(histogram, *etykiety):` - czas bloku do histogramu (bez contextlib, taniej)."""
+
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram: Histogram, *label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+_METRICS: list = []
+# Collector zwraca [(nazwa, typ, opis, {etykiety}, wartość)] - liczony przy odczycie /metrics
+_COLLECTORS: list[Callable[[], Iterable[tuple]]] = []
+
+
+def counter(name: str, help_text: str, labels: tuple = ()) -> Counter:
+    metric = Counter(name, help_text, labels)
+    _METRICS.append(metric)
+    return metric
+
+
+def histogram(name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    metric = Histogram(name, help_text, labels, buckets)
+    _METRICS.append(metric)
+    return metric
+
+
+def register_collector(fn: Callable[[], Iterable[tuple]]):
+    _COLLECTORS.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    grouped: dict[str, tuple[str, str, list]] = {}
+    for collect in _COLLECTORS:
+        for name, kind, help_text, labels, value in collect():
+            if value is None: continue
+            grouped.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+    for name, (kind, help_text, samples) in grouped.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_labels_text(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- Metryki ścieżki zapytania ---
+
+STAGE_SECONDS = histogram(
+    "pogodowy_stage_seconds",
+    "Czas etapów obsługi wiadomości (sanitize, queue, nlp, validate, geocode, fetch, format).",
+    labels=("stage", "branch"),
+)
+CHAT_SECONDS = histogram("pogodowy_chat_seconds", "Czas całego zapytania /chat.", labels=("outcome",))
+IMGW_REQUEST_SECONDS = histogram(
+    "pogodowy_imgw_request_seconds", "Czas pojedynczych zapytań HTTP do IMGW.", labels=("endpoint", "outcome"),
+)
+IMGW_ERRORS = counter("pogodowy_imgw_errors_total", "Nieudane zapytania do IMGW wg rodzaju błędu.", labels=("endpoint", "kind"))
+LOG_SAMPLED_OUT = counter("pogodowy_log_sampled_out_total", "Zdarzenia logów pominięte przez próbkowanie.", labels=("event",))
+
+
+def span(stage: str, branch: str = "") -> Span:
+    return Span(STAGE_SECONDS, stage, branch)
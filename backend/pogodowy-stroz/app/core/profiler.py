@@ -0,0 +1,340 @@
+# backend/app/core/profiler.py
+"""
+Próbkujący profiler na żądanie - bez restartu workera.
+
+Wyłączony nie kosztuje nic: nie ma wątku ani hooków (sys.setprofile / settrace),
+a /chat sprawdza tylko jedną flagę. Włączony - osobny wątek co PROFILER_INTERVAL_MS
+zrzuca stosy wszystkich wątków procesu (sys._current_frames) i zlicza je jako
+"collapsed stacks" (flamegraph.pl, speedscope).
+
+Czas przypisujemy komponentom (data_service, nlp, conversation, reszta app
+kontra spaCy, httpx, geopy) wg najbardziej wewnętrznej ramki znanego komponentu.
+Workery UNDERSTANDING_EXECUTOR=process to osobne procesy - tych nie widzimy.
+"""
+import asyncio
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from fastapi import HTTPException
+from app.core.log import get_logger
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_MAX_DEPTH = int(os.getenv("PROFILER_MAX_DEPTH", "96"))
+# Tryb wolnych zapytań: ile ostatnich próbek trzymamy i ile ostatnich profili zapytań
+PROFILER_SLOW_BUFFER = int(os.getenv("PROFILER_SLOW_BUFFER", "20000"))
+PROFILER_SLOW_KEEP = int(os.getenv("PROFILER_SLOW_KEEP", "20"))
+PROFILER_SLOW_MAX_SECONDS = float(os.getenv("PROFILER_SLOW_MAX_SECONDS", "3600"))
+# kill -USR2 <pid> zapisuje profil PROFILE_SIGNAL_SECONDS s do PROFILE_DIR (puste = sygnał wyłączony)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_SIGNAL_SECONDS = float(os.getenv("PROFILE_SIGNAL_SECONDS", "10"))
+
+logger = get_logger("profiler")
+
+# Prefiks modułu -> komponent; pierwsze dopasowanie wygrywa (od najbardziej szczegółowych)
+COMPONENTS = (
+    ("app.services.data_service", "data_service"),
+    ("app.logic.nlp", "nlp"),
+    ("app.logic.conversation", "conversation"),
+    ("app", "app"),
+    ("spacy", "spacy"), ("thinc", "spacy"), ("srsly", "spacy"),
+    ("httpx", "httpx"), ("httpcore", "httpx"), ("h11", "httpx"),
+    ("geopy", "geopy"),
+    ("fastapi", "web"), ("starlette", "web"), ("uvicorn", "web"), ("pydantic", "web"),
+    ("asyncio", "asyncio"),
+)
+# Ramki-liście wątków, które na coś czekają (select pętli, pusta kolejka puli)
+IDLE_FRAMES = {
+    "selectors:EpollSelector.select", "selectors:KqueueSelector.select",
+    "selectors:PollSelector.select", "selectors:SelectSelector.select",
+    "threading:Condition.wait", "threading:Thread._wait_for_tstate_lock",
+    "concurrent.futures.thread:_worker", "logging.handlers:QueueListener.dequeue",
+}
+
+
+def component_of(label: str) -> str | None:
+    module = label.partition(":")[0]
+    for prefix, name in COMPONENTS:
+        if module == prefix or module.startswith(prefix + "."): return name
+    return None
+
+
+class Profile:
+    """Zliczone stosy (od korzenia: nazwa wątku, potem ramki 'moduł:funkcja')."""
+
+    def __init__(self, interval: float, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: dict[tuple, int] = {}
+        self.samples = 0
+        self.idle = 0
+        self.rounds = 0
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def add(self, stack: tuple, idle: bool = False):
+        if idle:
+            self.idle += 1
+            if not self.include_idle: return
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def weight(self) -> float:
+        """Czas jednej próbki (s): faktyczny odstęp między rundami, nie nominalny interwał."""
+        return self.duration / self.rounds if self.rounds else self.interval
+
+    def components(self) -> dict:
+        """Udział komponentów: self - najbardziej wewnętrzna znana ramka, total - obecność na stosie."""
+        own: dict[str, int] = {}
+        total: dict[str, int] = {}
+        for stack, n in self.stacks.items():
+            found = [component_of(label) for label in stack[1:]]
+            leaf = next((c for c in reversed(found) if c), "inne")
+            own[leaf] = own.get(leaf, 0) + n
+            for name in set(c for c in found if c) or {"inne"}: total[name] = total.get(name, 0) + n
+        share = lambda n: round(n / self.samples, 4) if self.samples else 0.0
+        return {
+            name: {"self": share(own.get(name, 0)), "total": share(total[name])}
+            for name in sorted(total, key=lambda c: -own.get(c, 0))
+        }
+
+    def summary(self, top: int = 15) -> dict:
+        leaves: dict[str, int] = {}
+        threads: dict[str, int] = {}
+        for stack, n in self.stacks.items():
+            leaves[stack[-1]] = leaves.get(stack[-1], 0) + n
+            threads[stack[0]] = threads.get(stack[0], 0) + n
+        return {
+            "started_at": round(self.started_at, 3),
+            "duration_s": round(self.duration, 3),
+            "interval_ms": round(self.weight() * 1000, 3),
+            "samples": self.samples,
+            "idle_samples": self.idle,
+            "components": self.components(),
+            "threads": dict(sorted(threads.items(), key=lambda kv: -kv[1])),
+            "top_frames": [{"frame": label, "samples": n} for label, n in sorted(leaves.items(), key=lambda kv: -kv[1])[:top]],
+        }
+
+    def collapsed(self) -> str:
+        """Format flamegraph.pl / speedscope: 'ramka;ramka;ramka liczba' w każdej linii."""
+        lines = [f"{';'.join(stack)} {n}" for stack, n in sorted(self.stacks.items(), key=lambda kv: -kv[1])]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str) -> dict:
+        """Plik speedscope (profil 'sampled'); jeden zbiorczy profil, wagi w sekundach."""
+        index: dict[str, int] = {}
+        frames, samples, weights = [], [], []
+        weight = self.weight()
+        for stack, n in self.stacks.items():
+            ids = []
+            for label in stack:
+                i = index.get(label)
+                if i is None:
+                    i = index[label] = len(frames)
+                    frames.append({"name": label})
+                ids.append(i)
+            samples.append(ids)
+            weights.append(n * weight)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+            }],
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "pogodowy-stroz",
+        }
+
+
+class SamplingProfiler:
+    """
+    Dwa tryby na wspólnym wątku próbkującym (działa tylko, gdy któryś jest aktywny):
+      - profile(seconds) - jednorazowy profil całego procesu (jeden naraz),
+      - arm_slow(threshold_ms, seconds) - bufor ostatnich próbek; /chat wolniejszy niż próg
+        dostaje własny profil: próbki pętli zdarzeń z jego zadania asyncio + próbki
+        pozostałych wątków (pula rozumienia) z czasu trwania zapytania.
+    """
+
+    def __init__(self, interval_ms: float = PROFILER_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        # Jedyne, co sprawdza /chat: None = tryb wolnych zapytań wyłączony
+        self.slow_ms: float | None = None
+        self.slow_profiles: deque[dict] = deque(maxlen=PROFILER_SLOW_KEEP)
+        self._slow_until = 0.0
+        self._slow_seq = 0
+        self._ring: deque[tuple] = deque(maxlen=PROFILER_SLOW_BUFFER)
+        self._capture: Profile | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._labels: dict = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    # --- Wątek próbkujący ---
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+
+    def _stack(self, frame, thread_name: str) -> tuple:
+        labels = [thread_name]
+        depth = 0
+        while frame is not None and depth < PROFILER_MAX_DEPTH:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None: label = self._labels[code] = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+            labels.append(label)
+            frame = frame.f_back
+            depth += 1
+        labels[1:] = labels[:0:-1]
+        return tuple(labels)
+
+    def _run(self):
+        me = threading.get_ident()
+        next_tick = time.perf_counter()
+        while True:
+            with self._lock:
+                capture = self._capture
+                if self.slow_ms is not None and time.monotonic() >= self._slow_until: self._disarm()
+                slow = self.slow_ms is not None
+                if capture is None and not slow:
+                    self._thread = None
+                    self._labels.clear()
+                    return
+            now = time.perf_counter()
+            # Pula workerów: ThreadPoolExecutor-0_3 -> ThreadPoolExecutor-0 (jeden korzeń na pulę)
+            names = {t.ident: re.sub(r"_\d+$", "", t.name) for t in threading.enumerate()}
+            task_id = None
+            if slow and self._loop is not None:
+                task = asyncio.current_task(self._loop)
+                task_id = id(task) if task is not None else None
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == me: continue
+                stack = self._stack(frame, names.get(ident, str(ident)))
+                idle = stack[-1] in IDLE_FRAMES
+                if capture is not None: capture.add(stack, idle)
+                if slow and not idle:
+                    on_loop = ident == self._loop_thread
+                    self._ring.append((now, on_loop, task_id if on_loop else None, stack))
+            del frames
+            if capture is not None: capture.rounds += 1
+            next_tick = max(next_tick + self.interval, time.perf_counter())
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    # --- Profil na żądanie ---
+
+    def _begin(self, include_idle: bool) -> Profile:
+        with self._lock:
+            if self._capture is not None: raise HTTPException(status_code=409, detail="Profilowanie już trwa.")
+            capture = self._capture = Profile(self.interval, include_idle)
+            self._ensure_thread()
+        return capture
+
+    def _end(self, capture: Profile) -> Profile:
+        with self._lock: self._capture = None
+        capture.duration = time.perf_counter() - capture.started
+        return capture
+
+    async def profile(self, seconds: float, include_idle: bool = False) -> Profile:
+        capture = self._begin(include_idle)
+        try:
+            await asyncio.sleep(min(seconds, PROFILER_MAX_SECONDS))
+        finally:
+            self._end(capture)
+        return capture
+
+    # --- Wolne zapytania ---
+
+    def arm_slow(self, threshold_ms: float, seconds: float) -> dict:
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread = threading.get_ident()
+            self._slow_until = time.monotonic() + seconds
+            self.slow_ms = threshold_ms
+            self._ensure_thread()
+        logger.info("slow_profiling_armed", threshold_ms=threshold_ms, seconds=seconds)
+        return self.slow_status()
+
+    def _disarm(self):
+        self.slow_ms = None
+        self._ring.clear()
+        self._loop = None
+
+    def disarm_slow(self) -> dict:
+        with self._lock: self._disarm()
+        return self.slow_status()
+
+    def slow_status(self) -> dict:
+        return {
+            "threshold_ms": self.slow_ms,
+            "remaining_s": round(max(self._slow_until - time.monotonic(), 0.0), 1) if self.slow_ms is not None else 0,
+            "buffered_samples": len(self._ring),
+            "profiles": [{k: v for k, v in item.items() if k != "profile"} for item in self.slow_profiles],
+        }
+
+    def request_finished(self, started: float, elapsed: float, label: str):
+        """Woła /chat (z własnego zadania asyncio), gdy slow_ms nie jest None."""
+        threshold = self.slow_ms
+        if threshold is None or elapsed * 1000 < threshold: return
+        task = asyncio.current_task()
+        task_id = id(task) if task is not None else None
+        capture = Profile(self.interval)
+        # list(deque) kopiuje bufor atomowo względem wątku próbkującego (GIL)
+        for at, on_loop, sample_task, stack in list(self._ring):
+            if at < started or (on_loop and sample_task != task_id): continue
+            capture.add(stack)
+        capture.started_at = time.time() - elapsed
+        capture.duration = elapsed
+        capture.rounds = max(int(elapsed / self.interval), 1)
+        self._slow_seq += 1
+        self.slow_profiles.append({
+            "id": self._slow_seq, "label": label, "at": round(capture.started_at, 3),
+            "elapsed_ms": round(elapsed * 1000, 1), "samples": capture.samples, "profile": capture,
+        })
+        logger.warning("slow_request_profiled", id=self._slow_seq,
+                       elapsed_ms=round(elapsed * 1000, 1), samples=capture.samples)
+
+    def slow_profile(self, profile_id: int) -> Profile | None:
+        return next((item["profile"] for item in self.slow_profiles if item["id"] == profile_id), None)
+
+    # --- Sygnał ---
+
+    def install_signal_handler(self):
+        """SIGUSR2 -> profil PROFILE_SIGNAL_SECONDS s zapisany do PROFILE_DIR (działa też przy zablokowanej pętli)."""
+        if not PROFILE_DIR or not hasattr(signal, "SIGUSR2"): return
+        try:
+            signal.signal(signal.SIGUSR2, lambda signum, frame: threading.Thread(
+                target=self._dump, name="profiler-dump", daemon=True).start())
+        except ValueError:
+            # signal.signal działa tylko z głównego wątku
+            logger.warning("profile_signal_unavailable")
+
+    def _dump(self):
+        try:
+            capture = self._begin(include_idle=False)
+        except HTTPException:
+            logger.warning("profile_signal_busy")
+            return
+        time.sleep(PROFILE_SIGNAL_SECONDS)
+        self._end(capture)
+        path = Path(PROFILE_DIR) / f"profile-{os.getpid()}-{int(capture.started_at)}.collapsed"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(capture.collapsed(), encoding="utf-8")
+        except OSError as e:
+            logger.error("profile_write_failed", path=str(path), error=str(e))
+            return
+        logger.info("profile_written", path=str(path), samples=capture.samples)
+
+
+PROFILER = SamplingProfiler()
@@ -0,0 +1,41 @@
+# backend/app/core/text.py
+"""
+Jedna normalizacja nazw dla backendu i skryptów offline (prepare_teryt.py,
+create_station_map.py, create_hydro_map.py). Klucze zapisywane offline i
+wyszukiwane online przechodzą przez tę samą funkcję, więc są identyczne.
+"""
+import unicodedata
+from functools import lru_cache
+
+COMMON_SUFFIXES = ['ach', 'ami', 'iem', 'owi', 'om', 'ie', 'iu', 'y', 'a', 'e', 'u', 'i']
+
+# Polskie litery po lower(). "ł" trzeba zamienić jawnie - NFD go nie rozkłada.
+_PL_TABLE = str.maketrans({'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n', 'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z'})
+
+
+def _strip_marks(text: str) -> str:
+    text = unicodedata.normalize("NFD", text)
+    return "".join(c for c in text if unicodedata.category(c) != "Mn")
+
+
+def normalize(text: str, stemming: bool = False) -> str:
+    """
+    Małe litery, bez polskich znaków i diakrytyków, bez skrajnych spacji.
+    Np. "Gdańsk" -> "gdansk", "Łódź" -> "lodz". Myślniki zostają ("bielsko-biala").
+    stemming=True dodatkowo obcina typową końcówkę fleksyjną ("krakowie" -> "krakow").
+    """
+    if not text: return ""
+    if stemming: return _normalize_stemmed(text)
+    text = text.lower().translate(_PL_TABLE)
+    # Szybka ścieżka: po tabeli zostało samo ASCII (prawie zawsze) - NFD nic by nie zmieniło
+    if not text.isascii(): text = _strip_marks(text)
+    return text.strip()
+
+
+@lru_cache(maxsize=16384)
+def _normalize_stemmed(text: str) -> str:
+    text = normalize(text)
+    if len(text) > 4:
+        for suffix in COMMON_SUFFIXES:
+            if text.endswith(suffix): return text[:-len(suffix)]
+    return text
@@ -1,6 +1,8 @@
 # backend/app/logic/conversation.py
-from transitions.extensions.asyncio import AsyncMachine
-from app.logic.nlp import recognize_intent, extract_entities, sanitize_text
+from app.core.metrics import span
+from app.logic.fsm import CompiledMachine
+from app.logic.nlp import sanitize_text
+from app.logic.understanding import UNDERSTANDING
 from app.services.data_service import DataService
 
 try:
@@ -8,46 +10,84 @@ try:
 except:
     GLOBAL_DATA_SERVICE = None
 
+STATES = ['initial', 'awaiting_location', 'processing']
+TRANSITIONS = [
+    {'trigger': 'trigger_intent', 'source': 'initial', 'dest': 'processing', 'conditions': '_has_valid_location', 'after': '_trigger_data_processing'},
+    {'trigger': 'trigger_intent', 'source': 'initial', 'dest': 'awaiting_location', 'conditions': '_is_location_missing', 'after': '_ask_for_location'},
+    {'trigger': 'trigger_location', 'source': 'awaiting_location', 'dest': 'processing', 'conditions': '_has_valid_location', 'after': '_trigger_data_processing'},
+    {'trigger': 'trigger_location', 'source': 'awaiting_location', 'dest': 'awaiting_location', 'conditions': '_is_location_missing', 'after': '_handle_invalid_location'},
+    {'trigger': 'data_processed', 'source': 'processing', 'dest': 'initial', 'after': '_format_response'},
+    {'trigger': 'error_occurred', 'source': 'processing', 'dest': 'initial', 'after': '_format_error'},
+]
+
 class ChatbotLogic:
+    # Sesja to mały rekord (__slots__); maszyna stanów jest jedna dla wszystkich (MACHINE niżej)
+    __slots__ = (
+        'session_id', 'data_service', 'state', 'current_intent', 'current_location_id', 'last_city_context',
+        'resolved_loc_name', 'retry_count', 'response', 'processing_result', 'processing_error',
+    )
+    max_retries = 2
+
     def __init__(self, session_id):
         self.session_id = session_id
         self.data_service = GLOBAL_DATA_SERVICE
+        self.state = 'initial'
         self.current_intent = None
         self.current_location_id = None
         self.last_city_context = None 
         self.resolved_loc_name = None 
         self.retry_count = 0 
-        self.max_retries = 2
         self.response = ""
         self.processing_result = None
+        self.processing_error = None
+
+    async def trigger(self, event: str) -> bool:
+        return await MACHINE.trigger(self, event)
+
+    def to_initial(self):
+        self.state = 'initial'
 
-        states = ['initial', 'awaiting_location', 'processing']
-        self.machine = AsyncMachine(model=self, states=states, initial='initial')
+    # Pola sesji, które przeżywają restart i mogą być obsłużone przez inny worker
+    SNAPSHOT_FIELDS = ('current_intent', 'current_location_id', 'last_city_context', 'resolved_loc_name', 'retry_count')
 
-        self.machine.add_transition('trigger_intent', 'initial', 'processing', conditions='_has_valid_location', after='_trigger_data_processing')
-        self.machine.add_transition('trigger_intent', 'initial', 'awaiting_location', conditions='_is_location_missing', after='_ask_for_location')
-        self.machine.add_transition('trigger_location', 'awaiting_location', 'processing', conditions='_has_valid_location', after='_trigger_data_processing')
-        self.machine.add_transition('trigger_location', 'awaiting_location', 'awaiting_location', conditions='_is_location_missing', after='_handle_invalid_location')
-        self.machine.add_transition('data_processed', 'processing', 'initial', after='_format_response')
-        self.machine.add_transition('error_occurred', 'processing', 'initial', after='_format_error')
+    def snapshot(self) -> dict:
+        """Serializowalny stan sesji (JSON): kontekst rozmowy + stan maszyny."""
+        data = {name: getattr(self, name) for name in self.SNAPSHOT_FIELDS}
+        data['state'] = self.state
+        return data
+
+    @classmethod
+    def restore(cls, session_id: str, data: dict) -> "ChatbotLogic":
+        logic = cls(session_id)
+        for name in cls.SNAPSHOT_FIELDS:
+            if name in data: setattr(logic, name, data[name])
+        if data.get('state') in STATES: logic.state = data['state']
+        return logic
 
     async def process_message(self, text: str) -> str:
         if not self.data_service: return "Błąd serwisu."
-        clean_text = sanitize_text(text)
-        entities = extract_entities(clean_text)
-        new_intent = recognize_intent(clean_text)
+        with span("sanitize"): clean_text = sanitize_text(text)
+        # NLP (jeden przebieg spaCy) + walidacja lokalizacji poza pętlą zdarzeń
+        understanding = await UNDERSTANDING.run(
+            clean_text,
+            self.current_intent,
+            self.last_city_context,
+            need_intent=self.state == 'initial',
+        )
+        if understanding.data_unavailable: return "Błąd serwisu."
+        entities = understanding.parsed.entities
+        new_intent = understanding.parsed.intent
         
         if new_intent: self.current_intent = new_intent
         
         if not self.current_intent and self.state == 'initial':
              return "W czym pomóc? (Pogoda, Hydro, Ostrzeżenia)"
 
-        # Walidacja
-        loc_id, final_intent, loc_name = self.data_service.validate_and_get_id(
-            entities, 
-            self.current_intent, 
+        # Walidacja (offline już policzona; tu ewentualny fallback przez Nominatim)
+        loc_id, final_intent, loc_name = await self.data_service.complete_resolution(
+            understanding.location,
+            entities,
             original_text=clean_text,
-            city_context=self.last_city_context 
         )
 
         if final_intent: self.current_intent = final_intent
@@ -102,4 +142,6 @@ class ChatbotLogic:
             await self.trigger('error_occurred')
 
     def _format_response(self): self.response = self.processing_result; self.current_location_id = None
-    def _format_error(self): self.response = "Wystąpił błąd systemu."; self.current_location_id = None
\ No newline at end of file
+    def _format_error(self): self.response = "Wystąpił błąd systemu."; self.current_location_id = None
+
+MACHINE = CompiledMachine(ChatbotLogic, STATES, TRANSITIONS, initial='initial')
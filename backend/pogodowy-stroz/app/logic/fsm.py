@@ -0,0 +1,54 @@
+# backend/app/logic/fsm.py
+import inspect
+
+
+class MachineError(Exception):
+    """Zdarzenie niedozwolone w bieżącym stanie (jak transitions.MachineError)."""
+
+
+class CompiledMachine:
+    """
+    Maszyna stanów kompilowana RAZ dla klasy modelu i współdzielona przez wszystkie sesje.
+
+    Zamiast AsyncMachine budowanej w każdej sesji (obiekty stanów, zdarzeń i metody
+    wyzwalaczy na modelu) - jedna tablica (zdarzenie, stan) -> przejścia. Model trzyma
+    tylko swój stan w atrybucie `state`. Semantyka jak w transitions: przejścia danego
+    zdarzenia są sprawdzane po kolei, pierwsze ze spełnionymi warunkami zmienia stan
+    i woła `after` (zagnieżdżone trigger() wykonują się od razu, bez kolejki).
+    """
+
+    def __init__(self, model_cls, states: list[str], transitions: list[dict], initial: str):
+        self.states = tuple(states)
+        self.initial = initial
+        table: dict[tuple[str, str], list] = {}
+        for t in transitions:
+            sources = t['source'] if isinstance(t['source'], (list, tuple)) else [t['source']]
+            conditions = t.get('conditions', ())
+            if isinstance(conditions, str): conditions = [conditions]
+            after = t.get('after')
+            compiled = (
+                t['dest'],
+                tuple(getattr(model_cls, name) for name in conditions),
+                getattr(model_cls, after) if after else None,
+                inspect.iscoroutinefunction(getattr(model_cls, after)) if after else False,
+            )
+            for source in sources:
+                if source not in self.states or t['dest'] not in self.states:
+                    raise ValueError(f"Nieznany stan w przejściu {t}")
+                table.setdefault((t['trigger'], source), []).append(compiled)
+        self.table = {key: tuple(options) for key, options in table.items()}
+        self.events = frozenset(event for event, _ in self.table)
+
+    async def trigger(self, model, event: str) -> bool:
+        options = self.table.get((event, model.state))
+        if options is None:
+            if event not in self.events: raise AttributeError(f"Nieznane zdarzenie '{event}'")
+            raise MachineError(f"Zdarzenie '{event}' niedozwolone w stanie '{model.state}'")
+        for dest, conditions, after, after_is_async in options:
+            if not all(condition(model) for condition in conditions): continue
+            model.state = dest
+            if after:
+                result = after(model)
+                if after_is_async: await result
+            return True
+        return False
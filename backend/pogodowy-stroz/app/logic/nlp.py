@@ -1,6 +1,15 @@
 # backend/app/logic/nlp.py
-import spacy
+import asyncio
+import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from app.core.keywords import KeywordMatcher
+from app.core.log import get_logger
+
+log = get_logger("nlp")
 
 # SŁOWA KLUCZOWE
 STRONG_KEYWORDS = {
@@ -8,12 +17,57 @@ STRONG_KEYWORDS = {
     'ostrzeżenia': ['ostrzeżenie', 'ostrzeżenia', 'alert', 'alerty', 'zagrożenie', 'burza', 'burze', 'grad', 'wiatry', 'rcb'],
     'hydro': ['woda', 'wody', 'rzeka', 'rzeki', 'stan', 'poziom', 'hydrologiczne', 'wyleje', 'powódź', 'wodowskaz', 'cm']
 }
+# Wszystkie słowa kluczowe w jednym automacie - jeden przebieg po tekście zamiast pętli po listach
+INTENT_MATCHER = KeywordMatcher(STRONG_KEYWORDS)
+
+MODEL_NAME = "pl_core_news_sm"
+# Używamy tylko lemma_, pos_ i ents (morphologizer / lemmatizer / ner) - parsera zależności nie ładujemy
+EXCLUDED_COMPONENTS = ["parser"]
+
+# Mikro-batching: 0 = wyłączony (każda wiadomość osobno, jak dotąd)
+NLP_BATCH_WINDOW_MS = float(os.getenv("NLP_BATCH_WINDOW_MS", "0"))
+NLP_MAX_BATCH = int(os.getenv("NLP_MAX_BATCH", "32"))
+
+# Model ładowany leniwie (pierwsze użycie) albo w tle przez warm_up() przy starcie aplikacji
+_nlp = None
+_nlp_state = "cold"  # cold -> loading -> ready | missing
+_nlp_load_s = None
+_nlp_lock = threading.Lock()
+
+def _load_model():
+    global _nlp, _nlp_state, _nlp_load_s
+    _nlp_state = "loading"
+    t0 = time.perf_counter()
+    try:
+        import spacy
+        _nlp = spacy.load(MODEL_NAME, exclude=EXCLUDED_COMPONENTS)
+        _nlp_state = "ready"
+    except (ImportError, OSError):
+        log.warning("spacy_model_missing", model=MODEL_NAME, mode="uproszczony")
+        _nlp = None
+        _nlp_state = "missing"
+    _nlp_load_s = time.perf_counter() - t0
+
+def get_nlp():
+    """Pipeline spaCy (albo None w trybie uproszczonym). Pierwsze wywołanie czeka na załadowanie."""
+    if _nlp_state not in ("ready", "missing"):
+        with _nlp_lock:
+            if _nlp_state not in ("ready", "missing"): _load_model()
+    return _nlp
 
-try:
-    nlp = spacy.load("pl_core_news_sm")
-except OSError:
-    print("WARNING: Model spaCy nie znaleziony. Działam w trybie uproszczonym.")
-    nlp = None
+def warm_up() -> threading.Thread:
+    """Ładuje model w wątku w tle - serwer odpowiada (np. na health check) od razu."""
+    thread = threading.Thread(target=get_nlp, name="spacy-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def nlp_status() -> dict:
+    return {
+        "state": _nlp_state,
+        "ready": _nlp_state in ("ready", "missing"),
+        "model": MODEL_NAME,
+        "load_s": round(_nlp_load_s, 3) if _nlp_load_s is not None else None,
+    }
 
 def sanitize_text(text: str) -> str:
     """
@@ -26,29 +80,29 @@ def sanitize_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def recognize_intent(text: str) -> str | None:
-    text_lower = text.lower()
-    
-    # 1. Proste słowa kluczowe
+@dataclass
+class ParsedMessage:
+    """Wynik JEDNEGO przebiegu pipeline'u spaCy: intencja, lematy i encje."""
+    intent: str | None
+    lemmas: set[str] = field(default_factory=set)
+    entities: dict[str, list[str]] = field(default_factory=lambda: {'placeName': [], 'geogName': []})
+
+def _keyword_intent(words) -> str | None:
     for intent, keywords in STRONG_KEYWORDS.items():
-        if any(kw in text_lower for kw in keywords):
+        if any(kw in words for kw in keywords):
             return intent
-    
-    # 2. Lematyzacja (jeśli spaCy działa)
-    if nlp:
-        doc = nlp(text_lower)
-        lemmas = {token.lemma_ for token in doc}
-        for intent, keywords in STRONG_KEYWORDS.items():
-            if any(kw in lemmas for kw in keywords):
-                return intent
     return None
 
-def extract_entities(text: str) -> dict[str, list[str]]:
+def _text_intent(text_lower: str) -> str | None:
+    """Jak _keyword_intent(text_lower) (podciągi w tekście), ale jednym przebiegiem automatu."""
+    found = INTENT_MATCHER.scan(text_lower)
+    if not found: return None
+    # Kolejność intencji jak w STRONG_KEYWORDS (pogoda > ostrzeżenia > hydro)
+    return next(intent for intent in STRONG_KEYWORDS if intent in found)
+
+def _entities_from_doc(doc) -> dict[str, list[str]]:
     locations = {'placeName': [], 'geogName': []}
-    if not nlp: return locations
-    
-    doc = nlp(text)
-    
+
     # 1. Standardowe encje
     for ent in doc.ents:
         clean_lemma = ent.lemma_.replace('.', '').strip()
@@ -66,4 +120,100 @@ def extract_entities(text: str) -> dict[str, list[str]]:
             if lemma not in existing:
                 locations['placeName'].append(lemma)
 
-    return locations
\ No newline at end of file
+    return locations
+
+def _parsed_from_doc(text: str, doc) -> ParsedMessage:
+    # 1. Proste słowa kluczowe (podciągi w tekście), 2. lematy z tego samego przebiegu
+    intent = _text_intent(text.lower())
+    if doc is None: return ParsedMessage(intent)
+    lemmas = {token.lemma_.lower() for token in doc}
+    if intent is None: intent = _keyword_intent(lemmas)
+    return ParsedMessage(intent, lemmas, _entities_from_doc(doc))
+
+def parse_message(text: str) -> ParsedMessage:
+    """Intencja + lematy + encje z jednego wywołania nlp(text)."""
+    nlp = get_nlp()
+    return _parsed_from_doc(text, nlp(text) if nlp else None)
+
+def parse_messages(texts: list[str]) -> list[ParsedMessage]:
+    """Wersja wsadowa: jeden nlp.pipe() dla wielu wiadomości."""
+    nlp = get_nlp()
+    if not nlp: return [_parsed_from_doc(t, None) for t in texts]
+    return [_parsed_from_doc(t, doc) for t, doc in zip(texts, nlp.pipe(texts, batch_size=max(len(texts), 1)))]
+
+def recognize_intent(text: str) -> str | None:
+    text_lower = text.lower()
+    
+    # 1. Proste słowa kluczowe
+    intent = _text_intent(text_lower)
+    if intent: return intent
+    
+    # 2. Lematyzacja (jeśli spaCy działa)
+    nlp = get_nlp()
+    if nlp:
+        doc = nlp(text_lower)
+        return _keyword_intent({token.lemma_ for token in doc})
+    return None
+
+def extract_entities(text: str) -> dict[str, list[str]]:
+    nlp = get_nlp()
+    if not nlp: return {'placeName': [], 'geogName': []}
+    return _entities_from_doc(nlp(text))
+
+# --- MIKRO-BATCHING ---
+
+class MessageBatcher:
+    """
+    Zbiera wiadomości napływające w oknie max_wait_ms (lub do max_batch sztuk)
+    i przepuszcza je przez jeden nlp.pipe(). spaCy działa w jednym dedykowanym
+    wątku, więc pętla zdarzeń nie jest blokowana, a pod obciążeniem kolejne
+    wiadomości same składają się w większe paczki.
+    """
+
+    def __init__(self, max_wait_ms: float = NLP_BATCH_WINDOW_MS, max_batch: int = NLP_MAX_BATCH):
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spacy")
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self.batches = 0
+        self.messages = 0
+
+    async def parse(self, text: str) -> ParsedMessage:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch: asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, parse_messages, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done(): future.set_exception(e)
+            return
+        self.batches += 1
+        self.messages += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done(): future.set_result(result)
+
+_batcher: MessageBatcher | None = None
+
+async def parse_message_async(text: str) -> ParsedMessage:
+    """parse_message dla handlera async; przy NLP_BATCH_WINDOW_MS > 0 przez mikro-batching."""
+    global _batcher
+    if NLP_BATCH_WINDOW_MS <= 0: return parse_message(text)
+    if _batcher is None: _batcher = MessageBatcher()
+    return await _batcher.parse(text)
@@ -0,0 +1,186 @@
+# backend/app/logic/understanding.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fastapi import HTTPException
+from app.core.metrics import STAGE_SECONDS
+from app.logic.nlp import ParsedMessage, get_nlp, parse_message, parse_message_async
+
+# inline  - jak dotąd, na pętli zdarzeń (z ewentualnym mikro-batchingiem NLP)
+# thread  - pula wątków (pętla wolna, spaCy w tym samym procesie)
+# process - pula procesów, spaCy i DataService w każdym workerze (prawdziwa równoległość CPU)
+UNDERSTANDING_EXECUTOR = os.getenv("UNDERSTANDING_EXECUTOR", "thread")
+UNDERSTANDING_WORKERS = int(os.getenv("UNDERSTANDING_WORKERS", "0")) or (
+    (os.cpu_count() or 2) if UNDERSTANDING_EXECUTOR == "process" else 1
+)
+# Ile wiadomości może czekać w kolejce ponad liczbę workerów, zanim zaczniemy odrzucać (503)
+UNDERSTANDING_MAX_QUEUE = int(os.getenv("UNDERSTANDING_MAX_QUEUE", "64"))
+
+
+@dataclass
+class Understanding:
+    """Wynik etapu rozumienia wiadomości: NLP + lokalizacja (offline)."""
+    parsed: ParsedMessage
+    location: tuple | None  # (loc_id, final_intent, loc_name) albo None, gdy walidacja pominięta
+    # Czasy etapów (s) liczone tam, gdzie etap się wykonał - także w workerze procesowym
+    timings: dict[str, float] = field(default_factory=dict)
+    # Worker nie ma danych (DataService nie wczytał się) - lokalizacji nie dało się sprawdzić
+    data_unavailable: bool = False
+
+    def observe(self, wait_s: float | None = None):
+        """Czasy etapów do histogramu pogodowy_stage_seconds (w procesie głównym)."""
+        if self.data_unavailable: branch = "unavailable"
+        else: branch = (self.location[1] or "") if self.location else "skipped"
+        if wait_s is not None: STAGE_SECONDS.observe(wait_s, "queue", "")
+        for stage, seconds in self.timings.items():
+            STAGE_SECONDS.observe(seconds, stage, branch if stage == "validate" else "")
+
+
+def _worker_data_service():
+    # Import w funkcji: w workerze procesowym moduł konwersacji (i DataService) ładuje się raz na proces
+    from app.logic.conversation import GLOBAL_DATA_SERVICE
+    return GLOBAL_DATA_SERVICE
+
+
+def _init_worker():
+    """Rozgrzewa spaCy i dane w workerze, zanim trafi do niego pierwsza wiadomość."""
+    get_nlp()
+    _worker_data_service()
+
+
+def _resolve(parsed: ParsedMessage, text: str, current_intent, city_context, need_intent: bool) -> tuple[tuple | None, bool]:
+    """(lokalizacja albo None, czy dane są dostępne w tym procesie)."""
+    intent = parsed.intent or current_intent
+    if not intent and need_intent: return None, True
+    data_service = _worker_data_service()
+    if not data_service: return None, False
+    return data_service.validate_and_get_id(parsed.entities, intent, original_text=text, city_context=city_context), True
+
+
+def understand(text: str, current_intent: str | None, city_context: str | None, need_intent: bool) -> Understanding:
+    """
+    Cała synchroniczna praca CPU dla jednej wiadomości: parse_message + validate_and_get_id.
+    need_intent=True: bez żadnej intencji nie szukamy lokalizacji (sesja w stanie 'initial').
+    """
+    t0 = time.perf_counter()
+    parsed = parse_message(text)
+    t1 = time.perf_counter()
+    location, available = _resolve(parsed, text, current_intent, city_context, need_intent)
+    return Understanding(parsed, location, {"nlp": t1 - t0, "validate": time.perf_counter() - t1}, not available)
+
+
+class UnderstandingStage:
+    """
+    Etap wykonawczy dla rozumienia wiadomości, poza pętlą zdarzeń.
+
+    Backpressure: najwyżej workers + max_queue wiadomości naraz; kolejne dostają
+    od razu 503 zamiast czekać w nieskończoność. Liczniki głębokości kolejki,
+    czasu oczekiwania i wykonania trafiają do /stats.
+    """
+
+    def __init__(self, mode: str = UNDERSTANDING_EXECUTOR, workers: int = UNDERSTANDING_WORKERS,
+                 max_queue: int = UNDERSTANDING_MAX_QUEUE):
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.recycled = 0
+        self.wait_s_total = 0.0
+        self.run_s_total = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn, nie fork: w chwili startu działają już wątki (warm_up spaCy, snapshot, geocoder)
+                # i fork mógłby skopiować trzymaną przez nie blokadę - worker zawisłby na get_nlp()
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="understanding",
+                                                    initializer=_init_worker)
+        return self._executor
+
+    def start(self):
+        """Tworzy pulę (i rozgrzewa workery) przy starcie aplikacji zamiast przy pierwszej wiadomości."""
+        if self.mode in ("thread", "process"): self._get_executor()
+
+    def recycle(self):
+        """
+        Po DataService.reload_data: workery procesowe mają własne DataService i cache lokalizacji,
+        więc wymieniamy pulę na nową (wczyta świeże dane). Zadania w toku kończą się w starej puli.
+        W trybach thread/inline dane są wspólne z procesem głównym - nic do zrobienia.
+        """
+        if self.mode != "process" or self._executor is None: return
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        self.recycled += 1
+        self.start()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, text: str, current_intent: str | None, city_context: str | None, need_intent: bool) -> Understanding:
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Serwer przeciążony, spróbuj ponownie za chwilę.")
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.mode == "inline":
+                t0 = time.perf_counter()
+                parsed = await parse_message_async(text)
+                t1 = time.perf_counter()
+                location, available = _resolve(parsed, text, current_intent, city_context, need_intent)
+                t2 = time.perf_counter()
+                result = Understanding(parsed, location, {"nlp": t1 - t0, "validate": t2 - t1}, not available)
+                self.run_s_total += t2 - t0
+                result.observe()
+            else:
+                submitted = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                result, wait_s, run_s = await loop.run_in_executor(
+                    self._get_executor(), _timed_understand, submitted, text, current_intent, city_context, need_intent
+                )
+                self.wait_s_total += wait_s
+                self.run_s_total += run_s
+                result.observe(wait_s)
+            self.completed += 1
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        done = self.completed or 1
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(self.in_flight - self.workers, 0),
+            "max_in_flight": self.max_in_flight,
+            "capacity": self.workers + self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "recycled": self.recycled,
+            "avg_wait_ms": round(self.wait_s_total / done * 1000, 3),
+            "avg_run_ms": round(self.run_s_total / done * 1000, 3),
+        }
+
+
+def _timed_understand(submitted: float, text, current_intent, city_context, need_intent):
+    # perf_counter jest monotoniczny w obrębie maszyny - czas oczekiwania liczymy też dla procesów (Linux)
+    started = time.perf_counter()
+    result = understand(text, current_intent, city_context, need_intent)
+    return result, max(started - submitted, 0.0), time.perf_counter() - started
+
+
+UNDERSTANDING = UnderstandingStage()
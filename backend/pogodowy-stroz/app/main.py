@@ -1,11 +1,52 @@
-from fastapi import FastAPI
+import os
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Literal
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core import metrics
+from app.core.loop_monitor import LOOP_MONITOR, process_rss_bytes
+from app.core.profiler import PROFILER, PROFILER_MAX_SECONDS, PROFILER_SLOW_MAX_SECONDS, Profile
 from app.core.models import ChatRequest, ChatResponse
-from app.services.state_manager import get_or_create_fsm
+from app.services.state_manager import SESSION_LOCKS, SESSIONS, get_or_create_fsm
+from app.logic.conversation import GLOBAL_DATA_SERVICE
+from app.logic.nlp import warm_up, nlp_status
+from app.logic.understanding import UNDERSTANDING
 # Opcjonalnie dla typowania:
 # from app.logic.conversation import ChatbotLogic 
 
-app = FastAPI(title="Pogodowy Stróż API")
+# Token endpointów /admin/* (nagłówek X-Admin-Token); pusty = endpointy administracyjne wyłączone (404)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model spaCy ładuje się w tle - serwer przyjmuje ruch od razu (patrz /ready)
+    warm_up()
+    # Opóźnienie pętli zdarzeń i RSS procesu w /stats
+    LOOP_MONITOR.start()
+    # kill -USR2 <pid> -> profil do PROFILE_DIR (tylko gdy PROFILE_DIR ustawione)
+    PROFILER.install_signal_handler()
+    # Pula workerów dla NLP + walidacji lokalizacji (każdy worker rozgrzewa własne spaCy)
+    UNDERSTANDING.start()
+    # Workery procesowe mają własne kopie danych - po reload_data pula jest wymieniana
+    if GLOBAL_DATA_SERVICE: GLOBAL_DATA_SERVICE.on_reload(UNDERSTANDING.recycle)
+    # Jedna pula połączeń keep-alive do IMGW na cały czas życia aplikacji
+    if GLOBAL_DATA_SERVICE: await GLOBAL_DATA_SERVICE.imgw_client.start()
+    # Migawka pełnych feedów IMGW odświeżana w tle przez cały czas życia aplikacji
+    if GLOBAL_DATA_SERVICE: GLOBAL_DATA_SERVICE.snapshot.start()
+    yield
+    if GLOBAL_DATA_SERVICE:
+        await GLOBAL_DATA_SERVICE.snapshot.stop()
+        await GLOBAL_DATA_SERVICE.imgw_client.close()
+        # Pula wątków i plik SQLite cache geokodera
+        if GLOBAL_DATA_SERVICE.geocoder: GLOBAL_DATA_SERVICE.geocoder.close()
+    UNDERSTANDING.shutdown()
+    await SESSIONS.close()
+    await LOOP_MONITOR.stop()
+
+app = FastAPI(title="Pogodowy Stróż API", lifespan=lifespan)
 
 # --- KONFIGURACJA CORS ---
 # Niezbędne, aby frontend (Vite) mógł rozmawiać z backendem
@@ -24,18 +65,141 @@ async def read_root_status():
     """Endpoint do sprawdzania statusu serwera."""
     return {"status": "Backend działa, CORS włączony"}
 
+@app.get("/ready")
+async def read_readiness():
+    """Gotowość workera: 200 gdy NLP jest rozgrzane (lub działa tryb uproszczony), inaczej 503."""
+    status = nlp_status()
+    return JSONResponse({"nlp": status}, status_code=200 if status["ready"] else 503)
+
+@app.get("/stats")
+async def read_stats():
+    """Liczniki: cache i klient IMGW, migawka feedów, źródła odpowiedzi, cache lokalizacji, dane offline, etap rozumienia, sesje, pętla zdarzeń."""
+    if not GLOBAL_DATA_SERVICE:
+        return {"imgw_cache": None, "imgw_client": None, "snapshot": None, "serving": None, "resolution_cache": None, "data": None,
+                "understanding": UNDERSTANDING.stats(), "sessions": SESSIONS.stats(), "session_locks": SESSION_LOCKS.stats(),
+                "event_loop": LOOP_MONITOR.stats()}
+    return {
+        "imgw_cache": GLOBAL_DATA_SERVICE.imgw_client.cache_stats(),
+        "imgw_client": GLOBAL_DATA_SERVICE.imgw_client.stats(),
+        "snapshot": GLOBAL_DATA_SERVICE.snapshot.stats(),
+        "serving": GLOBAL_DATA_SERVICE.serving_stats(),
+        "resolution_cache": GLOBAL_DATA_SERVICE.resolution_cache.stats(),
+        "data": GLOBAL_DATA_SERVICE.data_stats(),
+        "understanding": UNDERSTANDING.stats(),
+        "sessions": SESSIONS.stats(),
+        "session_locks": SESSION_LOCKS.stats(),
+        "event_loop": LOOP_MONITOR.stats(),
+    }
+
+@metrics.register_collector
+def _stats_metrics():
+    """Liczniki, które i tak trzymamy dla /stats, jako metryki (liczone dopiero przy odczycie /metrics)."""
+    sessions = SESSIONS.stats()
+    yield "pogodowy_sessions", "gauge", "Sesje w pamięci procesu.", {"backend": sessions["backend"]}, sessions.get("size", sessions.get("local_size"))
+    yield "pogodowy_sessions_created_total", "counter", "Utworzone sesje.", {}, sessions["created"]
+    locks = SESSION_LOCKS.stats()
+    yield "pogodowy_session_lock_pending", "gauge", "Wiadomości czekające na swoją sesję.", {}, locks["pending"]
+    for reason in ("rejected", "timeouts"):
+        yield "pogodowy_session_lock_rejections_total", "counter", "Odrzucenia 429 przez blokadę sesji.", {"reason": reason}, locks[reason]
+    understanding = UNDERSTANDING.stats()
+    yield "pogodowy_understanding_in_flight", "gauge", "Wiadomości w etapie rozumienia.", {}, understanding["in_flight"]
+    yield "pogodowy_understanding_rejected_total", "counter", "Odrzucenia 503 etapu rozumienia.", {}, understanding["rejected"]
+    loop = LOOP_MONITOR.stats()
+    for quantile, key in (("0.5", "p50"), ("0.99", "p99"), ("1", "max")):
+        lag = loop["lag_ms"][key]
+        yield ("pogodowy_event_loop_lag_seconds", "gauge", "Opóźnienie pętli zdarzeń w oknie monitora.",
+               {"quantile": quantile}, lag / 1000 if lag is not None else None)
+    yield "pogodowy_process_resident_memory_bytes", "gauge", "RSS procesu.", {}, process_rss_bytes()
+    if not GLOBAL_DATA_SERVICE: return
+
+    client = GLOBAL_DATA_SERVICE.imgw_client
+    cache = client.cache_stats()
+    for result in ("hits", "misses", "coalesced", "stale_served", "evictions"):
+        yield "pogodowy_imgw_cache_total", "counter", "Odczyty cache odpowiedzi IMGW.", {"result": result}, cache[result]
+    upstream = client.stats()
+    for kind in ("requests", "failures", "retries", "short_circuited"):
+        yield "pogodowy_imgw_client_total", "counter", "Zapytania klienta IMGW.", {"kind": kind}, upstream[kind]
+    yield "pogodowy_imgw_in_flight", "gauge", "Zapytania do IMGW w toku.", {}, upstream["in_flight"]
+    yield "pogodowy_imgw_breaker_open", "gauge", "1, gdy bezpiecznik IMGW nie jest zamknięty.", {}, int(upstream["breaker"]["state"] != "closed")
+    resolution = GLOBAL_DATA_SERVICE.resolution_cache.stats()
+    for result in ("hits", "negative_hits", "misses", "evictions"):
+        yield "pogodowy_resolution_cache_total", "counter", "Odczyty cache lokalizacji.", {"result": result}, resolution[result]
+    serving = GLOBAL_DATA_SERVICE.serving_stats()
+    for source in ("fresh", "stale", "live", "unavailable"):
+        yield "pogodowy_answers_total", "counter", "Odpowiedzi z danymi IMGW wg źródła.", {"source": source}, serving[source]
+    for feed in GLOBAL_DATA_SERVICE.snapshot.FEEDS:
+        yield "pogodowy_snapshot_age_seconds", "gauge", "Wiek migawki feedu IMGW.", {"feed": feed}, GLOBAL_DATA_SERVICE.snapshot.age(feed)
+
+@app.get("/metrics")
+async def read_metrics():
+    """Metryki w formacie tekstowym Prometheusa: histogramy etapów, IMGW, sesje, cache, lag pętli."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN: raise HTTPException(status_code=404, detail="Not Found")
+    # compare_digest na bajtach: dla str spoza ASCII rzuca TypeError (byłoby 500 zamiast 403)
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Brak uprawnień.")
+
+ProfileFormat = Literal["summary", "collapsed", "speedscope"]
+
+def profile_response(profile: Profile, fmt: ProfileFormat, name: str):
+    if fmt == "collapsed": return PlainTextResponse(profile.collapsed())
+    if fmt == "speedscope": return JSONResponse(profile.speedscope(name))
+    return JSONResponse(profile.summary())
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def run_profile(seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS), format: ProfileFormat = "summary",
+                      idle: bool = False):
+    """Próbkuje wszystkie wątki workera przez `seconds` s (summary / collapsed / speedscope)."""
+    profile = await PROFILER.profile(seconds, include_idle=idle)
+    return profile_response(profile, format, f"worker {os.getpid()}, {seconds:g} s")
+
+@app.post("/admin/profile/slow", dependencies=[Depends(require_admin)])
+async def arm_slow_profiling(threshold_ms: float = Query(500, gt=0), seconds: float = Query(300, gt=0, le=PROFILER_SLOW_MAX_SECONDS)):
+    """Przez `seconds` s każdy /chat wolniejszy niż `threshold_ms` zostawia własny profil."""
+    return PROFILER.arm_slow(threshold_ms, seconds)
+
+@app.delete("/admin/profile/slow", dependencies=[Depends(require_admin)])
+async def disarm_slow_profiling():
+    return PROFILER.disarm_slow()
+
+@app.get("/admin/profile/slow", dependencies=[Depends(require_admin)])
+async def list_slow_profiles():
+    return PROFILER.slow_status()
+
+@app.get("/admin/profile/slow/{profile_id}", dependencies=[Depends(require_admin)])
+async def read_slow_profile(profile_id: int, format: ProfileFormat = "summary"):
+    profile = PROFILER.slow_profile(profile_id)
+    if profile is None: raise HTTPException(status_code=404, detail="Nie ma takiego profilu.")
+    return profile_response(profile, format, f"wolne zapytanie #{profile_id}")
+
 @app.post("/chat", response_model=ChatResponse)
 async def handle_chat(request: ChatRequest):
     """
     Główny endpoint. Pobiera wiadomość i przekazuje ją do Maszyny Stanów (FSM).
     """
     
-    # 1. Pobranie maszyny stanów dla danej sesji
-    fsm = get_or_create_fsm(request.session_id)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        # Wiadomości jednej sesji po kolei (inne sesje równolegle); zbyt długa kolejka -> 429
+        async with SESSION_LOCKS.hold(request.session_id):
+            # 1. Pobranie maszyny stanów dla danej sesji (z magazynu sesji: pamięć / SQLite / Redis)
+            fsm = await get_or_create_fsm(request.session_id)
 
-    # 2. Przekazanie wiadomości do logiki konwersacyjnej
-    # To wywołanie uruchamia NLP i (jeśli trzeba) pobiera dane z IMGW
-    bot_response_text = await fsm.process_message(request.message)
+            # 2. Przekazanie wiadomości do logiki konwersacyjnej
+            # To wywołanie uruchamia NLP i (jeśli trzeba) pobiera dane z IMGW
+            bot_response_text = await fsm.process_message(request.message)
+            await SESSIONS.save(fsm)
+        outcome = "ok"
+    except HTTPException as e:
+        if e.status_code in (429, 503): outcome = "rejected"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.CHAT_SECONDS.observe(elapsed, outcome)
+        if PROFILER.slow_ms is not None: PROFILER.request_finished(started, elapsed, f"{request.session_id}: {request.message[:60]}")
 
     # 3. Zwrócenie odpowiedzi wygenerowanej przez bota
     return ChatResponse(
@@ -0,0 +1,258 @@
+# backend/app/services/bundle.py
+import hashlib
+import json
+import mmap
+import struct
+import zlib
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from app.core.log import get_logger
+from app.services.fuzzy_index import FuzzyIndex
+
+log = get_logger("bundle")
+
+# Format pliku data_bundle.bin (little-endian):
+#   MAGIC (4 B) | VERSION u32 | TOC_LEN u32 | TOC (JSON, UTF-8) | sekcje wyrównane do 8 B
+# TOC opisuje dla każdej tabeli (terc / simc / hydro) położenie tablic:
+#   keys / values    - tablice napisów: offsets u32[n+1] + blob UTF-8 (+ tablica haszująca u32)
+#   grams            - tablica napisów trigramów (z haszem) + postings_offsets u32 + postings u32
+#   lengths          - u16[n], długości kluczy w znakach
+#   buckets          - {długość: [offset, n]} w tablicy bucket_ids u32
+# Klucze są już znormalizowane i w kolejności słownika (FuzzyIndex zwraca identyczne wyniki).
+MAGIC = b"PSDB"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+_ALIGN = 8
+
+
+def fingerprint(paths: list[Path]) -> str:
+    """Skrót treści plików źródłowych - bundle z innym skrótem jest ignorowany."""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.name.encode("utf-8"))
+        digest.update(path.read_bytes() if path.exists() else b"")
+    return digest.hexdigest()
+
+
+# --- ZAPIS ---
+
+class _Writer:
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.size = 0
+
+    def add(self, data: bytes) -> int:
+        pad = (-self.size) % _ALIGN
+        if pad:
+            self.chunks.append(b"\0" * pad)
+            self.size += pad
+        offset = self.size
+        self.chunks.append(data)
+        self.size += len(data)
+        return offset
+
+    def add_array(self, typecode: str, values) -> int:
+        arr = array(typecode, values)
+        if arr.itemsize != struct.calcsize(typecode):
+            raise RuntimeError(f"Nieobsługiwany rozmiar typu {typecode}")
+        return self.add(arr.tobytes())
+
+    def add_strings(self, strings: list[str], hashed: bool) -> dict:
+        blobs = [s.encode("utf-8") for s in strings]
+        offsets = [0]
+        for b in blobs: offsets.append(offsets[-1] + len(b))
+        entry = {
+            "n": len(strings),
+            "offsets": self.add_array('I', offsets),
+            "blob": self.add(b"".join(blobs)),
+            "slots": None,
+            "m": 0,
+        }
+        if hashed:
+            m = 1
+            while m < 2 * max(len(strings), 1): m <<= 1
+            slots = array('I', bytes(4 * m))
+            for i, b in enumerate(blobs):
+                h = zlib.crc32(b) & (m - 1)
+                while slots[h]: h = (h + 1) & (m - 1)
+                slots[h] = i + 1
+            entry["slots"] = self.add(slots.tobytes())
+            entry["m"] = m
+        return entry
+
+
+def write_bundle(path: Path, tables: dict[str, dict], source_fingerprint: str):
+    """Zapisuje znormalizowane słowniki razem z gotowymi strukturami FuzzyIndex."""
+    writer = _Writer()
+    toc = {"fingerprint": source_fingerprint, "tables": {}}
+
+    for name, mapping in tables.items():
+        index = FuzzyIndex(mapping)
+        grams = list(index.postings.keys())
+        postings_offsets = [0]
+        for g in grams: postings_offsets.append(postings_offsets[-1] + len(index.postings[g]))
+
+        buckets = {}
+        bucket_ids = []
+        for length, ids in sorted(index.by_length.items()):
+            buckets[str(length)] = [len(bucket_ids), len(ids)]
+            bucket_ids.extend(ids)
+
+        toc["tables"][name] = {
+            "keys": writer.add_strings(index.keys, hashed=True),
+            "values": writer.add_strings([str(mapping[k]) for k in index.keys], hashed=False),
+            "grams": writer.add_strings(grams, hashed=True),
+            "postings_offsets": writer.add_array('I', postings_offsets),
+            "postings": writer.add_array('I', (i for g in grams for i in index.postings[g])),
+            "lengths": writer.add_array('H', index.lengths),
+            "bucket_ids": writer.add_array('I', bucket_ids),
+            "buckets": buckets,
+        }
+
+    toc_bytes = json.dumps(toc).encode("utf-8")
+    head = _HEADER.pack(MAGIC, VERSION, len(toc_bytes)) + toc_bytes
+    head += b"\0" * ((-len(head)) % _ALIGN)
+    with open(path, "wb") as f:
+        f.write(head)
+        for chunk in writer.chunks: f.write(chunk)
+    return len(head) + writer.size
+
+
+# --- ODCZYT (mmap) ---
+
+class StringTable:
+    """Tablica napisów czytana wprost z mmap: dostęp po indeksie i (opcjonalnie) wyszukiwanie haszem."""
+
+    def __init__(self, data: memoryview, entry: dict):
+        self.n = entry["n"]
+        self.offsets = data[entry["offsets"]:entry["offsets"] + 4 * (self.n + 1)].cast('I')
+        self.blob = data[entry["blob"]:entry["blob"] + self.offsets[self.n]]
+        self.m = entry["m"]
+        self.slots = data[entry["slots"]:entry["slots"] + 4 * self.m].cast('I') if self.m else None
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def find(self, s: str) -> int:
+        """Indeks napisu albo -1."""
+        if not self.m: raise TypeError("Tablica bez indeksu haszującego")
+        b = s.encode("utf-8")
+        mask = self.m - 1
+        h = zlib.crc32(b) & mask
+        while True:
+            v = self.slots[h]
+            if not v: return -1
+            i = v - 1
+            if self.blob[self.offsets[i]:self.offsets[i + 1]] == b: return i
+            h = (h + 1) & mask
+
+
+class _Positions:
+    """Zamiennik słownika klucz -> pozycja (FuzzyIndex.positions)."""
+
+    def __init__(self, table: StringTable):
+        self.table = table
+
+    def get(self, key: str, default=None):
+        i = self.table.find(key)
+        return default if i < 0 else i
+
+
+class _Postings:
+    """Zamiennik słownika trigram -> lista pozycji (FuzzyIndex.postings)."""
+
+    def __init__(self, grams: StringTable, offsets: memoryview, postings: memoryview):
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+
+    def get(self, gram: str, default=None):
+        g = self.grams.find(gram)
+        if g < 0: return default
+        return self.postings[self.offsets[g]:self.offsets[g + 1]]
+
+
+class BundleDict(Mapping):
+    """Słownik tylko do odczytu (znormalizowana nazwa -> id) oparty na mmap."""
+
+    def __init__(self, keys: StringTable, values: StringTable):
+        self._keys = keys
+        self._values = values
+
+    def __getitem__(self, key):
+        i = self._keys.find(key) if isinstance(key, str) else -1
+        if i < 0: raise KeyError(key)
+        return self._values[i]
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self._keys.find(key) >= 0
+
+    def __iter__(self):
+        return (self._keys[i] for i in range(len(self._keys)))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def items(self):
+        return ((self._keys[i], self._values[i]) for i in range(len(self._keys)))
+
+
+class DataBundle:
+    """Otwarty (zmapowany w pamięci) bundle. Strony są współdzielone między workerami."""
+
+    def __init__(self, path: Path):
+        # mmap trzyma własny deskryptor - plik można zamknąć od razu
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, toc_len = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"Nieobsługiwany format bundla: {path}")
+        toc_start = _HEADER.size
+        self.toc = json.loads(self._mmap[toc_start:toc_start + toc_len])
+        base = toc_start + toc_len
+        base += (-base) % _ALIGN
+        self._data = memoryview(self._mmap)[base:]
+        self.fingerprint = self.toc["fingerprint"]
+
+    @classmethod
+    def open_if_fresh(cls, path: Path, sources: list[Path]) -> "DataBundle | None":
+        """Bundle tylko jeśli istnieje i został zbudowany z aktualnych plików JSON."""
+        if not path.exists(): return None
+        bundle = cls(path)
+        if bundle.fingerprint != fingerprint(sources):
+            log.warning("bundle_stale", file=path.name, fallback="json")
+            bundle.close()
+            return None
+        return bundle
+
+    def close(self):
+        """Zwalnia mapowanie (tylko gdy nikt nie trzyma już widoków z fuzzy_index())."""
+        self._data.release()
+        self._mmap.close()
+
+    def fuzzy_index(self, name: str) -> FuzzyIndex:
+        entry = self.toc["tables"][name]
+        data = self._data
+        keys = StringTable(data, entry["keys"])
+        values = StringTable(data, entry["values"])
+        grams = StringTable(data, entry["grams"])
+        n_grams = entry["grams"]["n"]
+        offsets = data[entry["postings_offsets"]:entry["postings_offsets"] + 4 * (n_grams + 1)].cast('I')
+        postings = data[entry["postings"]:entry["postings"] + 4 * offsets[n_grams]].cast('I')
+        lengths = data[entry["lengths"]:entry["lengths"] + 2 * len(keys)].cast('H')
+        bucket_ids = data[entry["bucket_ids"]:entry["bucket_ids"] + 4 * len(keys)].cast('I')
+        by_length = {int(n): bucket_ids[start:start + count] for n, (start, count) in entry["buckets"].items()}
+
+        return FuzzyIndex.from_parts(
+            mapping=BundleDict(keys, values),
+            keys=keys,
+            positions=_Positions(keys),
+            lengths=lengths,
+            by_length=by_length,
+            postings=_Postings(grams, offsets, postings),
+        )
@@ -1,15 +1,29 @@
 # backend/app/services/data_service.py
+import asyncio
 import json
-import unicodedata
-import difflib
+import os
 from pathlib import Path
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
-from geopy.distance import geodesic
+from fastapi import HTTPException
 from app.api.imgw_client import ImgwApiClient
+from app.core.keywords import KeywordMatcher
+from app.core.log import get_logger
+from app.core.metrics import span
+from app.core.text import normalize
+from app.services.fuzzy_index import FuzzyIndex
+from app.services.bundle import DataBundle
+from app.services.geo_index import StationGeoIndex
+from app.services.gazetteer import Gazetteer
+from app.services.hydro_catalog import HydroCatalog
+from app.services.resolution_cache import MISS, ResolutionCache
+from app.services.geocoder import CachedGeocoder
+from app.services.snapshot import StationSnapshot
+from app.services.token_index import TokenIndex
+from app.services.warnings_index import WarningsIndex
 
 # --- KONFIGURACJA ---
 
+log = get_logger("data")
+
 # FIX #5: Stopwords - słowa ignorowane przy szukaniu nazw geograficznych
 STOPWORDS = {
     'dla', 'w', 'na', 'miasto', 'powiat', 'gmina', 'z', 'do', 'przy', 'koło',
@@ -17,13 +31,40 @@ STOPWORDS = {
     'stan', 'wody', 'woda', 'poziom', 'rzeka', 'rzeki', 'potok', 'jezioro'
 }
 
-COMMON_SUFFIXES = ['ach', 'ami', 'iem', 'owi', 'om', 'ie', 'iu', 'y', 'a', 'e', 'u', 'i']
-
 # FIX #3: Priorytety Intencji (Keywords)
 STRONG_WARNING_KEYWORDS = {'ostrzeżenie', 'ostrzeżenia', 'alert', 'alerty', 'zagrożenie', 'rcb'}
 STRONG_WEATHER_KEYWORDS = {'pogoda', 'pogodę', 'temperatura', 'wiatr', 'cisnienie', 'slonce', 'deszcz', 'prognoza', 'stopni', 'pada', 'zimno', 'cieplo'}
 STRONG_HYDRO_KEYWORDS = {'stan', 'wody', 'poziom', 'rzeka', 'wodowskaz', 'hydrologiczny', 'wylewa'}
 
+# Nominatim jako ostatnia deska ratunku, gdy nazwy nie ma w offline'owym gazetteerze
+GEOCODER_FALLBACK = os.getenv("GEOCODER_FALLBACK", "1") not in ("0", "false", "no")
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+GEOCODE_CACHE_PATH = Path(os.getenv("GEOCODE_CACHE_PATH", DATA_DIR / "geocode_cache.sqlite"))
+
+# Słowniki z kluczami normalizowanymi; scripts/build_data_bundle.py zapisuje je do
+# zmapowanego w pamięci data_bundle.bin (DATA_BUNDLE=0 wymusza ładowanie z JSON)
+NORMALIZED_SOURCES = {"terc": "terc_dict.json", "simc": "simc_dict.json", "hydro": "map_hydro.json"}
+DATA_BUNDLE = os.getenv("DATA_BUNDLE", str(DATA_DIR / "data_bundle.bin"))
+
+# Offline'owy gazetteer miejscowości (scripts/build_data_bundle.py z TERYT SIMC + współrzędnych PRNG)
+GAZETTEER_PATH = DATA_DIR / "gazetteer.bin"
+
+# Katalog rzeka -> wodowskazy (scripts/create_hydro_map.py); bez niego odtwarzany z map_hydro
+HYDRO_CATALOG_PATH = DATA_DIR / "hydro_catalog.json"
+# Ile wodowskazów pokazujemy w podsumowaniu rzeki i jak daleko szukamy najbliższego
+MAX_RIVER_GAUGES = 20
+MAX_GAUGE_DISTANCE_KM = 100
+
+# Stale-while-revalidate: do jakiego wieku (s) ostatnie dobre dane odpowiadają od razu,
+# a odświeżenie idzie w tle. Starsze - pytamy IMGW, ale najwyżej LIVE_FETCH_TIMEOUT s.
+MAX_STALENESS = {
+    'pogoda': float(os.getenv("MAX_STALENESS_SYNOP", "10800")),
+    'hydro': float(os.getenv("MAX_STALENESS_HYDRO", "10800")),
+    'ostrzeżenia': float(os.getenv("MAX_STALENESS_WARNINGS", "3600")),
+}
+LIVE_FETCH_TIMEOUT = float(os.getenv("LIVE_FETCH_TIMEOUT", "4"))
+UNAVAILABLE_MESSAGE = "⏳ Serwis IMGW chwilowo nie odpowiada, a nie mamy dość świeżych danych dla tego miejsca. Spróbuj za chwilę."
+
 # --- HELPERY ---
 
 def format_line(label: str, value: any, unit: str = "") -> str | None:
@@ -45,6 +86,25 @@ def format_hydro_status(code: str) -> str | None:
     mapping = {'0': 'Stan w normie', '1': '⚠️ Ostrzegawczy', '2': '🚨 ALARMOWY', '3': 'Susza'}
     return mapping.get(str(code))
 
+def observation_time(data) -> str | None:
+    """Czas pomiaru z rekordu SYNOP (data + godzina UTC) albo hydro."""
+    if isinstance(data, list): data = data[0] if data else None
+    if not data: return None
+    if data.get('data_pomiaru'):
+        hour = data.get('godzina_pomiaru')
+        return f"{data['data_pomiaru']} {str(hour).zfill(2)}:00 UTC" if hour not in (None, "") else data['data_pomiaru']
+    measured = data.get('stan_wody_data_pomiaru')
+    return str(measured)[:16] if measured else None
+
+def stale_note(data, age: float | None) -> str:
+    """Dopisek przy odpowiedzi z przeterminowanych danych (pusty, gdy dane są świeże)."""
+    if age is None: return ""
+    minutes = int(age // 60)
+    ago = f"{minutes} min" if minutes < 60 else f"{minutes // 60} h {minutes % 60} min"
+    when = observation_time(data)
+    measured = f", pomiar: {when}" if when else ""
+    return f"\n\n⏱️ Dane sprzed {ago}{measured} - aktualizujemy je w tle."
+
 def format_trend(trend_val) -> str | None:
     return str(trend_val) if trend_val else None
 
@@ -53,19 +113,40 @@ def format_trend(trend_val) -> str | None:
 class DataService:
     def __init__(self):
         self.imgw_client = ImgwApiClient()
-        self.geolocator = Nominatim(user_agent="pogodowy_stroz_bot_final_fix", timeout=5)
+        self.snapshot = StationSnapshot(self.imgw_client)
+        self.warnings_index = WarningsIndex(self.imgw_client)
+        self.geocoder = CachedGeocoder(GEOCODE_CACHE_PATH) if GEOCODER_FALLBACK else None
+        # Skąd przyszła odpowiedź: świeża migawka / stare dane / IMGW na żywo / brak
+        self.serving = {"fresh": 0, "stale": 0, "live": 0, "unavailable": 0}
+        self.resolution_cache = ResolutionCache()
+        # Wołane po reload_data (np. wymiana puli workerów, które trzymają własne kopie danych)
+        self._reload_hooks: list = []
         self._initialize_data()
 
+    def on_reload(self, callback):
+        self._reload_hooks.append(callback)
+
+    def reload_data(self):
+        """Ponownie wczytuje słowniki z dysku (np. po scripts/create_*); unieważnia cache lokalizacji."""
+        self._initialize_data()
+        for callback in self._reload_hooks: callback()
+
     def _initialize_data(self):
         try:
-            BASE_DIR = Path(__file__).resolve().parent.parent
-            DATA_DIR = BASE_DIR / "data"
-
-            self.terc_dict = self._load_and_normalize_keys(DATA_DIR / "terc_dict.json")
-            self.simc_dict = self._load_and_normalize_keys(DATA_DIR / "simc_dict.json")
+            # Indeksy wyszukiwania nazw (budowane raz, zamiast skanów przy każdym zapytaniu)
+            indexes = self._load_name_indexes()
+            self.terc_index, self.simc_index, self.hydro_index = indexes["terc"], indexes["simc"], indexes["hydro"]
+            self.terc_dict = self.terc_index.mapping
+            self.simc_dict = self.simc_index.mapping
+            self.map_hydro = self.hydro_index.mapping
             self.map_simc_to_synop = self._load_json(DATA_DIR / "map_simc_to_imgw_synop.json")
-            self.map_hydro = self._load_and_normalize_keys(DATA_DIR / "map_hydro.json")
             self.station_coords = self._load_json(DATA_DIR / "station_coords.json")
+            self.gazetteer = Gazetteer.load(GAZETTEER_PATH)
+            if not len(self.gazetteer):
+                # Bez gazetteera każda miejscowość spoza SYNOP idzie do Nominatim (albo nigdzie)
+                log.error("gazetteer_missing", path=str(GAZETTEER_PATH),
+                          hint="python scripts/build_data_bundle.py (wymaga raw_data/PRNG_MIEJSCOWOSCI.csv)",
+                          fallback="nominatim" if GEOCODER_FALLBACK else "brak")
             
             self.synop_names_map = {}
             for sid, data in self.station_coords.items():
@@ -77,118 +158,156 @@ class DataService:
             for key in self.map_hydro.keys():
                 parts = key.split()
                 if parts: self.known_rivers.add(parts[0])
-
-            print("SUKCES: Dane załadowane.")
+            self.routing_matcher = self._build_routing_matcher(self.known_rivers)
+            # słowo -> klucze map_hydro (przecięcia zamiast skanów wszystkich kluczy)
+            self.hydro_tokens = TokenIndex(self.map_hydro.keys())
+            if HYDRO_CATALOG_PATH.exists(): self.hydro_catalog = HydroCatalog.load(HYDRO_CATALOG_PATH)
+            else: self.hydro_catalog = HydroCatalog.from_hydro_map(self.map_hydro)
+            # Współrzędne wodowskazów ma tylko hydro_catalog.json - bez nich nie ma "najbliższego wodowskazu"
+            if not self.hydro_catalog.located():
+                log.warning("hydro_catalog_without_coords", path=str(HYDRO_CATALOG_PATH),
+                            hint="python scripts/create_hydro_map.py")
+
+            self.synop_index = FuzzyIndex(self.synop_names_map)
+
+            # Indeksy przestrzenne stacji (najbliższa / k najbliższych / w promieniu);
+            # wodowskazy - z tych, które mają współrzędne w hydro_catalog.json
+            self.synop_geo = StationGeoIndex(self.station_coords)
+            self.hydro_geo = StationGeoIndex(self.hydro_catalog.station_coords())
+
+            log.info("data_loaded", synop=len(self.station_coords), terc=len(self.terc_dict), hydro=len(self.map_hydro))
         except Exception as e:
-            print(f"BŁĄD DANYCH: {e}")
+            log.error("data_load_failed", error=str(e))
             self.station_coords = {}
             self.synop_names_map = {}
             self.terc_dict = {}
             self.map_hydro = {}
             self.known_rivers = set()
-
-    def _load_json(self, path):
+            self.routing_matcher = self._build_routing_matcher(self.known_rivers)
+            self.hydro_tokens = TokenIndex(())
+            self.hydro_catalog = HydroCatalog()
+            self.terc_index = self.simc_index = self.hydro_index = self.synop_index = FuzzyIndex({})
+            self.synop_geo = self.hydro_geo = StationGeoIndex({})
+            self.gazetteer = Gazetteer()
+        # Wyniki lokalizacji policzone na poprzednich słownikach są już nieaktualne
+        self.resolution_cache.clear()
+
+    def _load_name_indexes(self) -> dict[str, FuzzyIndex]:
+        sources = [DATA_DIR / f for f in NORMALIZED_SOURCES.values()]
+        bundle = None
+        if DATA_BUNDLE not in ("", "0"):
+            try:
+                bundle = DataBundle.open_if_fresh(Path(DATA_BUNDLE), sources)
+            except Exception as e:
+                log.warning("bundle_load_failed", error=str(e), fallback="json")
+        if bundle:
+            return {name: bundle.fuzzy_index(name) for name in NORMALIZED_SOURCES}
+        return {name: FuzzyIndex(self._load_and_normalize_keys(DATA_DIR / f)) for name, f in NORMALIZED_SOURCES.items()}
+
+    @staticmethod
+    def _build_routing_matcher(rivers) -> KeywordMatcher:
+        """Jeden automat: słowa kluczowe intencji (podciągi) + rzeki i stopwords (całe słowa)."""
+        return KeywordMatcher(
+            {
+                'ostrzeżenia': STRONG_WARNING_KEYWORDS,
+                'pogoda': STRONG_WEATHER_KEYWORDS,
+                'hydro': STRONG_HYDRO_KEYWORDS,
+                'river': rivers,
+                'stop': STOPWORDS,
+            },
+            whole_word=('river', 'stop'),
+        )
+
+    @staticmethod
+    def _load_json(path):
         if not path.exists(): return {}
         with open(path, 'r', encoding='utf-8') as f: return json.load(f)
 
-    def _load_and_normalize_keys(self, path):
-        data = self._load_json(path)
-        return {self._normalize(k): v for k, v in data.items()}
-
-    def _normalize(self, text: str, stemming=False):
-        if not text: return ""
-        text = text.lower()
-        replacements = {'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n', 'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z'}
-        for k, v in replacements.items(): text = text.replace(k, v)
-        text = unicodedata.normalize("NFD", text)
-        text = "".join(c for c in text if unicodedata.category(c) != "Mn")
-        text = text.strip()
-        if stemming and len(text) > 4:
-            for suffix in COMMON_SUFFIXES:
-                if text.endswith(suffix): return text[:-len(suffix)]
-        return text
-
-    def _smart_find_key(self, candidate: str, dictionary: dict, threshold=0.9) -> tuple[str, str] | None:
+    @classmethod
+    def _load_and_normalize_keys(cls, path):
+        data = cls._load_json(path)
+        return {cls._normalize(k): v for k, v in data.items()}
+
+    # Wspólna normalizacja z app.core.text (te same klucze co w skryptach offline)
+    _normalize = staticmethod(normalize)
+
+    def _smart_find_key(self, candidate: str, index: FuzzyIndex, threshold=0.9) -> tuple[str, str] | None:
         norm_cand = self._normalize(candidate)
-        
-        # FIX #5: EXACT MATCH FIRST (Kołobrzeg != Koło)
-        if norm_cand in dictionary: return dictionary[norm_cand], norm_cand
-        
-        # Substring check (Reverse lookup dla nazw wieloczłonowych)
-        for key in dictionary.keys():
-            if key == norm_cand: return dictionary[key], key
-            # Sprawdzamy czy kandydat zawiera się w kluczu LUB klucz w kandydacie
-            if len(key) > 3 and len(norm_cand) > 3:
-                if key in norm_cand or norm_cand in key:
-                     return dictionary[key], key
-                 
-        matches = difflib.get_close_matches(norm_cand, dictionary.keys(), n=1, cutoff=threshold)
-        if matches: return dictionary[matches[0]], matches[0]
+
+        # Kolejność jak dawniej: FIX #5 EXACT MATCH FIRST (Kołobrzeg != Koło),
+        # potem podciąg (nazwy wieloczłonowe), na końcu difflib - wszystko przez indeks
+        key = index.find(norm_cand, threshold)
+        if key is not None: return index.mapping[key], key
         return None
 
     # --- FEATURE: NEAREST NEIGHBOR ---
     def find_nearest_station(self, user_location_name: str):
-        try:
-            print(f"DEBUG GEO: Szukam '{user_location_name}'")
-            location = self.geolocator.geocode(
-                f"{user_location_name}", 
-                country_codes="pl",
-                language="pl",
-                addressdetails=True
-            )
-            
-            if not location: return None, None, None
-
-            # Filtracja typów (sklepy out)
-            raw = location.raw
-            obj_class = raw.get('class', '')
-            valid_classes = ['place', 'boundary']
-            if obj_class not in valid_classes: return None, None, None
-            if obj_class == 'boundary' and raw.get('type') != 'administrative': return None, None, None
-
-            # FIX #2: COORDINATE ORDER
-            # Geopy geodesic wymaga (LATITUDE, LONGITUDE)
-            user_coords = (location.latitude, location.longitude)
-            
-            nearest_sid = None
-            min_dist = float('inf')
-            nearest_name = ""
-
-            for sid, data in self.station_coords.items():
-                if data.get('lat') is None: continue
-                
-                # Upewniamy się, że dane stacji też są (LAT, LON)
-                st_coords = (float(data['lat']), float(data['lon']))
-                
-                dist = geodesic(user_coords, st_coords).km
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_sid = sid
-                    nearest_name = data['name']
-            
-            if nearest_sid and min_dist < 100:
-                return nearest_sid, nearest_name, round(min_dist, 1)
-                
-        except Exception as e:
-            print(f"DEBUG GEO ERROR: {e}")
-        
+        """Najbliższa stacja SYNOP dla miejscowości z offline'owego gazetteera (bez sieci)."""
+        coords = self.gazetteer.lookup(self._normalize(user_location_name))
+        if not coords:
+            coords = self.gazetteer.lookup(self._normalize(user_location_name, stemming=True))
+        if not coords: return None, None, None
+        return self._nearest_synop(*coords)
+
+    async def find_nearest_station_online(self, user_location_name: str):
+        """Fallback przez Nominatim (pula wątków, limiter 1 zap./s, trwały cache w SQLite)."""
+        if not self.geocoder: return None, None, None
+        coords = await self.geocoder.geocode(self._normalize(user_location_name), user_location_name)
+        if not coords: return None, None, None
+        return self._nearest_synop(*coords)
+
+    def _nearest_synop(self, lat: float, lon: float):
+        nearest = self.synop_geo.nearest(lat, lon, k=1)
+        if nearest and nearest[0][2] < 100:
+            nearest_sid, nearest_name, min_dist = nearest[0]
+            return nearest_sid, nearest_name, round(min_dist, 1)
         return None, None, None
 
+    def _geo_index(self, kind: str) -> StationGeoIndex:
+        if kind not in ('synop', 'hydro'): raise ValueError(f"Nieznany typ stacji: {kind}")
+        return self.hydro_geo if kind == 'hydro' else self.synop_geo
+
+    def nearest_stations(self, lat: float, lon: float, k: int = 5, kind: str = 'synop'):
+        """k najbliższych stacji danego typu ('synop' / 'hydro'): [(id, nazwa, km)]."""
+        return self._geo_index(kind).nearest(lat, lon, k=k)
+
+    def stations_within(self, lat: float, lon: float, radius_km: float, kind: str = 'synop'):
+        """Stacje danego typu w promieniu radius_km: [(id, nazwa, km)]."""
+        return self._geo_index(kind).within(lat, lon, radius_km)
+
     def validate_and_get_id(self, entities: dict, intent: str, original_text: str = "", city_context: str = None):
+        """(loc_id, intent, nazwa) dla wiadomości - z cache dla powtarzających się zapytań."""
+        if not self.resolution_cache.enabled:
+            return self._validate_and_get_id(entities, intent, original_text, city_context)
+        # Wielkość liter i spacje nie zmieniają wyniku; encje (spaCy) są częścią klucza
+        key = (
+            " ".join(original_text.lower().split()), intent, (city_context or "").lower(),
+            tuple(entities.get('placeName') or ()), tuple(entities.get('geogName') or ()),
+        )
+        result = self.resolution_cache.get(key)
+        if result is MISS:
+            result = self._validate_and_get_id(entities, intent, original_text, city_context)
+            self.resolution_cache.put(key, result)
+        return result
+
+    def _validate_and_get_id(self, entities: dict, intent: str, original_text: str = "", city_context: str = None):
         clean_text_lower = self._normalize(original_text)
         
         # FIX #3: Wyliczanie priorytetów na podstawie słów kluczowych
-        has_warning_kw = any(kw in clean_text_lower for kw in STRONG_WARNING_KEYWORDS)
-        has_weather_kw = any(kw in clean_text_lower for kw in STRONG_WEATHER_KEYWORDS)
-        has_hydro_kw = any(kw in clean_text_lower for kw in STRONG_HYDRO_KEYWORDS)
+        # (słowa kluczowe, rzeki i stopwords - jeden przebieg automatu po tekście)
+        found = self.routing_matcher.scan(clean_text_lower)
+        has_warning_kw = 'ostrzeżenia' in found
+        has_weather_kw = 'pogoda' in found
+        has_hydro_kw = 'hydro' in found
+        stopwords = found.get('stop', ())
         
         # Generowanie kandydatów
         candidates = []
         candidates.append(original_text)
         if entities.get('placeName'): candidates.extend(entities['placeName'])
         if entities.get('geogName'): candidates.extend(entities['geogName'])
-        candidates.extend([w for w in clean_text_lower.split() if len(w) > 3 and w not in STOPWORDS])
+        words = [w for w in clean_text_lower.split() if len(w) > 3 and w not in stopwords]
+        candidates.extend(words)
 
         # === STRICT ROUTING LOGIC ===
         target_intent = intent
@@ -201,10 +320,8 @@ class DataService:
             target_intent = 'hydro'
         else:
             # Jeśli brak słów kluczowych, sprawdzamy czy tekst zawiera znaną rzekę
-            for word in clean_text_lower.split():
-                if word in self.known_rivers:
-                    target_intent = 'hydro'
-                    break
+            if 'river' in found:
+                target_intent = 'hydro'
         
         # === HYDRO LOGIC (FIX #1 & #4) ===
         if target_intent == 'hydro':
@@ -212,29 +329,27 @@ class DataService:
             # 1. Intersection: Input + Context (Miasto)
             if city_context:
                 norm_ctx = self._normalize(city_context)
-                for cand in candidates:
-                    norm_cand = self._normalize(cand)
-                    # Szukamy klucza zawierającego oba słowa
-                    for key, val in self.map_hydro.items():
-                        if norm_cand in key and norm_ctx in key:
-                             return val, 'hydro', key
+                norm_cands = [self._normalize(cand) for cand in candidates]
+                # Klucze zawierające oba słowa (kandydat + kontekst) - ze wszystkich kandydatów naraz
+                matches = set()
+                for norm_cand in dict.fromkeys(norm_cands):
+                    matches |= self.hydro_tokens.containing_all(norm_cand, norm_ctx)
+                key = self.hydro_tokens.best(matches, [norm_ctx, *norm_cands])
+                if key: return self.map_hydro[key], 'hydro', key
 
             # 2. Intersection: Input zawiera oba (np. "Odra we Wrocławiu")
             for cand in candidates:
-                res = self._smart_find_key(cand, self.map_hydro, threshold=0.85)
-                if res: return res[0], 'hydro', res[1]
+                res = self._smart_find_key(cand, self.hydro_index, threshold=0.85)
+                if res: return self._hydro_match(res[0], res[1], words)
 
-            # 3. Brute Force łączenia słów z inputu
-            words = [w for w in clean_text_lower.split() if len(w)>3 and w not in STOPWORDS]
+            # 3. Pary słów z inputu: klucz zawierający oba słowa (przecięcia zbiorów z indeksu)
             if len(words) >= 2:
-                for i in range(len(words)):
-                    for j in range(len(words)):
-                        if i == j: continue
-                        w1, w2 = words[i], words[j]
-                        # Szukamy klucza z oboma słowami
-                        for key, val in self.map_hydro.items():
-                             if w1 in key and w2 in key:
-                                  return val, 'hydro', key
+                matches = set()
+                for i, w1 in enumerate(words):
+                    for w2 in words[i + 1:]:
+                        matches |= self.hydro_tokens.containing_all(w1, w2)
+                key = self.hydro_tokens.best(matches, words)
+                if key: return self.map_hydro[key], 'hydro', key
             
             # FIX #1: MAMRY KILLER
             # Jeśli doszliśmy tutaj, to znaczy, że nie znaleźliśmy konkretnego dopasowania.
@@ -245,18 +360,18 @@ class DataService:
         if target_intent == 'pogoda':
             # 1. Baza Synop/Simc
             for cand in candidates:
-                res = self._smart_find_key(cand, self.synop_names_map, threshold=0.90)
+                res = self._smart_find_key(cand, self.synop_index, threshold=0.90)
                 if res: return res[0], 'pogoda', res[1]
                 
-                res_simc = self._smart_find_key(cand, self.simc_dict, threshold=0.90)
+                res_simc = self._smart_find_key(cand, self.simc_index, threshold=0.90)
                 if res_simc:
                     simc_id, found_name = res_simc
                     if str(simc_id) in self.map_simc_to_synop:
                         return self.map_simc_to_synop[str(simc_id)], 'pogoda', found_name
 
-            # 2. Nearest Neighbor
-            search_query = entities.get('placeName', [original_text])[0]
-            if self._normalize(search_query) in STRONG_WEATHER_KEYWORDS:
+            # 2. Nearest Neighbor (offline gazetteer)
+            search_query = self._nearest_query(entities, original_text)
+            if not search_query:
                  return None, 'pogoda', None
 
             sid, s_name, dist = self.find_nearest_station(search_query)
@@ -266,29 +381,162 @@ class DataService:
         # === OSTRZEŻENIA LOGIC ===
         if target_intent == 'ostrzeżenia':
             for cand in candidates:
-                res = self._smart_find_key(cand, self.terc_dict, threshold=0.85)
+                res = self._smart_find_key(cand, self.terc_index, threshold=0.85)
                 if res: return res[0], 'ostrzeżenia', res[1]
             if city_context:
-                res = self._smart_find_key(city_context, self.terc_dict, threshold=0.85)
+                res = self._smart_find_key(city_context, self.terc_index, threshold=0.85)
                 if res: return res[0], 'ostrzeżenia', res[1]
 
         return None, target_intent, None
 
+    def _hydro_match(self, station_id: str, key: str, words: list[str]):
+        """
+        Sama nazwa rzeki (np. "wisla") to nie konkretna stacja. Próbujemy kolejno:
+        wodowskaz tej rzeki w miejscowości z wiadomości, najbliższy wodowskaz rzeki
+        (gazetteer), a w ostateczności podsumowanie wszystkich wodowskazów rzeki.
+        """
+        catalog = self.hydro_catalog
+        # Rzeka z jednym wodowskazem (albo klucz, który nie jest rzeką) - to po prostu ta stacja.
+        # "wisla" to też nazwa wodowskazu w Wiśle - ale rzeka ma pierwszeństwo (ta stacja i tak jest na liście)
+        if len(catalog.gauges(key)) < 2: return station_id, 'hydro', key
+
+        others = [w for w in words if w not in key.split()]
+        # 1. "rzeka miejscowość" w map_hydro (tylko stacje tej rzeki)
+        matches = set()
+        for word in others: matches |= self.hydro_tokens.containing_all(key, word)
+        matches = {i for i in matches if catalog.river_of(self.map_hydro[self.hydro_tokens.keys[i]]) == key}
+        best = self.hydro_tokens.best(matches, [key, *others])
+        if best: return self.map_hydro[best], 'hydro', best
+
+        # 2. Najbliższy wodowskaz rzeki do miejscowości z gazetteera
+        for word in others:
+            coords = self.gazetteer.lookup(word) or self.gazetteer.lookup(self._normalize(word, stemming=True))
+            if not coords: continue
+            nearest = catalog.nearest_gauge(key, *coords)
+            if nearest and nearest[2] < MAX_GAUGE_DISTANCE_KM:
+                gauge_id, gauge_name, dist = nearest
+                return gauge_id, 'hydro', f"NEAREST|{word}|{gauge_name}|{round(dist, 1)}"
+
+        # 3. Cała rzeka
+        gauges = catalog.gauges(key)
+        return (gauges[0][0] if gauges else station_id), 'hydro', f"RIVER|{key}"
+
+    def _nearest_query(self, entities: dict, original_text: str) -> str | None:
+        # Pusta lista placeName (np. tryb bez modelu spaCy) - bierzemy cały tekst
+        search_query = (entities.get('placeName') or [original_text])[0]
+        if self._normalize(search_query) in STRONG_WEATHER_KEYWORDS: return None
+        return search_query
+
+    async def resolve_location(self, entities: dict, intent: str, original_text: str = "", city_context: str = None):
+        """
+        validate_and_get_id (w pełni offline) + opcjonalny fallback przez Nominatim
+        dla pogody, gdy miejscowości nie ma w żadnym lokalnym słowniku.
+        """
+        result = self.validate_and_get_id(entities, intent, original_text, city_context)
+        return await self.complete_resolution(result, entities, original_text)
+
+    async def complete_resolution(self, result: tuple, entities: dict, original_text: str = ""):
+        """Dokańcza wynik validate_and_get_id (np. policzony w puli workerów) fallbackiem Nominatim."""
+        loc_id, final_intent, loc_name = result
+        if loc_id or final_intent != 'pogoda' or not self.geocoder:
+            return loc_id, final_intent, loc_name
+
+        search_query = self._nearest_query(entities, original_text)
+        if search_query:
+            with span("geocode", final_intent):
+                sid, s_name, dist = await self.find_nearest_station_online(search_query)
+            if sid: return sid, 'pogoda', f"NEAREST|{search_query}|{s_name}|{dist}"
+        return loc_id, final_intent, loc_name
+
     async def fetch_data(self, intent: str, location_id: str, location_name: str = "") -> str:
         try:
             if intent == 'pogoda':
-                data = await self.imgw_client.get_synop_data(location_id)
-                return self._format_weather(data, location_name)
+                with span("fetch", intent):
+                    data, age = await self._station_data('synop', intent, location_id, self.imgw_client.get_synop_data)
+                with span("format", intent):
+                    return self._format_weather(data, location_name) + (stale_note(data, age) if data else "")
             elif intent == 'hydro':
-                data = await self.imgw_client.get_hydro_data(location_id)
-                return self._format_hydro(data)
+                if location_name and location_name.startswith("RIVER|"):
+                    return await self._river_summary(location_name.split("|", 1)[1])
+                with span("fetch", intent):
+                    data, age = await self._station_data('hydro', intent, location_id, self.imgw_client.get_hydro_data)
+                with span("format", intent):
+                    return self._format_hydro(data, location_name) + (stale_note(data, age) if data else "")
             elif intent == 'ostrzeżenia':
-                data = await self.imgw_client.get_meteo_warnings()
-                return self._format_warnings(data, location_id, location_name)
+                with span("fetch", intent):
+                    warnings = await asyncio.wait_for(
+                        self.warnings_index.for_powiat(location_id, MAX_STALENESS[intent]), LIVE_FETCH_TIMEOUT
+                    )
+                age = self.warnings_index.age()
+                stale = age is not None and age > self.warnings_index.fresh_for
+                self.serving["stale" if stale else "fresh"] += 1
+                with span("format", intent):
+                    return self._format_warnings(warnings, location_id, location_name) + stale_note(None, age if stale else None)
+        except asyncio.TimeoutError:
+            self.serving["unavailable"] += 1
+            return UNAVAILABLE_MESSAGE
+        except HTTPException as e:
+            if e.status_code >= 500 or e.status_code == 429:
+                self.serving["unavailable"] += 1
+                return UNAVAILABLE_MESSAGE
+            return f"Błąd API: {str(e)}"
         except Exception as e:
             return f"Błąd API: {str(e)}"
         return "Nieznana intencja."
 
+    async def _station_data(self, feed: str, intent: str, station_id: str, fetch_one):
+        """
+        (dane, wiek lub None) dla stacji. Świeża migawka - od razu; starsza, ale mieszcząca
+        się w MAX_STALENESS[intent] - też od razu, a feedy odświeżają się w tle. Inaczej (także gdy
+        stacji w migawce brak) IMGW na żywo, najwyżej LIVE_FETCH_TIMEOUT s (TimeoutError / HTTPException).
+        """
+        record, age = self.snapshot.lookup(feed, station_id)
+        if record is not None and age <= self.snapshot.max_age:
+            self.serving["fresh"] += 1
+            return record, None
+        # Stacji brak w świeżej migawce - feed jest aktualny, więc pytamy o samą stację
+        if age is None or age > self.snapshot.max_age: self.snapshot.refresh_soon()
+        if record is not None and age <= MAX_STALENESS[intent]:
+            self.serving["stale"] += 1
+            return record, age
+        data = await asyncio.wait_for(fetch_one(station_id), LIVE_FETCH_TIMEOUT)
+        self.serving["live"] += 1
+        self.snapshot.remember(feed, data[0] if isinstance(data, list) and data else data)
+        return data, None
+
+    async def _river_summary(self, river_key: str) -> str:
+        """Stan wszystkich wodowskazów rzeki - z migawki albo z jednego pobrania pełnego feedu."""
+        gauges = self.hydro_catalog.gauges(river_key)
+        age = self.snapshot.age('hydro')
+        with span("fetch", "river"):
+            if age is not None and age <= MAX_STALENESS['hydro']:
+                rows = {sid: self.snapshot.get('hydro', sid) for sid, _ in gauges}
+                if age <= self.snapshot.max_age: age = None
+                else: self.snapshot.refresh_soon()
+                self.serving["stale" if age else "fresh"] += 1
+            else:
+                # Jedno zapytanie o cały feed zamiast N zapytań o pojedyncze stacje
+                # Przez cache (shield): timeout zwalnia użytkownika, a pobranie kończy się w tle
+                feed = await asyncio.wait_for(self.imgw_client.get_cached_hydro_feed(), LIVE_FETCH_TIMEOUT)
+                self.serving["live"] += 1
+                by_id = {str(rec.get('id_stacji')): rec for rec in feed or []}
+                rows = {sid: by_id.get(sid) for sid, _ in gauges}
+        with span("format", "river"):
+            return self._format_river(river_key, gauges, rows) + stale_note(None, age)
+
+    def data_stats(self) -> dict:
+        """Rozmiary danych offline - zera oznaczają brakujące artefakty (gazetteer, współrzędne wodowskazów)."""
+        return {
+            "synop_stations": len(self.station_coords),
+            "gazetteer": len(self.gazetteer),
+            "hydro_gauges": len(self.hydro_catalog),
+            "hydro_gauges_located": self.hydro_catalog.located(),
+        }
+
+    def serving_stats(self) -> dict:
+        return {**self.serving, "max_staleness_s": MAX_STALENESS, "live_fetch_timeout_s": LIVE_FETCH_TIMEOUT,
+                "warnings_stale_served": self.warnings_index.stale_served}
+
     # --- FORMATOWANIE ---
     def _format_weather(self, data: dict, loc_name_meta: str) -> str:
         if not data: return "Brak danych."
@@ -306,18 +554,38 @@ class DataService:
         ]
         return f"{header}{icon} **Pogoda: {data.get('stacja')}**\n" + "\n".join(filter(None, lines))
 
-    def _format_hydro(self, data):
+    def _format_hydro(self, data, loc_name_meta: str = ""):
         station = data[0] if isinstance(data, list) and data else data
         if not station: return "Brak danych hydro."
+        header = ""
+        if loc_name_meta and "NEAREST|" in loc_name_meta:
+            _, query, st_name, dist = loc_name_meta.split("|")
+            header = f"📍 Brak wodowskazu w: **{query.title()}**.\n📏 Najbliższy na rzece: **{st_name}** ({dist} km).\n\n"
         lines = [
             format_line("Poziom", station.get('stan_wody'), "cm"),
             format_line("Status", format_hydro_status(station.get('przekroczenia'))),
             format_line("Trend", format_trend(station.get('tendencja')))
         ]
-        return f"🌊 **{station.get('rzeka')}** ({station.get('stacja')})\n" + "\n".join(filter(None, lines))
-
-    def _format_warnings(self, all_warnings, loc_id, loc_name):
+        return f"{header}🌊 **{station.get('rzeka')}** ({station.get('stacja')})\n" + "\n".join(filter(None, lines))
+
+    def _format_river(self, river_key: str, gauges: list, rows: dict) -> str:
+        river = self.hydro_catalog.river_name(river_key) or river_key.title()
+        lines = []
+        for sid, name in gauges:
+            row = rows.get(sid)
+            if not row or row.get('stan_wody') in (None, ""): continue
+            river = row.get('rzeka') or river
+            status = format_hydro_status(row.get('przekroczenia'))
+            line = f"- {row.get('stacja') or name}: **{row.get('stan_wody')} cm**"
+            lines.append(f"{line} ({status})" if status else line)
+        if not lines: return f"Brak danych hydro dla rzeki {river}."
+        more = len(lines) - MAX_RIVER_GAUGES
+        lines = lines[:MAX_RIVER_GAUGES]
+        if more > 0: lines.append(f"… i jeszcze {more} wodowskazów.")
+        return f"🌊 **{river}** - wodowskazy:\n" + "\n".join(lines)
+
+    def _format_warnings(self, powiat_warnings, loc_id, loc_name):
         pretty_name = self.terc_id_to_name.get(loc_id, loc_name.title())
-        found = [f"⚠️ {w.get('zjawisko')} (st. {w.get('stopien')})" for w in all_warnings if loc_id in w.get('powiaty_kod', [])]
+        found = [f"⚠️ {w.get('zjawisko')} (st. {w.get('stopien')})" for w in powiat_warnings]
         if found: return f"🚨 **Ostrzeżenia: {pretty_name}**\n" + "\n".join(found)
         return f"✅ Brak ostrzeżeń dla: {pretty_name}."
\ No newline at end of file
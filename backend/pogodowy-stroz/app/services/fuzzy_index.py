@@ -0,0 +1,150 @@
+# backend/app/services/fuzzy_index.py
+import difflib
+from array import array
+
+NGRAM = 3
+MIN_SUBSTRING_LEN = 4  # Odpowiada warunkowi len(...) > 3 ze starego skanu
+
+
+def _ngrams(text: str) -> list[str]:
+    return [text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)]
+
+
+class FuzzyIndex:
+    """
+    Indeks wyszukiwania nazw budowany raz przy starcie.
+
+    Zwraca DOKŁADNIE te same wyniki co stary liniowy skan w DataService._smart_find_key
+    (exact -> pierwszy klucz-podciąg w kolejności słownika -> difflib.get_close_matches),
+    ale zamiast przechodzić po wszystkich kluczach korzysta z:
+    - odwróconego indeksu trigramów (klucze zawierające kandydata + filtr kandydatów dla difflib),
+    - kubełków długości i mapy klucz -> pozycja (klucze zawarte w kandydacie).
+    """
+
+    def __init__(self, mapping: dict):
+        self.mapping = mapping
+        self.keys = list(mapping.keys())
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self.lengths = array('H', (min(len(k), 0xFFFF) for k in self.keys))
+
+        by_length: dict[int, list[int]] = {}
+        postings: dict[str, list[int]] = {}
+        for i, key in enumerate(self.keys):
+            by_length.setdefault(len(key), []).append(i)
+            for gram in set(_ngrams(key)):
+                postings.setdefault(gram, []).append(i)
+
+        # array('I') zamiast list intów - kilkukrotnie mniej pamięci dla simc_dict
+        self.by_length = {n: array('I', ids) for n, ids in by_length.items()}
+        self.postings = {g: array('I', ids) for g, ids in postings.items()}
+        self.substring_lengths = sorted(n for n in self.by_length if n >= MIN_SUBSTRING_LEN)
+
+    @classmethod
+    def from_parts(cls, mapping, keys, positions, lengths, by_length, postings) -> "FuzzyIndex":
+        """Indeks z gotowych struktur (np. zmapowanych z data_bundle.bin) - bez budowania."""
+        index = cls.__new__(cls)
+        index.mapping = mapping
+        index.keys = keys
+        index.positions = positions
+        index.lengths = lengths
+        index.by_length = by_length
+        index.postings = postings
+        index.substring_lengths = sorted(n for n in by_length if n >= MIN_SUBSTRING_LEN)
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.mapping
+
+    def find(self, norm_cand: str, cutoff: float) -> str | None:
+        """Zwraca znaleziony klucz (już znormalizowany kandydat na wejściu) albo None."""
+        if norm_cand in self.mapping: return norm_cand
+
+        pos = self._first_substring_match(norm_cand)
+        if pos is not None: return self.keys[pos]
+
+        return self._close_match(norm_cand, cutoff)
+
+    # --- PODCIĄGI ---
+
+    def _first_substring_match(self, cand: str) -> int | None:
+        """Najmniejsza pozycja klucza, dla którego `key in cand or cand in key` (oba > 3 znaki)."""
+        if len(cand) < MIN_SUBSTRING_LEN: return None
+        best = self._first_key_containing(cand)
+
+        # Klucze zawarte w kandydacie: sprawdzamy tylko podciągi o długościach, które istnieją w słowniku
+        for n in self.substring_lengths:
+            if n > len(cand): break
+            for start in range(len(cand) - n + 1):
+                pos = self.positions.get(cand[start:start + n])
+                if pos is not None and (best is None or pos < best):
+                    best = pos
+        return best
+
+    def _first_key_containing(self, cand: str) -> int | None:
+        grams = set(_ngrams(cand))
+        lists = [self.postings.get(g) for g in grams]
+        if not all(lists): return None
+        # Najrzadszy trigram wyznacza kandydatów; listy są rosnące, więc pierwszy trafiony jest najwcześniejszy
+        for pos in min(lists, key=len):
+            if cand in self.keys[pos]: return pos
+        return None
+
+    # --- DIFFLIB ---
+
+    def _close_match(self, word: str, cutoff: float) -> str | None:
+        candidates = self._close_match_candidates(word, cutoff)
+        if not candidates: return None
+
+        # Ta sama kolejność testów i rozstrzyganie remisów co difflib.get_close_matches(n=1)
+        s = difflib.SequenceMatcher()
+        s.set_seq2(word)
+        best = None
+        for pos in candidates:
+            x = self.keys[pos]
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= cutoff and s.quick_ratio() >= cutoff and s.ratio() >= cutoff:
+                scored = (s.ratio(), x)
+                if best is None or scored > best: best = scored
+        return best[1] if best else None
+
+    def _close_match_candidates(self, word: str, cutoff: float) -> set[int]:
+        """
+        Zbiór kluczy, które MOGĄ osiągnąć ratio >= cutoff (filtr bezstratny).
+
+        Dla ratio = 2M/T >= cutoff długość klucza jest ograniczona (real_quick_ratio),
+        a liczba pozycji trigramów słowa obecnych w kluczu wynosi co najmniej 5M - 2T - 2
+        (bloki dopasowań są rozdzielone niedopasowanymi znakami). Gdy ten próg jest <= 0,
+        bierzemy cały kubełek danej długości.
+        """
+        lw = len(word)
+        grams = _ngrams(word)
+        candidates: set[int] = set()
+        filtered: dict[int, int] = {}  # długość klucza -> wymagana liczba wspólnych trigramów
+
+        for lx, bucket in self.by_length.items():
+            total = lw + lx
+            if total == 0 or 2.0 * min(lw, lx) / total < cutoff: continue
+            m_min = 0
+            while 2.0 * m_min / total < cutoff: m_min += 1
+            required = 5 * m_min - 2 * total - 2
+            if required <= 0: candidates.update(bucket)
+            else: filtered[lx] = required
+
+        if filtered and grams:
+            lists = sorted((self.postings.get(g, ()) for g in grams), key=len)
+            # Filtr prefiksowy: klucz z >= t wspólnymi pozycjami musi wystąpić w którejś
+            # z (n - t + 1) najrzadszych list
+            prefix = len(grams) - min(filtered.values()) + 1
+            seen: set[int] = set()
+            for postings in lists[:max(prefix, 0)]:
+                for pos in postings:
+                    if pos in seen or pos in candidates: continue
+                    seen.add(pos)
+                    required = filtered.get(self.lengths[pos])
+                    if required is None: continue
+                    key = self.keys[pos]
+                    if sum(1 for g in grams if g in key) >= required: candidates.add(pos)
+        return candidates
@@ -0,0 +1,57 @@
+# backend/app/services/gazetteer.py
+import struct
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+# Format pliku gazetteer.bin (little-endian):
+#   MAGIC (4 B) | VERSION u32 | COUNT u32
+#   lat float32[COUNT] | lon float32[COUNT]
+#   nazwy UTF-8 rozdzielone '\n' (posortowane, już znormalizowane)
+MAGIC = b"PSGZ"
+VERSION = 1
+_HEADER = struct.Struct("<4sII")
+
+
+def write_gazetteer(path: Path, entries: dict[str, tuple[float, float]]):
+    """Zapisuje słownik nazwa -> (lat, lon) w kompaktowym formacie binarnym."""
+    names = sorted(entries)
+    lat = array('f', (entries[n][0] for n in names))
+    lon = array('f', (entries[n][1] for n in names))
+    if lat.itemsize != 4: raise RuntimeError("float32 niedostępny na tej platformie")
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(names)))
+        f.write(lat.tobytes())
+        f.write(lon.tobytes())
+        f.write("\n".join(names).encode("utf-8"))
+
+
+class Gazetteer:
+    """Offline'owy słownik miejscowości: znormalizowana nazwa -> (lat, lon). Bez sieci."""
+
+    def __init__(self, names: list[str] | None = None, lat: array | None = None, lon: array | None = None):
+        self.names = names or []
+        self.lat = lat if lat is not None else array('f')
+        self.lon = lon if lon is not None else array('f')
+
+    @classmethod
+    def load(cls, path: Path) -> "Gazetteer":
+        if not path.exists(): return cls()
+        raw = path.read_bytes()
+        magic, version, count = _HEADER.unpack_from(raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Nieobsługiwany format gazetteera: {path}")
+        offset = _HEADER.size
+        lat = array('f'); lat.frombytes(raw[offset:offset + 4 * count]); offset += 4 * count
+        lon = array('f'); lon.frombytes(raw[offset:offset + 4 * count]); offset += 4 * count
+        names = raw[offset:].decode("utf-8").split("\n") if count else []
+        return cls(names, lat, lon)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, norm_name: str) -> tuple[float, float] | None:
+        i = bisect_left(self.names, norm_name)
+        if i < len(self.names) and self.names[i] == norm_name:
+            return float(self.lat[i]), float(self.lon[i])
+        return None
@@ -0,0 +1,63 @@
+# backend/app/services/geo_index.py
+import numpy as np
+from geopy.distance import geodesic
+
+EARTH_RADIUS_KM = 6371.0088
+# Odległość na kuli różni się od geodezyjnej (elipsoida WGS84) o mniej niż ~0.6%,
+# więc kandydatów wybieramy z zapasem, a dokładną odległość liczymy tylko dla nich.
+SPHERE_SLACK = 1.01
+SPHERE_SLACK_KM = 1.0
+
+
+def _unit_vectors(lat_deg, lon_deg) -> np.ndarray:
+    lat = np.radians(lat_deg)
+    lon = np.radians(lon_deg)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+class StationGeoIndex:
+    """
+    Indeks przestrzenny stacji (SYNOP lub hydro) na wektorach jednostkowych.
+
+    Filtr wstępny to jedno mnożenie macierz-wektor w NumPy (odległość po okręgu wielkim),
+    a dokładne geodesic (Karney) liczymy wyłącznie dla kilku finalnych kandydatów.
+    """
+
+    def __init__(self, stations: dict[str, dict]):
+        valid = [(sid, d) for sid, d in stations.items() if d.get('lat') is not None and d.get('lon') is not None]
+        self.ids = [sid for sid, _ in valid]
+        self.names = [d.get('name', '') for _, d in valid]
+        self.coords = np.array([(float(d['lat']), float(d['lon'])) for _, d in valid], dtype=np.float64).reshape(-1, 2)
+        self.vectors = _unit_vectors(self.coords[:, 0], self.coords[:, 1])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _sphere_km(self, lat: float, lon: float) -> np.ndarray:
+        dots = np.clip(self.vectors @ _unit_vectors(lat, lon), -1.0, 1.0)
+        return np.arccos(dots) * EARTH_RADIUS_KM
+
+    def _exact(self, lat: float, lon: float, positions) -> list[tuple[str, str, float]]:
+        result = [
+            (self.ids[i], self.names[i], geodesic((lat, lon), tuple(self.coords[i])).km)
+            for i in positions
+        ]
+        result.sort(key=lambda r: r[2])
+        return result
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list[tuple[str, str, float]]:
+        """k najbliższych stacji jako [(id, nazwa, km)], rosnąco po odległości geodezyjnej."""
+        if not self.ids or k <= 0: return []
+        approx = self._sphere_km(lat, lon)
+        k = min(k, len(self.ids))
+        kth = np.partition(approx, k - 1)[k - 1]
+        positions = np.nonzero(approx <= kth * SPHERE_SLACK + SPHERE_SLACK_KM)[0]
+        return self._exact(lat, lon, positions)[:k]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> list[tuple[str, str, float]]:
+        """Wszystkie stacje w promieniu radius_km, rosnąco po odległości geodezyjnej."""
+        if not self.ids: return []
+        approx = self._sphere_km(lat, lon)
+        positions = np.nonzero(approx <= radius_km * SPHERE_SLACK + SPHERE_SLACK_KM)[0]
+        return [r for r in self._exact(lat, lon, positions) if r[2] <= radius_km]
@@ -0,0 +1,174 @@
+# backend/app/services/geocoder.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from geopy.geocoders import Nominatim
+from app.core.log import LOG_SAMPLE_RATE, get_logger
+
+log = get_logger("geocoder")
+
+# Polityka Nominatim: maks. 1 zapytanie na sekundę
+MIN_INTERVAL = 1.0
+# Ile najdłużej zapytanie czeka w kolejce limitera, zanim odpuścimy (bez zapisu do cache)
+MAX_QUEUE_WAIT = 5.0
+# Wyniki negatywne (brak miejscowości) wygasają, pozytywne są trwałe
+NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", str(7 * 24 * 3600)))
+# Ile wyników trzymamy w pamięci (LRU) przed SQLite - klucze to dowolny tekst użytkowników
+GEOCODE_MEMO_SIZE = int(os.getenv("GEOCODE_MEMO_SIZE", "4096"))
+
+
+class CachedGeocoder:
+    """
+    Nieblokujące geokodowanie przez Nominatim z trwałym cache w SQLite.
+
+    - geopy działa w ograniczonej puli wątków, nigdy na pętli zdarzeń; SQLite ma własny
+      wątek, więc wolne zapytania do Nominatim (do 5 s) nie blokują trafień w cache,
+    - wyniki (również negatywne) trafiają do SQLite i przeżywają restart; przed SQLite
+      jest ograniczone LRU w pamięci, negatywne wpisy wygasają w obu po NEGATIVE_TTL,
+    - plik SQLite otwiera się leniwie; gdy się nie da (np. katalog tylko do odczytu),
+      cache działa w pamięci (:memory:) zamiast wyłączać cały serwis,
+    - wewnętrzny limiter pilnuje 1 zap./s; czekają na niego tylko zapytania,
+      które naprawdę muszą iść do Nominatim,
+    - równoległe zapytania o tę samą nazwę współdzielą jedno wywołanie.
+    """
+
+    def __init__(self, cache_path: Path, user_agent: str = "pogodowy_stroz_bot_final_fix", max_workers: int = 2,
+                 memo_size: int = GEOCODE_MEMO_SIZE):
+        self.geolocator = Nominatim(user_agent=user_agent, timeout=5)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="geocoder")
+        self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocoder-db")
+        self.cache_path = cache_path
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        # klucz -> (współrzędne albo None, termin ważności albo None dla trwałych)
+        self._memo: OrderedDict[str, tuple[tuple[float, float] | None, float | None]] = OrderedDict()
+        self.memo_size = memo_size
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._rate_lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self.stats = {"memo_hits": 0, "db_hits": 0, "requests": 0, "rate_limited": 0, "errors": 0}
+
+    async def geocode(self, key: str, query: str) -> tuple[float, float] | None:
+        """(lat, lon) dla znormalizowanej nazwy `key`; `query` to tekst wysyłany do Nominatim."""
+        entry = self._memo.get(key)
+        if entry is not None:
+            if entry[1] is None or entry[1] > time.time():
+                self._memo.move_to_end(key)
+                self.stats["memo_hits"] += 1
+                return entry[0]
+            del self._memo[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolve(key, query))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _resolve(self, key: str, query: str) -> tuple[float, float] | None:
+        loop = asyncio.get_running_loop()
+        found, coords, created = await loop.run_in_executor(self.db_executor, self._db_get, key)
+        if found:
+            self.stats["db_hits"] += 1
+            self._remember(key, coords, created)
+            return coords
+
+        if not await self._acquire_slot():
+            self.stats["rate_limited"] += 1
+            return None
+
+        self.stats["requests"] += 1
+        try:
+            coords = await loop.run_in_executor(self.executor, self._geocode_blocking, query)
+        except Exception as e:
+            # Błąd sieci to nie "brak miejscowości" - nie zapisujemy wyniku
+            self.stats["errors"] += 1
+            log.warning("geocode_failed", query=query, error=str(e), sample=LOG_SAMPLE_RATE)
+            return None
+
+        self._remember(key, coords, time.time())
+        await loop.run_in_executor(self.db_executor, self._db_put, key, coords)
+        return coords
+
+    def _remember(self, key: str, coords: tuple[float, float] | None, created: float):
+        self._memo[key] = (coords, None if coords else created + NEGATIVE_TTL)
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size: self._memo.popitem(last=False)
+
+    async def _acquire_slot(self) -> bool:
+        """Rezerwuje okno czasowe w limiterze; False, gdy kolejka jest dłuższa niż MAX_QUEUE_WAIT."""
+        async with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if slot - now > MAX_QUEUE_WAIT: return False
+            self._next_slot = slot + MIN_INTERVAL
+        if slot > now: await asyncio.sleep(slot - now)
+        return True
+
+    def _geocode_blocking(self, query: str) -> tuple[float, float] | None:
+        log.debug("geocode_query", query=query, sample=LOG_SAMPLE_RATE)
+        location = self.geolocator.geocode(
+            f"{query}",
+            country_codes="pl",
+            language="pl",
+            addressdetails=True
+        )
+        if not location: return None
+
+        # Filtracja typów (sklepy out)
+        raw = location.raw
+        obj_class = raw.get('class', '')
+        if obj_class not in ('place', 'boundary'): return None
+        if obj_class == 'boundary' and raw.get('type') != 'administrative': return None
+
+        # FIX #2: COORDINATE ORDER - (LATITUDE, LONGITUDE)
+        return location.latitude, location.longitude
+
+    def _connection(self) -> sqlite3.Connection:
+        """Połączenie z cache (otwierane przy pierwszym użyciu, w wątku db_executor; wołać pod _db_lock)."""
+        if self._db is not None: return self._db
+        try:
+            self._db = self._open(str(self.cache_path))
+        except sqlite3.Error as e:
+            log.warning("geocode_cache_unavailable", path=str(self.cache_path), error=str(e), fallback=":memory:")
+            self._db = self._open(":memory:")
+        return self._db
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS geocode (key TEXT PRIMARY KEY, lat REAL, lon REAL, created REAL)")
+        db.commit()
+        return db
+
+    def _db_get(self, key: str) -> tuple[bool, tuple[float, float] | None, float]:
+        with self._db_lock:
+            row = self._connection().execute("SELECT lat, lon, created FROM geocode WHERE key = ?", (key,)).fetchone()
+        if row is None: return False, None, 0.0
+        lat, lon, created = row
+        if lat is None:
+            if time.time() - created > NEGATIVE_TTL: return False, None, 0.0
+            return True, None, created
+        return True, (lat, lon), created
+
+    def _db_put(self, key: str, coords: tuple[float, float] | None):
+        lat, lon = coords if coords else (None, None)
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO geocode (key, lat, lon, created) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, time.time()),
+            )
+            db.commit()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.db_executor.shutdown(wait=False)
+        with self._db_lock:
+            if self._db is not None: self._db.close()
+            self._db = None
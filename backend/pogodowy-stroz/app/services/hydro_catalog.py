@@ -0,0 +1,122 @@
+# backend/app/services/hydro_catalog.py
+import json
+import math
+from array import array
+from pathlib import Path
+from geopy.distance import geodesic
+
+# Format hydro_catalog.json (scripts/create_hydro_map.py):
+#   {"rivers": [{"key": "wisla", "name": "Wisła",
+#                "stations": [{"id": "149180140", "name": "Kraków-Bielany", "lat": 50.04, "lon": 19.84}, ...]}]}
+# Wodowskazy każdej rzeki są uporządkowane z południa na północ (dla większości polskich
+# rzek to kolejność z biegiem rzeki), a przy braku współrzędnych - po id stacji IMGW.
+
+
+def _station_order(station: dict):
+    lat = station.get("lat")
+    return (lat if lat is not None else math.inf, str(station["id"]))
+
+
+class HydroCatalog:
+    """
+    Wodowskazy pogrupowane po rzekach: rzeka -> uporządkowana lista stacji, stacja -> rzeka.
+
+    Stacje leżą w zwartych tablicach posortowanych po rzece, więc wodowskazy
+    jednej rzeki to ciągły wycinek [offsets[r], offsets[r + 1]).
+    """
+
+    def __init__(self, rivers: list[dict] | None = None):
+        rivers = sorted(rivers or [], key=lambda r: r["key"])
+        self.river_keys: list[str] = [r["key"] for r in rivers]
+        self.river_names: list[str] = [r.get("name") or r["key"].title() for r in rivers]
+        self._river_pos = {key: i for i, key in enumerate(self.river_keys)}
+
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.lat = array('f')
+        self.lon = array('f')
+        self.river_of_station = array('I')
+        self.offsets = array('I', [0])
+        for r, river in enumerate(rivers):
+            for station in sorted(river["stations"], key=_station_order):
+                self.ids.append(str(station["id"]))
+                self.names.append(station.get("name") or "")
+                self.lat.append(station["lat"] if station.get("lat") is not None else math.nan)
+                self.lon.append(station["lon"] if station.get("lon") is not None else math.nan)
+                self.river_of_station.append(r)
+            self.offsets.append(len(self.ids))
+        # Stacja leżąca na kilku "rzekach" (np. jezioro i rzeka) - pierwsze wystąpienie
+        self._station_pos: dict[str, int] = {}
+        for i, sid in enumerate(self.ids): self._station_pos.setdefault(sid, i)
+
+    @classmethod
+    def load(cls, path: Path) -> "HydroCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["rivers"])
+
+    @classmethod
+    def from_hydro_map(cls, map_hydro) -> "HydroCatalog":
+        """
+        Odtworzenie katalogu z samego map_hydro (gdy brak hydro_catalog.json): klucz
+        "rzeka stacja" jest parą, jeśli "stacja" i "rzeka" to też klucze, a "stacja" ma to samo id.
+        Bez współrzędnych - nearest_gauge() nic wtedy nie znajdzie.
+        """
+        rivers: dict[str, dict[str, str]] = {}
+        for key, sid in map_hydro.items():
+            tokens = key.split()
+            for split in range(1, len(tokens)):
+                river, station = " ".join(tokens[:split]), " ".join(tokens[split:])
+                if map_hydro.get(station) == sid and river in map_hydro:
+                    rivers.setdefault(river, {})[str(sid)] = station
+                    break
+        return cls([
+            {"key": river, "stations": [{"id": sid, "name": name.title()} for sid, name in stations.items()]}
+            for river, stations in rivers.items()
+        ])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def located(self) -> int:
+        """Ile wodowskazów ma współrzędne (0 - katalog odtworzony z map_hydro)."""
+        return sum(1 for lat in self.lat if not math.isnan(lat))
+
+    def station_coords(self) -> dict[str, dict]:
+        """Wodowskazy ze współrzędnymi w formacie station_coords.json: {id: {name, lat, lon}}."""
+        return {
+            sid: {"name": self.names[i], "lat": float(self.lat[i]), "lon": float(self.lon[i])}
+            for sid, i in self._station_pos.items() if not math.isnan(self.lat[i])
+        }
+
+    def is_river(self, key: str) -> bool:
+        return key in self._river_pos
+
+    def river_name(self, key: str) -> str | None:
+        r = self._river_pos.get(key)
+        return None if r is None else self.river_names[r]
+
+    def river_of(self, station_id: str) -> str | None:
+        """Klucz rzeki, na której leży wodowskaz."""
+        i = self._station_pos.get(str(station_id))
+        return None if i is None else self.river_keys[self.river_of_station[i]]
+
+    def station_name(self, station_id: str) -> str | None:
+        i = self._station_pos.get(str(station_id))
+        return None if i is None else self.names[i]
+
+    def gauges(self, river_key: str) -> list[tuple[str, str]]:
+        """Wodowskazy rzeki w kolejności katalogu: [(id, nazwa)]."""
+        r = self._river_pos.get(river_key)
+        if r is None: return []
+        return [(self.ids[i], self.names[i]) for i in range(self.offsets[r], self.offsets[r + 1])]
+
+    def nearest_gauge(self, river_key: str, lat: float, lon: float):
+        """Najbliższy wodowskaz na danej rzece: (id, nazwa, km) albo None (brak rzeki / współrzędnych)."""
+        r = self._river_pos.get(river_key)
+        if r is None: return None
+        best = None
+        for i in range(self.offsets[r], self.offsets[r + 1]):
+            if math.isnan(self.lat[i]): continue
+            km = geodesic((lat, lon), (self.lat[i], self.lon[i])).km
+            if best is None or km < best[2]: best = (self.ids[i], self.names[i], km)
+        return best
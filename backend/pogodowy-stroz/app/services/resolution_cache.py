@@ -0,0 +1,83 @@
+# backend/app/services/resolution_cache.py
+import os
+import threading
+from collections import OrderedDict
+
+# Ile rozwiązanych lokalizacji trzymamy (0 = cache wyłączony) i ile wyników "nie znaleziono"
+RESOLUTION_CACHE_SIZE = int(os.getenv("RESOLUTION_CACHE_SIZE", "4096"))
+RESOLUTION_CACHE_NEGATIVE_SIZE = int(os.getenv("RESOLUTION_CACHE_NEGATIVE_SIZE", "1024"))
+
+MISS = object()
+
+
+class ResolutionCache:
+    """
+    Pamięć wyników validate_and_get_id: klucz zapytania -> (loc_id, intent, nazwa).
+
+    Dwie osobne listy LRU: trafienia i wyniki negatywne (loc_id None). Długi ogon
+    jednorazowych, nierozpoznanych wiadomości nie wypycha więc popularnych miejsc.
+    Wyniki zależą tylko od słowników w pamięci, dlatego wpisy nie mają TTL - cache
+    czyści DataService przy każdym (prze)ładowaniu danych.
+    Blokada, bo w trybie UNDERSTANDING_EXECUTOR=thread wołają go wątki puli.
+    """
+
+    def __init__(self, maxsize: int = RESOLUTION_CACHE_SIZE, negative_maxsize: int = RESOLUTION_CACHE_NEGATIVE_SIZE):
+        self.maxsize = maxsize
+        self.negative_maxsize = negative_maxsize
+        self._positive: OrderedDict[tuple, tuple] = OrderedDict()
+        self._negative: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: tuple):
+        """Zapamiętany wynik albo MISS."""
+        with self._lock:
+            for entries in (self._positive, self._negative):
+                result = entries.get(key, MISS)
+                if result is MISS: continue
+                entries.move_to_end(key)
+                if entries is self._positive: self.hits += 1
+                else: self.negative_hits += 1
+                return result
+            self.misses += 1
+            return MISS
+
+    def put(self, key: tuple, result: tuple):
+        negative = result[0] is None
+        entries, limit = (self._negative, self.negative_maxsize) if negative else (self._positive, self.maxsize)
+        if limit <= 0: return
+        with self._lock:
+            entries[key] = result
+            entries.move_to_end(key)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._positive.clear()
+            self._negative.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._positive),
+            "negative_size": len(self._negative),
+            "maxsize": self.maxsize,
+            "negative_maxsize": self.negative_maxsize,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
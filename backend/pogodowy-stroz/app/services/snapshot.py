@@ -0,0 +1,145 @@
+# backend/app/services/snapshot.py
+import asyncio
+import time
+from app.api.imgw_client import ImgwApiClient
+from app.core.log import get_logger
+
+log = get_logger("snapshot")
+
+# Co ile sekund pobieramy pełne feedy i po jakim czasie snapshot uznajemy za nieaktualny
+REFRESH_INTERVAL = 300
+MAX_AGE = 900
+# Najmniejszy odstęp między odświeżeniami wymuszanymi przez zapytania (gdy IMGW leży)
+REFRESH_RETRY_INTERVAL = 30
+
+
+def _feed_table(data) -> dict[str, dict]:
+    """id_stacji -> rekord z pełnego feedu; pusty słownik, gdy to nie jest lista rekordów."""
+    if not isinstance(data, list): return {}
+    return {str(rec['id_stacji']): rec for rec in data if isinstance(rec, dict) and rec.get('id_stacji')}
+
+
+class StationSnapshot:
+    """
+    Migawka pełnych feedów IMGW (/synop i /hydro/) trzymana w pamięci.
+
+    Zadanie w tle pobiera całe feedy co REFRESH_INTERVAL sekund i buduje tabele
+    id_stacji -> rekord. DataService odpowiada z nich bez ruchu sieciowego,
+    a po pojedyncze stacje sięga tylko, gdy migawka jest przeterminowana.
+
+    Rekordy nie są kasowane, gdy IMGW nie odpowiada - lookup() zwraca je razem
+    z wiekiem, a wywołujący decyduje, czy tak stare dane nadają się do pokazania
+    (refresh_soon() odświeża wtedy feedy w tle). Pojedyncze stacje pobrane na żywo
+    trafiają do migawki przez remember() z własnym czasem pobrania.
+    """
+
+    FEEDS = ("synop", "hydro")
+
+    def __init__(self, client: ImgwApiClient, interval: float = REFRESH_INTERVAL, max_age: float = MAX_AGE):
+        self.client = client
+        self.interval = interval
+        self.max_age = max_age
+        self.tables: dict[str, dict[str, dict]] = {feed: {} for feed in self.FEEDS}
+        self.updated_at: dict[str, float | None] = {feed: None for feed in self.FEEDS}
+        # Czas pobrania rekordów dociągniętych na żywo (nowszych niż cały feed)
+        self.station_at: dict[str, dict[str, float]] = {feed: {} for feed in self.FEEDS}
+        self._task: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self._refresh_requested_at: float | None = None
+        self.background_refreshes = 0
+
+    def is_fresh(self, feed: str) -> bool:
+        updated = self.updated_at.get(feed)
+        return updated is not None and time.monotonic() - updated <= self.max_age
+
+    def age(self, feed: str) -> float | None:
+        updated = self.updated_at.get(feed)
+        return time.monotonic() - updated if updated is not None else None
+
+    def get(self, feed: str, station_id: str) -> dict | None:
+        """Rekord stacji z migawki (None, gdy stacji nie ma w feedzie)."""
+        return self.tables[feed].get(str(station_id))
+
+    def lookup(self, feed: str, station_id: str) -> tuple[dict | None, float | None]:
+        """
+        (rekord, wiek w sekundach) niezależnie od świeżości. Dla stacji spoza feedu
+        wiek dotyczy całego feedu; (None, None), gdy feedu jeszcze nie pobrano.
+        """
+        station_id = str(station_id)
+        fetched = self.station_at[feed].get(station_id, self.updated_at[feed])
+        if fetched is None: return None, None
+        return self.tables[feed].get(station_id), time.monotonic() - fetched
+
+    def remember(self, feed: str, record: dict):
+        """Wkłada do migawki rekord stacji pobrany pojedynczo (ostatnie dobre dane)."""
+        if not record or not record.get('id_stacji'): return
+        station_id = str(record['id_stacji'])
+        self.tables[feed][station_id] = record
+        self.station_at[feed][station_id] = time.monotonic()
+
+    def refresh_soon(self):
+        """Odświeżenie feedów w tle; najwyżej jedno naraz i nie częściej niż co REFRESH_RETRY_INTERVAL s."""
+        if self._refresh_task is not None and not self._refresh_task.done(): return
+        now = time.monotonic()
+        if self._refresh_requested_at is not None and now - self._refresh_requested_at < REFRESH_RETRY_INTERVAL: return
+        self._refresh_requested_at = now
+        self.background_refreshes += 1
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self):
+        """Pobiera oba feedy równolegle; błąd albo zły format jednego nie rusza danych drugiego."""
+        results = await asyncio.gather(
+            self.client.get_synop_feed(),
+            self.client.get_hydro_feed(),
+            return_exceptions=True,
+        )
+        for feed, data in zip(self.FEEDS, results):
+            if isinstance(data, BaseException):
+                log.warning("snapshot_refresh_failed", feed=feed, error=str(data))
+                continue
+            table = _feed_table(data)
+            # Komunikat błędu / nie-lista zamiast feedu - zostaje poprzednia migawka tego feedu
+            if not table:
+                log.warning("snapshot_bad_payload", feed=feed, payload_type=type(data).__name__,
+                            size=len(data) if isinstance(data, (list, dict)) else None)
+                continue
+            self.tables[feed] = table
+            self.updated_at[feed] = time.monotonic()
+            self.station_at[feed] = {}
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.error("snapshot_loop_error", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._refresh_task is not None and not self._refresh_task.done(): self._refresh_task.cancel()
+        if self._task is None: return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            **{
+                feed: {
+                    "stations": len(self.tables[feed]),
+                    "age_s": round(now - self.updated_at[feed], 1) if self.updated_at[feed] is not None else None,
+                    "fresh": self.is_fresh(feed),
+                    "live_stations": len(self.station_at[feed]),
+                }
+                for feed in self.FEEDS
+            },
+            "background_refreshes": self.background_refreshes,
+        }
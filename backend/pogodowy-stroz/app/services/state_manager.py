@@ -1,9 +1,316 @@
+# backend/app/services/state_manager.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from fastapi import HTTPException
 from app.logic.conversation import ChatbotLogic
 
-# Magazyn sesji w pamięci
-user_sessions: dict[str, ChatbotLogic] = {}
+# memory - LRU + TTL w procesie (domyślnie; sesje giną przy restarcie)
+# sqlite - migawki sesji w pliku SQLite (przeżywają restart, wspólne dla workerów na jednej maszynie)
+# redis  - migawki w Redisie / zgodnym serwerze (wiele maszyn); wymaga pakietu `redis`
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_DB_PATH = Path(os.getenv("SESSION_DB_PATH", Path(__file__).resolve().parent.parent / "data" / "sessions.sqlite"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+# Wiadomości jednej sesji obsługujemy po kolei: ile mogą czekać w kolejce i jak długo
+SESSION_MAX_PENDING = int(os.getenv("SESSION_MAX_PENDING", "4"))
+SESSION_LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", "10"))
 
-def get_or_create_fsm(session_id: str) -> ChatbotLogic:
-    if session_id not in user_sessions:
-        user_sessions[session_id] = ChatbotLogic(session_id)
-    return user_sessions[session_id]
+
+class SessionLocks:
+    """
+    Blokada na sesję: wiadomości tej samej sesji przetwarzane są po kolei (asyncio.Lock
+    jest FIFO - w kolejności przyjścia), różne sesje - w pełni równolegle.
+
+    Czekanie jest ograniczone: ponad max_pending oczekujących albo po timeout sekundach
+    żądanie dostaje 429 zamiast wisieć. Blokady istnieją tylko dla aktywnych sesji.
+    """
+
+    def __init__(self, max_pending: int = SESSION_MAX_PENDING, timeout: float = SESSION_LOCK_TIMEOUT):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._locks: dict[str, list] = {}  # session_id -> [Lock, liczba trzymających + czekających]
+        self.waited = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = self._locks[session_id] = [asyncio.Lock(), 0]
+        elif entry[1] > self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail="Poprzednie wiadomości w tej rozmowie są jeszcze przetwarzane.")
+
+        lock = entry[0]
+        if entry[1]: self.waited += 1
+        entry[1] += 1
+        try:
+            try:
+                await asyncio.wait_for(lock.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise HTTPException(status_code=429, detail="Przekroczono czas oczekiwania na poprzednią wiadomość.")
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and self._locks.get(session_id) is entry: del self._locks[session_id]
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._locks),
+            "pending": sum(max(n - 1, 0) for _, n in self._locks.values()),
+            "max_pending": self.max_pending,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+class MemorySessionStore:
+    """
+    Sesje w pamięci procesu: najwyżej max_size obiektów ChatbotLogic (LRU),
+    a sesja nieużywana dłużej niż ttl sekund jest zapominana - przy odczycie
+    albo przy każdym zapisie (wygasłe są na początku kolejki LRU).
+    """
+
+    def __init__(self, max_size: int = SESSION_MAX, ttl: float = SESSION_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._sessions: OrderedDict[str, tuple[ChatbotLogic, float]] = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    async def get(self, session_id: str) -> ChatbotLogic:
+        now = time.monotonic()
+        entry = self._sessions.get(session_id)
+        if entry is not None and now - entry[1] > self.ttl:
+            del self._sessions[session_id]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            logic = ChatbotLogic(session_id)
+            self.created += 1
+        else:
+            logic = entry[0]
+        self._put(session_id, logic, now)
+        return logic
+
+    async def save(self, logic: ChatbotLogic):
+        self._put(logic.session_id, logic, time.monotonic())
+
+    def _put(self, session_id: str, logic: ChatbotLogic, now: float):
+        self._sessions[session_id] = (logic, now)
+        self._sessions.move_to_end(session_id)
+        # Kolejność LRU = kolejność ostatniego użycia: wygasłe zdejmujemy od początku
+        while self._sessions:
+            oldest_id, (_, used) = next(iter(self._sessions.items()))
+            if now - used <= self.ttl: break
+            del self._sessions[oldest_id]
+            self.expired += 1
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "size": len(self._sessions),
+            "max_size": self.max_size,
+            "ttl_s": self.ttl,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class SnapshotSessionStore(ABC):
+    """
+    Wspólna logika magazynów trwałych: sesja to migawka ChatbotLogic.snapshot() (JSON).
+
+    Każde żądanie czyta aktualną migawkę, więc kolejne wiadomości tej samej sesji
+    może obsłużyć dowolny worker. Lokalnie trzymamy (LRU) odtworzone obiekty razem
+    z wersją migawki - gdy nikt inny jej nie zmienił, obiektu nie budujemy od nowa.
+    Wersja to unikalny znacznik zapisu (uuid), a nie licznik: dwa workery zapisujące
+    "tę samą następną" wersję nie mogą uznać cudzej migawki za własną.
+    """
+
+    backend = "snapshot"
+
+    def __init__(self, ttl: float = SESSION_TTL, cache_size: int = SESSION_MAX):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._local: OrderedDict[str, tuple[ChatbotLogic, str | None]] = OrderedDict()
+        self.loads = 0
+        self.local_hits = 0
+        self.created = 0
+        self.saves = 0
+
+    @abstractmethod
+    async def _read(self, session_id: str) -> tuple[str, dict] | None:
+        """(wersja, migawka) albo None, gdy sesji nie ma lub wygasła."""
+
+    @abstractmethod
+    async def _write(self, session_id: str, version: str, data: dict):
+        """Zapisuje migawkę z nową wersją (nadpisuje poprzednią)."""
+
+    async def get(self, session_id: str) -> ChatbotLogic:
+        stored = await self._read(session_id)
+        if stored is None:
+            self._local.pop(session_id, None)
+            self.created += 1
+            logic = ChatbotLogic(session_id)
+            self._remember(logic, None)
+            return logic
+        version, data = stored
+        cached = self._local.get(session_id)
+        if cached is not None and cached[1] == version:
+            self.local_hits += 1
+            self._local.move_to_end(session_id)
+            return cached[0]
+        self.loads += 1
+        logic = ChatbotLogic.restore(session_id, data)
+        self._remember(logic, version)
+        return logic
+
+    async def save(self, logic: ChatbotLogic):
+        version = uuid.uuid4().hex
+        await self._write(logic.session_id, version, logic.snapshot())
+        self.saves += 1
+        self._remember(logic, version)
+
+    def _remember(self, logic: ChatbotLogic, version: str | None):
+        self._local[logic.session_id] = (logic, version)
+        self._local.move_to_end(logic.session_id)
+        while len(self._local) > self.cache_size: self._local.popitem(last=False)
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "local_size": len(self._local),
+            "ttl_s": self.ttl,
+            "created": self.created,
+            "loads": self.loads,
+            "local_hits": self.local_hits,
+            "saves": self.saves,
+        }
+
+
+class SqliteSessionStore(SnapshotSessionStore):
+    """
+    Migawki sesji w SQLite (tryb WAL - kilka workerów uvicorna może dzielić jeden plik).
+
+    Uwaga: SessionLocks szereguje wiadomości sesji tylko w obrębie jednego procesu - przy
+    kilku workerach dwie wiadomości tej samej sesji mogą iść równolegle (bez kolejności).
+    """
+
+    backend = "sqlite"
+    # Co ile zapisów sprzątamy wygasłe sesje
+    PURGE_EVERY = 256
+
+    def __init__(self, path: Path = SESSION_DB_PATH, ttl: float = SESSION_TTL, cache_size: int = SESSION_MAX):
+        super().__init__(ttl, cache_size)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=5.0)
+        self._db_lock = threading.Lock()
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS session_snapshots (id TEXT PRIMARY KEY, version TEXT, data TEXT, updated REAL)"
+            )
+            self._db.commit()
+
+    async def _read(self, session_id: str):
+        return await asyncio.to_thread(self._read_blocking, session_id)
+
+    async def _write(self, session_id: str, version: str, data: dict):
+        await asyncio.to_thread(self._write_blocking, session_id, version, json.dumps(data))
+
+    def _read_blocking(self, session_id: str):
+        with self._db_lock:
+            row = self._db.execute("SELECT version, data, updated FROM session_snapshots WHERE id = ?", (session_id,)).fetchone()
+        if row is None or time.time() - row[2] > self.ttl: return None
+        return row[0], json.loads(row[1])
+
+    def _write_blocking(self, session_id: str, version: str, payload: str):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO session_snapshots (id, version, data, updated) VALUES (?, ?, ?, ?)",
+                (session_id, version, payload, time.time()),
+            )
+            if (self.saves + 1) % self.PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM session_snapshots WHERE updated < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+    async def close(self):
+        with self._db_lock:
+            self._db.close()
+
+
+class RedisSessionStore(SnapshotSessionStore):
+    """
+    Migawki sesji w Redisie (lub zgodnym serwerze); wygasanie załatwia TTL klucza.
+
+    Uwaga: SessionLocks szereguje wiadomości sesji tylko w obrębie jednego procesu - przy
+    kilku workerach dwie wiadomości tej samej sesji mogą iść równolegle (bez kolejności).
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str = SESSION_REDIS_URL, ttl: float = SESSION_TTL, cache_size: int = SESSION_MAX):
+        super().__init__(ttl, cache_size)
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis wymaga pakietu 'redis' (pip install redis)") from e
+        self._redis = redis.from_url(url)
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"pogodowy-stroz:session:{session_id}"
+
+    async def _read(self, session_id: str):
+        raw = await self._redis.get(self._key(session_id))
+        if raw is None: return None
+        stored = json.loads(raw)
+        return stored["version"], stored["data"]
+
+    async def _write(self, session_id: str, version: str, data: dict):
+        payload = json.dumps({"version": version, "data": data})
+        await self._redis.set(self._key(session_id), payload, ex=max(int(self.ttl), 1))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_session_store(backend: str = SESSION_BACKEND):
+    if backend == "sqlite": return SqliteSessionStore()
+    if backend == "redis": return RedisSessionStore()
+    return MemorySessionStore()
+
+
+SESSIONS = create_session_store()
+SESSION_LOCKS = SessionLocks()
+
+
+async def get_or_create_fsm(session_id: str) -> ChatbotLogic:
+    return await SESSIONS.get(session_id)
@@ -0,0 +1,58 @@
+# backend/app/services/token_index.py
+from collections.abc import Iterable
+from functools import lru_cache
+
+
+class TokenIndex:
+    """
+    Indeks odwrócony słowo -> klucze (np. map_hydro: "wisla krakow-bielany").
+
+    containing(q) zwraca dokładnie te klucze, dla których `q in key` (ta sama
+    semantyka podciągu co dawne pętle), ale zamiast skanować wszystkie klucze
+    przegląda tylko słownik słów (kilkaset pozycji) - wynik jest zapamiętywany.
+    Warunki "klucz zawiera oba słowa" stają się przecięciem zbiorów.
+    """
+
+    def __init__(self, keys: Iterable[str], memo_size: int = 4096):
+        self.keys = list(keys)
+        self.all_ids = frozenset(range(len(self.keys)))
+        postings: dict[str, set[int]] = {}
+        for i, key in enumerate(self.keys):
+            for token in key.split(): postings.setdefault(token, set()).add(i)
+        self.postings = {token: frozenset(ids) for token, ids in postings.items()}
+        self.containing = lru_cache(maxsize=memo_size)(self._containing)
+
+    def _containing(self, query: str) -> frozenset[int]:
+        if not query: return self.all_ids
+        parts = query.split()
+        if len(parts) == 1 and parts[0] == query:
+            # Podciąg bez białych znaków mieści się w całości w jednym słowie klucza
+            ids = set()
+            for token, token_ids in self.postings.items():
+                if query in token: ids |= token_ids
+            return frozenset(ids)
+        # Z białymi znakami: każdy kawałek musi być w kluczu, potem dokładne sprawdzenie
+        ids = self.all_ids
+        for part in parts:
+            ids = ids & self.containing(part)
+            if not ids: break
+        return frozenset(i for i in ids if query in self.keys[i])
+
+    def containing_all(self, *queries: str) -> frozenset[int]:
+        """Klucze zawierające wszystkie podane napisy."""
+        ids = self.all_ids
+        for query in queries:
+            ids = ids & self.containing(query)
+            if not ids: break
+        return ids
+
+    def best(self, ids: Iterable[int], terms: Iterable[str]) -> str | None:
+        """
+        Deterministyczny wybór spośród pasujących kluczy (zamiast "pierwszy trafiony"):
+        najwięcej pokrytych słów z zapytania, potem najkrótszy klucz, potem kolejność w słowniku.
+        """
+        ids = list(ids)
+        if not ids: return None
+        term_sets = [self.containing(t) for t in dict.fromkeys(terms) if t]
+        best_id = min(ids, key=lambda i: (-sum(i in s for s in term_sets), len(self.keys[i]), i))
+        return self.keys[best_id]
@@ -0,0 +1,78 @@
+# backend/app/services/warnings_index.py
+import asyncio
+import hashlib
+import json
+import time
+from app.api.imgw_client import ImgwApiClient
+from app.core.log import LOG_SAMPLE_RATE, get_logger
+
+log = get_logger("warnings")
+
+
+class WarningsIndex:
+    """
+    Odwrócony indeks ostrzeżeń: kod TERYT powiatu -> lista aktywnych ostrzeżeń.
+
+    Feed meteo/worn przychodzi przez cache klienta, więc dopóki wpis jest ważny
+    dostajemy ten sam obiekt i nic nie przeliczamy. Po odświeżeniu cache indeks
+    jest przebudowywany tylko, gdy treść feedu faktycznie się zmieniła.
+    Przebudowa jest synchroniczna, więc równoległe zapytania w pętli asyncio
+    zawsze widzą jedną, wspólną migawkę.
+
+    Z max_stale indeks odpowiada od razu z ostatniego dobrego feedu, jeśli nie jest
+    starszy niż max_stale sekund, a nowy feed pobiera w tle (stale-while-revalidate).
+    """
+
+    def __init__(self, client: ImgwApiClient):
+        self.client = client
+        self.by_powiat: dict[str, list[dict]] = {}
+        self._source = None
+        self._fingerprint = None
+        self.rebuilds = 0
+        # Po tylu sekundach feed jest "stary" - tyle samo żyje wpis w cache klienta
+        self.fresh_for = client.ttl["warnings"]
+        self.fetched_at: float | None = None
+        self._refresh_task: asyncio.Task | None = None
+        self.stale_served = 0
+
+    def age(self) -> float | None:
+        return time.monotonic() - self.fetched_at if self.fetched_at is not None else None
+
+    async def for_powiat(self, teryt_code: str, max_stale: float | None = None) -> list[dict]:
+        age = self.age()
+        if age is not None and age <= self.fresh_for: return self.by_powiat.get(teryt_code, [])
+        if age is not None and max_stale is not None and age <= max_stale:
+            self.stale_served += 1
+            self.refresh_soon()
+            return self.by_powiat.get(teryt_code, [])
+        await self.refresh()
+        return self.by_powiat.get(teryt_code, [])
+
+    async def refresh(self):
+        data = await self.client.get_meteo_warnings()
+        if data is not self._source: self._update(data)
+
+    def refresh_soon(self):
+        if self._refresh_task is not None and not self._refresh_task.done(): return
+        self._refresh_task = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            log.warning("warnings_refresh_failed", error=str(e), sample=LOG_SAMPLE_RATE)
+
+    def _update(self, data):
+        # Nowy obiekt z cache klienta = nowe pobranie (stara odpowiedź z degradacji to ten sam obiekt)
+        self.fetched_at = time.monotonic()
+        fingerprint = hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+        self._source = data
+        if fingerprint == self._fingerprint: return
+
+        by_powiat: dict[str, list[dict]] = {}
+        for warning in data or []:
+            for code in warning.get('powiaty_kod') or []:
+                by_powiat.setdefault(code, []).append(warning)
+        self.by_powiat = by_powiat
+        self._fingerprint = fingerprint
+        self.rebuilds += 1
@@ -0,0 +1,89 @@
+# scripts/bench_fsm.py
+# Koszt sesji: dawny ChatbotLogic z własną AsyncMachine (transitions) vs rekord __slots__
+# ze współdzieloną CompiledMachine.
+#   1. "pierwsza wiadomość": utworzenie sesji + pierwsze zdarzenie FSM (bez NLP i sieci),
+#   2. pamięć na N sesji (tracemalloc), domyślnie 100 000.
+# Uruchomienie: python scripts/bench_fsm.py [liczba_sesji]
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from transitions.extensions.asyncio import AsyncMachine
+from app.logic.conversation import ChatbotLogic
+
+
+class LegacyChatbotLogic:
+    """Kopia dawnego __init__: nowa AsyncMachine i sześć przejść dla każdej sesji."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.data_service = None
+        self.current_intent = None
+        self.current_location_id = None
+        self.last_city_context = None
+        self.resolved_loc_name = None
+        self.retry_count = 0
+        self.max_retries = 2
+        self.response = ""
+        self.processing_result = None
+
+        states = ['initial', 'awaiting_location', 'processing']
+        self.machine = AsyncMachine(model=self, states=states, initial='initial')
+
+        self.machine.add_transition('trigger_intent', 'initial', 'processing', conditions='_has_valid_location', after='_trigger_data_processing')
+        self.machine.add_transition('trigger_intent', 'initial', 'awaiting_location', conditions='_is_location_missing', after='_ask_for_location')
+        self.machine.add_transition('trigger_location', 'awaiting_location', 'processing', conditions='_has_valid_location', after='_trigger_data_processing')
+        self.machine.add_transition('trigger_location', 'awaiting_location', 'awaiting_location', conditions='_is_location_missing', after='_handle_invalid_location')
+        self.machine.add_transition('data_processed', 'processing', 'initial', after='_format_response')
+        self.machine.add_transition('error_occurred', 'processing', 'initial', after='_format_error')
+
+    _has_valid_location = ChatbotLogic._has_valid_location
+    _is_location_missing = ChatbotLogic._is_location_missing
+    _ask_for_location = ChatbotLogic._ask_for_location
+    _handle_invalid_location = ChatbotLogic._handle_invalid_location
+    _trigger_data_processing = ChatbotLogic._trigger_data_processing
+    _format_response = ChatbotLogic._format_response
+    _format_error = ChatbotLogic._format_error
+
+
+async def first_message(cls, n: int) -> float:
+    """Średni czas: nowa sesja + 'trigger_intent' bez lokalizacji (-> 'Podaj miasto.')."""
+    t0 = time.perf_counter()
+    for i in range(n):
+        logic = cls(f"s{i}")
+        logic.current_intent = 'pogoda'
+        await logic.trigger('trigger_intent')
+    return (time.perf_counter() - t0) / n
+
+
+def memory(cls, n: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    sessions = [cls(f"s{i}") for i in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    gc.collect()
+    return size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{'':>22} | {'pierwsza wiadomość':>18} | {f'pamięć / {n} sesji':>20}")
+    results = {}
+    for label, cls in (("AsyncMachine / sesja", LegacyChatbotLogic), ("CompiledMachine", ChatbotLogic)):
+        latency = asyncio.run(first_message(cls, 2000))
+        size = memory(cls, n)
+        results[label] = (latency, size)
+        print(f"{label:>22} | {latency * 1e6:13.1f} µs | {size / 2**20:16.1f} MiB")
+    (old_t, old_m), (new_t, new_m) = results.values()
+    print(f"Przyspieszenie: x{old_t / new_t:.0f}, pamięć: x{old_m / new_m:.0f} mniej")
+
+
+if __name__ == "__main__":
+    main()
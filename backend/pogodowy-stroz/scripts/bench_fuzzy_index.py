@@ -0,0 +1,93 @@
+# scripts/bench_fuzzy_index.py
+# Porównanie FuzzyIndex ze starym liniowym skanem z DataService._smart_find_key.
+# Uruchomienie (z folderu pogodowy-stroz): python scripts/bench_fuzzy_index.py
+import difflib
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.data_service import DataService
+from app.services.fuzzy_index import FuzzyIndex
+
+# Typowe kandydaty z wiadomości: nazwy odmienione, literówki, całe zdania i śmieci
+SAMPLE_QUERIES = [
+    "warszawa", "warszawie", "wrocławiu", "krakowie", "gdansk", "poznaniu", "lodzi",
+    "skrzynice", "kołobrzeg", "zakopanem", "bielsko biala", "pogoda w warszawie",
+    "stan wody wisla krakow", "odra we wroclawiu", "powiat poznanski", "ostrzezenia dla powiatu tatrzanskiego",
+    "xyzqw", "temperatura", "jaka jest pogoda", "sprawdz",
+]
+
+
+def legacy_find(norm_cand: str, dictionary: dict, threshold: float):
+    """Kopia starego algorytmu (przed FuzzyIndex) - punkt odniesienia."""
+    if norm_cand in dictionary: return norm_cand
+    for key in dictionary.keys():
+        if key == norm_cand: return key
+        if len(key) > 3 and len(norm_cand) > 3:
+            if key in norm_cand or norm_cand in key:
+                return key
+    matches = difflib.get_close_matches(norm_cand, dictionary.keys(), n=1, cutoff=threshold)
+    return matches[0] if matches else None
+
+
+def mutate(word: str, rng: random.Random) -> str:
+    chars = list(word)
+    for _ in range(rng.randint(0, 2)):
+        if not chars: break
+        pos = rng.randrange(len(chars))
+        op = rng.randint(0, 2)
+        if op == 0: chars.insert(pos, rng.choice("abcdeilnorswyz"))
+        elif op == 1: chars.pop(pos)
+        else: chars[pos] = rng.choice("abcdeilnorswyz")
+    return "".join(chars)
+
+
+def bench(name: str, dictionary: dict, threshold: float, queries: list[str]):
+    t0 = time.perf_counter()
+    index = FuzzyIndex(dictionary)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    legacy_total = indexed_total = 0.0
+    worst = 0.0
+    mismatches = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        expected = legacy_find(q, dictionary, threshold)
+        t1 = time.perf_counter()
+        got = index.find(q, threshold)
+        t2 = time.perf_counter()
+        legacy_total += t1 - t0
+        indexed_total += t2 - t1
+        worst = max(worst, t2 - t1)
+        if got != expected:
+            mismatches += 1
+            print(f"   ❌ RÓŻNICA [{name}] '{q}': skan={expected} indeks={got}")
+
+    n = len(queries)
+    print(f"{name:>6} | kluczy: {len(dictionary):>6} | budowa: {build_ms:7.1f} ms | "
+          f"skan: {legacy_total / n * 1000:8.3f} ms/zap. | indeks: {indexed_total / n * 1000:6.3f} ms/zap. "
+          f"(max {worst * 1000:.3f}) | różnice: {mismatches}")
+
+
+def main():
+    ds = DataService()
+    rng = random.Random(13)
+
+    targets = [
+        ("terc", ds.terc_dict, 0.85),
+        ("hydro", ds.map_hydro, 0.85),
+        ("synop", ds.synop_names_map, 0.90),
+        ("simc", ds.simc_dict, 0.90),
+    ]
+    for name, dictionary, threshold in targets:
+        keys = list(dictionary.keys())
+        queries = [ds._normalize(q) for q in SAMPLE_QUERIES]
+        queries += [mutate(rng.choice(keys), rng) for _ in range(200)] if keys else []
+        bench(name, dictionary, threshold, queries)
+
+
+if __name__ == "__main__":
+    main()
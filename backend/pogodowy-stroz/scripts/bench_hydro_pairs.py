@@ -0,0 +1,100 @@
+# scripts/bench_hydro_pairs.py
+# Kroki "kontekst miasta" i "pary słów" z gałęzi hydro w validate_and_get_id:
+# dawne skany wszystkich kluczy map_hydro vs indeks odwrócony (TokenIndex).
+#   1. zgodność: TokenIndex.containing(q) == {k : q in k} dla słów z kluczy i korpusu,
+#      a wybrany klucz należy do zbioru wszystkich trafień dawnej pętli (kod wyjścia 1 przy błędzie),
+#   2. czas dla coraz dłuższych wiadomości.
+# Uruchomienie: python scripts/bench_hydro_pairs.py
+import random
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / "scripts"))
+
+from app.core.text import normalize
+from app.services.data_service import DataService, STOPWORDS
+from bench_keywords import CORPUS, load_corpus
+
+
+def legacy_pairs_all(words: list[str], map_hydro) -> list[str]:
+    """Wszystkie klucze, które dawna pętla mogła zwrócić (zwracała pierwszy z nich)."""
+    hits = []
+    for i in range(len(words)):
+        for j in range(len(words)):
+            if i == j: continue
+            for key in map_hydro:
+                if words[i] in key and words[j] in key: hits.append(key)
+    return hits
+
+
+def legacy_pairs_first(words: list[str], map_hydro):
+    for i in range(len(words)):
+        for j in range(len(words)):
+            if i == j: continue
+            for key in map_hydro:
+                if words[i] in key and words[j] in key: return key
+    return None
+
+
+def indexed_pairs(words: list[str], tokens):
+    matches = set()
+    for i, w1 in enumerate(words):
+        for w2 in words[i + 1:]:
+            matches |= tokens.containing_all(w1, w2)
+    return tokens.best(matches, words)
+
+
+def content_words(text: str) -> list[str]:
+    return [w for w in normalize(text).split() if len(w) > 3 and w not in STOPWORDS]
+
+
+def main():
+    ds = DataService()
+    keys = list(ds.map_hydro.keys())
+    tokens = ds.hydro_tokens
+    rng = random.Random(0)
+    errors = 0
+
+    probes = {t for k in keys for t in k.split()} | {t[1:-1] for k in keys for t in k.split() if len(t) > 3}
+    probes |= {w for q in load_corpus(CORPUS) for w in normalize(q).split()}
+    probes |= {" ".join(k.split()[:2]) for k in keys} | {"", "a", "sla kra", "wisla  krakow"}
+    for q in sorted(probes):
+        expected = {i for i, k in enumerate(keys) if q in k}
+        if set(tokens.containing(q)) != expected:
+            errors += 1
+            print(f"  containing NIEZGODNE: {q!r}")
+
+    messages = [content_words(q) for q in load_corpus(CORPUS)]
+    vocab = sorted({t for k in keys for t in k.split() if len(t) > 3})
+    messages += [rng.sample(vocab, n) for n in (2, 3, 4, 6, 8) for _ in range(20)]
+    for words in messages:
+        if len(words) < 2: continue
+        hits = legacy_pairs_all(words, keys)
+        got = indexed_pairs(words, tokens)
+        if (got is None) != (not hits) or (got is not None and got not in hits):
+            errors += 1
+            print(f"  pary NIEZGODNE: {words}: {got!r}")
+    if errors:
+        print(f"Błędy: {errors}")
+        sys.exit(1)
+    print(f"Zgodność: OK ({len(probes)} podciągów, {len(messages)} wiadomości)")
+
+    print(f"{'słów':>5} | {'dawniej':>10} | {'indeks':>10} | przyspieszenie")
+    for n in (2, 4, 8, 16):
+        # Słowa spoza słownika - dawna pętla przechodzi wszystkie pary i wszystkie klucze
+        batch = [[f"{w}x" for w in rng.sample(vocab, n)] for _ in range(10)]
+        t0 = time.perf_counter()
+        for words in batch: legacy_pairs_first(words, keys)
+        old = (time.perf_counter() - t0) / len(batch)
+        tokens.containing.cache_clear()
+        t0 = time.perf_counter()
+        for words in batch: indexed_pairs(words, tokens)
+        new = (time.perf_counter() - t0) / len(batch)
+        print(f"{n:>5} | {old * 1000:7.2f} ms | {new * 1000:7.3f} ms | x{old / new:.0f}")
+
+
+if __name__ == "__main__":
+    main()
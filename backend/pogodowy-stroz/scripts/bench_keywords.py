@@ -0,0 +1,94 @@
+# scripts/bench_keywords.py
+# Słowa kluczowe / rzeki / stopwords: dawne pętle `any(kw in text ...)` vs jeden przebieg KeywordMatcher.
+# Najpierw sprawdza zgodność wyników na korpusie (kod wyjścia 1 przy niezgodności), potem mierzy czas.
+# Uruchomienie: python scripts/bench_keywords.py [plik_z_zapytaniami]
+import sys
+import timeit
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from app.core.text import normalize
+from app.logic.nlp import STRONG_KEYWORDS, _keyword_intent, _text_intent
+from app.services.data_service import (
+    DataService, STOPWORDS, STRONG_HYDRO_KEYWORDS, STRONG_WARNING_KEYWORDS, STRONG_WEATHER_KEYWORDS,
+)
+
+CORPUS = BASE_DIR / "scripts" / "corpus" / "queries_pl.txt"
+
+
+def load_corpus(path: Path) -> list[str]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def legacy_routing(text: str, known_rivers: set) -> tuple:
+    """Kopia dawnej logiki z validate_and_get_id: trzy skany słów kluczowych + pętla po rzekach."""
+    has_warning = any(kw in text for kw in STRONG_WARNING_KEYWORDS)
+    has_weather = any(kw in text for kw in STRONG_WEATHER_KEYWORDS)
+    has_hydro = any(kw in text for kw in STRONG_HYDRO_KEYWORDS)
+    has_river = False
+    for word in text.split():
+        if word in known_rivers:
+            has_river = True
+            break
+    words = [w for w in text.split() if len(w) > 3 and w not in STOPWORDS]
+    return has_warning, has_weather, has_hydro, has_river, words
+
+
+def matcher_routing(text: str, matcher) -> tuple:
+    found = matcher.scan(text)
+    stopwords = found.get('stop', ())
+    words = [w for w in text.split() if len(w) > 3 and w not in stopwords]
+    return 'ostrzeżenia' in found, 'pogoda' in found, 'hydro' in found, 'river' in found, words
+
+
+def main():
+    corpus = load_corpus(Path(sys.argv[1]) if len(sys.argv) > 1 else CORPUS)
+    ds = DataService()
+    rivers, matcher = ds.known_rivers, ds.routing_matcher
+    lowered = [q.lower() for q in corpus]
+    normalized = [normalize(q) for q in corpus]
+    print(f"Korpus: {len(corpus)} zapytań | rzek: {len(rivers)} | stanów automatu: {matcher.states}")
+
+    mismatches = 0
+    for q, low, norm in zip(corpus, lowered, normalized):
+        if _keyword_intent(low) != _text_intent(low):
+            mismatches += 1
+            print(f"  intencja NIEZGODNA: {q!r}: {_keyword_intent(low)} != {_text_intent(low)}")
+        if legacy_routing(norm, rivers) != matcher_routing(norm, matcher):
+            mismatches += 1
+            print(f"  routing NIEZGODNY: {q!r}")
+    if mismatches:
+        print(f"Niezgodności: {mismatches}")
+        sys.exit(1)
+    print("Zgodność: OK")
+
+    cases = {
+        "intencja (nlp)": (lambda: [_keyword_intent(t) for t in lowered], lambda: [_text_intent(t) for t in lowered]),
+        "routing (data_service)": (
+            lambda: [legacy_routing(t, rivers) for t in normalized],
+            lambda: [matcher_routing(t, matcher) for t in normalized],
+        ),
+    }
+    number = 200
+    print(f"{'etap':>24} | {'dawniej':>12} | {'automat':>12} | przyspieszenie")
+    for label, (old_fn, new_fn) in cases.items():
+        old = min(timeit.repeat(old_fn, number=number, repeat=5)) / (number * len(corpus))
+        new = min(timeit.repeat(new_fn, number=number, repeat=5)) / (number * len(corpus))
+        print(f"{label:>24} | {old * 1e6:7.2f} µs/q | {new * 1e6:7.2f} µs/q | x{old / new:.2f}")
+
+    # Skalowanie: koszt dawnej pętli rośnie z liczbą słów kluczowych, automatu - nie
+    extra = {f"kw{i}x" for i in range(500)}
+    legacy_big = [kw for kws in STRONG_KEYWORDS.values() for kw in kws] + sorted(extra)
+    from app.core.keywords import KeywordMatcher
+    big = KeywordMatcher({"all": legacy_big})
+    old = min(timeit.repeat(lambda: [any(kw in t for kw in legacy_big) for t in lowered], number=20, repeat=3))
+    new = min(timeit.repeat(lambda: [bool(big.scan(t)) for t in lowered], number=20, repeat=3))
+    print(f"{'+500 słów kluczowych':>24} | {old / (20 * len(corpus)) * 1e6:7.2f} µs/q | "
+          f"{new / (20 * len(corpus)) * 1e6:7.2f} µs/q | x{old / new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# scripts/bench_nlp_startup.py
+# Start workera przed/po leniwym ładowaniu spaCy: czas do gotowości health checka,
+# czas rozgrzania NLP oraz RSS. Każdy pomiar w osobnym procesie.
+# Uruchomienie: python scripts/bench_nlp_startup.py
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+COMMON = r"""
+import json, sys, time
+sys.path.insert(0, {base!r})
+def rss_mib():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+"""
+
+# Dawniej: pełny pipeline ładowany przy imporcie app.logic.nlp (przed pierwszym requestem)
+BEFORE = COMMON + r"""
+t0 = time.perf_counter()
+import app.main
+try:
+    import spacy
+    spacy.load("pl_core_news_sm")
+    ok = True
+except (ImportError, OSError):
+    ok = False
+print(json.dumps({{"model": ok, "import_app_s": time.perf_counter() - t0, "rss_app": rss_mib()}}))
+"""
+
+# Teraz: import aplikacji bez modelu, potem get_nlp() (to samo robi warm_up() w tle)
+AFTER = COMMON + r"""
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+rss_app = rss_mib()
+from app.logic.nlp import get_nlp
+nlp = get_nlp()
+t2 = time.perf_counter()
+print(json.dumps({{"model": nlp is not None, "import_app_s": t1 - t0, "rss_app": rss_app,
+                  "warm_s": t2 - t1, "rss_warm": rss_mib(), "pipeline": list(nlp.pipe_names) if nlp else []}}))
+"""
+
+
+def run(code: str) -> dict:
+    out = subprocess.run([sys.executable, "-c", code.format(base=str(BASE_DIR))],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    before = run(BEFORE)
+    after = run(AFTER)
+    if not after["model"]:
+        print("UWAGA: brak modelu pl_core_news_sm - mierzę tylko tryb uproszczony "
+              "(python -m spacy download pl_core_news_sm).")
+    print(f"Dawniej (pełny pipeline przy imporcie): {before['import_app_s']:.2f} s, RSS {before['rss_app']:.0f} MiB")
+    print(f"Teraz - health check gotowy po:         {after['import_app_s']:.2f} s, RSS {after['rss_app']:.0f} MiB")
+    print(f"Teraz - NLP rozgrzane po dodatkowych:   {after['warm_s']:.2f} s, RSS {after['rss_warm']:.0f} MiB")
+    if after["pipeline"]: print(f"Komponenty: {', '.join(after['pipeline'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# scripts/bench_normalize.py
+# Mikro-benchmark normalizacji: dawna pętla replace + NFD vs app.core.text.normalize.
+# Uruchomienie: python scripts/bench_normalize.py
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from app.core.text import normalize
+from check_normalize_parity import legacy_normalize
+
+CASES = {
+    "krótka ASCII": "warszawa",
+    "krótka PL": "Wrocławiu",
+    "zdanie": "Jaka jest pogoda w Bielsku-Białej i Kędzierzynie-Koźlu?",
+    "obce znaki": "Müller Ærø",
+}
+
+
+def main():
+    number = 50000
+    print(f"{'przypadek':>14} | {'stemming':>8} | {'dawniej':>10} | {'teraz':>10} | przyspieszenie")
+    for label, text in CASES.items():
+        for stem in (False, True):
+            old = min(timeit.repeat(lambda: legacy_normalize(text, stem), number=number, repeat=3)) / number
+            new = min(timeit.repeat(lambda: normalize(text, stem), number=number, repeat=3)) / number
+            print(f"{label:>14} | {str(stem):>8} | {old * 1e6:7.2f} µs | {new * 1e6:7.2f} µs | x{old / new:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# scripts/bench_resolution_cache.py
+# validate_and_get_id z cache wyników (ResolutionCache) vs pełne przeliczenie.
+#   1. zgodność: dla każdego zapytania z korpusu wynik z cache == wynik bez cache
+#      (także po reload_data, który musi wyczyścić cache; kod wyjścia 1 przy błędzie),
+#   2. ruch "skośny" (rozkład Zipfa po zapytaniach korpusu): czas na zapytanie i hit ratio.
+# Uruchomienie: python scripts/bench_resolution_cache.py [liczba_zapytań]
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / "scripts"))
+os.environ.setdefault("GEOCODER_FALLBACK", "0")
+
+from app.logic.nlp import parse_message
+from app.services.data_service import DataService
+from bench_keywords import CORPUS, load_corpus
+
+INTENTS = (None, 'pogoda', 'hydro', 'ostrzeżenia')
+
+
+def workload(queries: list[str]) -> list[tuple]:
+    """(tekst, encje, intencja, kontekst miasta) - intencja z NLP albo kolejna z listy."""
+    jobs = []
+    for i, text in enumerate(queries):
+        parsed = parse_message(text)
+        intent = parsed.intent or INTENTS[i % len(INTENTS)] or 'pogoda'
+        jobs.append((text, parsed.entities, intent, "Kraków" if i % 5 == 0 else None))
+    return jobs
+
+
+def check(service: DataService, jobs: list[tuple]) -> int:
+    errors = 0
+    for text, entities, intent, ctx in jobs:
+        expected = service._validate_and_get_id(entities, intent, text, ctx)
+        for _ in range(2):  # chybienie, potem trafienie
+            got = service.validate_and_get_id(entities, intent, text, ctx)
+            if got != expected:
+                errors += 1
+                print(f"RÓŻNICA: {text!r} ({intent}, {ctx}): {got} != {expected}")
+    return errors
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    service = DataService()
+    jobs = workload(load_corpus(CORPUS))
+
+    errors = check(service, jobs)
+    service.reload_data()
+    if service.resolution_cache.stats()["size"]: errors += 1; print("reload_data nie wyczyścił cache")
+    errors += check(service, jobs)
+    print(f"Zgodność: {len(jobs)} zapytań x 2 ładowania, różnic: {errors}")
+
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(len(jobs))]
+    traffic = rng.choices(jobs, weights=weights, k=n)
+
+    t0 = time.perf_counter()
+    for text, entities, intent, ctx in traffic: service._validate_and_get_id(entities, intent, text, ctx)
+    uncached = (time.perf_counter() - t0) / n
+
+    service.reload_data()
+    t0 = time.perf_counter()
+    for text, entities, intent, ctx in traffic: service.validate_and_get_id(entities, intent, text, ctx)
+    cached = (time.perf_counter() - t0) / n
+
+    stats = service.resolution_cache.stats()
+    print(f"Bez cache: {uncached * 1e6:8.1f} µs / zapytanie")
+    print(f"Z cache:   {cached * 1e6:8.1f} µs / zapytanie (hit ratio {stats['hit_ratio']:.1%}, x{uncached / cached:.0f})")
+    print(stats)
+    if errors: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# scripts/bench_startup.py
+# Czas startu DataService i pamięć procesu: data_bundle.bin (mmap) vs dotychczasowe JSON-y.
+# Każdy wariant mierzony w osobnym procesie. Uruchomienie: python scripts/bench_startup.py [powtórzenia]
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {base!r})
+t0 = time.perf_counter()
+from app.services.data_service import DataService
+t1 = time.perf_counter()
+ds = DataService()
+t2 = time.perf_counter()
+ds._smart_find_key("wroclawiem", ds.simc_index)  # pierwsze zapytanie (dociąga strony mmap)
+t3 = time.perf_counter()
+
+mem = {{}}
+try:
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile"):
+                mem[key] = int(value.split()[0]) / 1024
+except OSError:
+    import resource
+    mem["VmRSS"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({{"import_s": t1 - t0, "init_s": t2 - t1, "first_query_ms": (t3 - t2) * 1000, **mem}}))
+"""
+
+
+def run(label: str, bundle: str | None) -> dict:
+    env = dict(os.environ)
+    if bundle is not None: env["DATA_BUNDLE"] = bundle
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(base=str(BASE_DIR))],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    if not (BASE_DIR / "app" / "data" / "data_bundle.bin").exists():
+        print("Brak data_bundle.bin - uruchom najpierw scripts/build_data_bundle.py")
+        return
+
+    for label, bundle in (("JSON", "0"), ("bundle", None)):
+        results = [run(label, bundle) for _ in range(repeats)]
+        best = min(results, key=lambda r: r["init_s"])
+        mem = " | ".join(f"{k}: {best[k]:.1f} MiB" for k in ("VmRSS", "RssAnon", "RssFile") if k in best)
+        print(f"{label:>7} | init: {best['init_s'] * 1000:7.1f} ms | pierwsze zapytanie: "
+              f"{best['first_query_ms']:6.2f} ms | {mem}")
+    print("RssFile to strony pliku (mmap) - współdzielone między workerami uvicorna.")
+
+
+if __name__ == "__main__":
+    main()
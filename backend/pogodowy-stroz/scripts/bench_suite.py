@@ -0,0 +1,198 @@
+# scripts/bench_suite.py
+# Zestaw benchmarków ścieżek krytycznych: rozumienie wiadomości, rozpoznanie lokalizacji, formatowanie.
+# Działa offline: korpus scripts/corpus/queries_pl.txt, IMGW zastąpione atrapą (scripts/imgw_stub.py),
+# Nominatim wyłączony. Wynik (µs / operację) trafia do JSON, który można porównać z poprzednim commitem.
+# Uruchomienie:
+#   python scripts/bench_suite.py                                   -> bench_results/<commit>.json
+#   python scripts/bench_suite.py --compare bench_results/abc123.json   (kod wyjścia 1 przy regresji)
+#   python scripts/bench_suite.py --only data.validate --min-time 1   (prefiks nazwy: nlp. / data. / format.)
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / "scripts"))
+os.environ.setdefault("GEOCODER_FALLBACK", "0")
+os.environ.setdefault("UNDERSTANDING_EXECUTOR", "inline")
+
+from app.logic.nlp import extract_entities, get_nlp, nlp_status, parse_message, recognize_intent, sanitize_text
+from app.services.data_service import DataService
+from bench_keywords import CORPUS, load_corpus
+from imgw_stub import StubImgwClient, build_fixture
+
+RESULTS_DIR = BASE_DIR / "bench_results"
+# Ile rund pomiaru; wynik to mediana z rund (odporna na pojedyncze zakłócenia)
+ROUNDS = 5
+# Próg regresji przy --compare: mediana wolniejsza o więcej niż tyle (ułamek)
+REGRESSION_THRESHOLD = 0.15
+
+
+def measure(batch, ops: int, min_time: float) -> dict:
+    """batch() wykonuje `ops` operacji; powtarzamy go tak, by runda trwała >= min_time / ROUNDS."""
+    batch()  # rozgrzewka (leniwe indeksy, cache wyrażeń regularnych)
+    t0 = time.perf_counter()
+    batch()
+    single = max(time.perf_counter() - t0, 1e-6)
+    loops = max(1, int(min_time / ROUNDS / single))
+    per_op = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        for _ in range(loops): batch()
+        per_op.append((time.perf_counter() - t0) / (loops * ops))
+    return {
+        "median_us": round(statistics.median(per_op) * 1e6, 3),
+        "min_us": round(min(per_op) * 1e6, 3),
+        "max_us": round(max(per_op) * 1e6, 3),
+        "ops": ops * loops * ROUNDS,
+    }
+
+
+def build_cases(service: DataService, corpus: list[str]) -> dict:
+    """nazwa -> (batch, liczba operacji w batchu). Każdy batch przechodzi cały swój zestaw danych."""
+    cases = {}
+    clean = [sanitize_text(text) for text in corpus]
+    parsed = [parse_message(text) for text in clean]
+
+    def over(items, fn):
+        items = list(items)
+        return (lambda: [fn(item) for item in items]), len(items)
+
+    cases["nlp.sanitize_text"] = over(corpus, sanitize_text)
+    cases["nlp.recognize_intent"] = over(clean, recognize_intent)
+    cases["nlp.extract_entities"] = over(clean, extract_entities)
+    cases["nlp.parse_message"] = over(clean, parse_message)
+    cases["data.normalize"] = over(corpus, service._normalize)
+
+    words = {w for text in corpus for w in service._normalize(text).split() if len(w) > 3}
+    candidates = sorted(words) + corpus
+    for name in ("terc", "simc", "synop", "hydro"):
+        index = getattr(service, f"{name}_index")
+        cases[f"data.smart_find_key.{name}"] = over(candidates, lambda c, index=index: service._smart_find_key(c, index))
+
+    # validate_and_get_id: bez cache, osobno dla każdej gałęzi (według intencji, do której trafia wiadomość)
+    jobs = [(text, p.entities, p.intent or 'pogoda') for text, p in zip(clean, parsed)]
+    branches: dict[str, list] = {}
+    for job in jobs:
+        branches.setdefault(service._validate_and_get_id(job[1], job[2], job[0])[1], []).append(job)
+    for branch, branch_jobs in sorted(branches.items()):
+        cases[f"data.validate_and_get_id.{branch}"] = over(branch_jobs, lambda j: service._validate_and_get_id(j[1], j[2], j[0]))
+    cases["data.validate_and_get_id.cached"] = over(jobs, lambda j: service.validate_and_get_id(j[1], j[2], j[0]))
+
+    places = sorted(w for w in words if service.gazetteer.lookup(w)) or ["skrzynice"]
+    cases["data.find_nearest_station"] = over(places, service.find_nearest_station)
+
+    fixture = service.imgw_client.fixture
+    synop, hydro = fixture["synop"], fixture["hydro"]
+    cases["format.weather"] = over(synop, lambda rec: service._format_weather(rec, ""))
+    cases["format.weather_nearest"] = over(synop, lambda rec: service._format_weather(rec, "NEAREST|skrzynice|Kraków|12.3"))
+    cases["format.hydro"] = over(hydro, lambda rec: service._format_hydro([rec], ""))
+    by_id = {rec["id_stacji"]: rec for rec in hydro}
+    rivers = [key for key in service.hydro_catalog.river_keys if len(service.hydro_catalog.gauges(key)) > 1]
+    cases["format.river"] = over(rivers, lambda key: service._format_river(
+        key, service.hydro_catalog.gauges(key), {sid: by_id.get(sid) for sid, _ in service.hydro_catalog.gauges(key)}
+    ))
+    warnings = {code: [w for w in fixture["warnings"] if code in w["powiaty_kod"]] for code in service.terc_id_to_name}
+    cases["format.warnings"] = over(warnings.items(), lambda item: service._format_warnings(item[1], item[0], ""))
+
+    # fetch_data z atrapą IMGW: świeża migawka / indeks ostrzeżeń (ścieżka typowego zapytania)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(service.snapshot.refresh())
+    targets = {
+        'pogoda': [rec["id_stacji"] for rec in synop],
+        'hydro': [rec["id_stacji"] for rec in hydro[:200]],
+        'ostrzeżenia': sorted(service.terc_id_to_name)[:200],
+    }
+    for intent, ids in targets.items():
+        async def run(intent=intent, ids=ids):
+            for loc_id in ids: await service.fetch_data(intent, loc_id, "")
+        cases[f"data.fetch_data.{intent}"] = (lambda run=run: loop.run_until_complete(run())), len(ids)
+    return cases
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BASE_DIR, capture_output=True, text=True, timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "app"))}
+
+
+def compare(results: dict, baseline_path: Path, threshold: float) -> list[str]:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    print(f"\nPorównanie z {baseline_path} (próg {threshold:.0%}):")
+    regressions = []
+    for name, current in results.items():
+        old = baseline.get(name)
+        if not old: continue
+        ratio = current["median_us"] / old["median_us"] if old["median_us"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- REGRESJA"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  (szybciej)"
+        print(f"{name:>40} | {old['median_us']:10.2f} -> {current['median_us']:10.2f} µs | x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline'owe benchmarki ścieżek krytycznych czatbota.")
+    parser.add_argument("--out", type=Path, help="plik JSON z wynikami (domyślnie bench_results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="poprzedni plik JSON do porównania")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--min-time", type=float, default=0.5, help="sekund pomiaru na benchmark")
+    parser.add_argument("--only", default="", help="tylko benchmarki z tym prefiksem nazwy")
+    args = parser.parse_args()
+
+    get_nlp()
+    service = DataService()
+    service.imgw_client = StubImgwClient(build_fixture(service))
+    service.snapshot.client = service.warnings_index.client = service.imgw_client
+    corpus = load_corpus(CORPUS)
+
+    results = {}
+    cases = build_cases(service, corpus)
+    selected = [name for name in cases if name.startswith(args.only)]
+    if not selected:
+        print(f"Żaden benchmark nie zaczyna się od '{args.only}'. Dostępne: {', '.join(cases)}")
+        sys.exit(1)
+    print(f"{'benchmark':>40} | {'mediana':>10} | {'min':>10} | operacji")
+    for name in selected:
+        batch, ops = cases[name]
+        results[name] = measure(batch, ops, args.min_time)
+        r = results[name]
+        print(f"{name:>40} | {r['median_us']:7.2f} µs | {r['min_us']:7.2f} µs | {r['ops']}")
+
+    revision = git_revision()
+    report = {
+        "meta": {
+            **revision,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "nlp": nlp_status()["state"],
+            "corpus": len(corpus),
+            "min_time_s": args.min_time,
+        },
+        "results": results,
+    }
+    out = args.out or RESULTS_DIR / f"{revision['commit'] or 'wynik'}{'-dirty' if revision['dirty'] else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\nZapisano: {out}")
+
+    if args.compare and compare(results, args.compare, args.threshold): sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
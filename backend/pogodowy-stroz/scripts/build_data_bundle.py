@@ -0,0 +1,61 @@
+# scripts/build_data_bundle.py
+# Buduje app/data/data_bundle.bin: znormalizowane słowniki (terc / simc / hydro) razem
+# z gotowymi indeksami FuzzyIndex. DataService mapuje plik w pamięci (mmap), więc
+# start nie parsuje JSON-ów, a workery uvicorna współdzielą te same strony pamięci.
+# Przy okazji buduje app/data/gazetteer.bin (miejscowości SIMC + współrzędne PRNG),
+# gdy w raw_data/ jest plik PRNG - bez gazetteera miejscowości rozwiązuje tylko Nominatim.
+# Uruchom po każdej zmianie plików JSON (prepare_teryt.py / create_hydro_map.py).
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.services.bundle import fingerprint, write_bundle
+from app.services.data_service import DATA_DIR, DATA_BUNDLE, GAZETTEER_PATH, NORMALIZED_SOURCES, DataService
+from app.services.gazetteer import Gazetteer
+
+
+def build_gazetteer():
+    # pandas (prepare_teryt) potrzebny tylko tutaj
+    import prepare_teryt
+
+    simc_path = DATA_DIR / "simc_dict.json"
+    prng_path = prepare_teryt.RAW_DATA_DIR / prepare_teryt.COORDS_FILENAME
+    if not simc_path.exists() or not prng_path.exists():
+        missing = [str(p) for p in (simc_path, prng_path) if not p.exists()]
+        print("!" * 72)
+        print(f"UWAGA: brak {', '.join(missing)} - gazetteer.bin NIE został zbudowany.")
+        if len(Gazetteer.load(GAZETTEER_PATH)): print(f"   Zostaje dotychczasowy {GAZETTEER_PATH}.")
+        else: print("   Wyszukiwanie miejscowości offline nie działa (tylko Nominatim, jeśli GEOCODER_FALLBACK=1).")
+        print("!" * 72)
+        return
+    with open(simc_path, "r", encoding="utf-8") as f: simc = json.load(f)
+    gazetteer = prepare_teryt.prepare_gazetteer(simc)
+    if not gazetteer:
+        print(f"UWAGA: {prng_path} nie dał żadnych współrzędnych (sprawdź COORDS_COLUMNS w prepare_teryt.py).")
+        return
+    prepare_teryt.write_gazetteer(GAZETTEER_PATH, gazetteer)
+    print(f"Zapisano {GAZETTEER_PATH} ({len(gazetteer)} miejscowości ze współrzędnymi).")
+
+
+def main():
+    build_gazetteer()
+    if DATA_BUNDLE in ("", "0"):
+        print("DATA_BUNDLE=0 - bundle wyłączony, nic do zrobienia.")
+        return
+
+    t0 = time.perf_counter()
+    sources = [DATA_DIR / f for f in NORMALIZED_SOURCES.values()]
+    tables = {name: DataService._load_and_normalize_keys(DATA_DIR / f) for name, f in NORMALIZED_SOURCES.items()}
+    for name, table in tables.items():
+        print(f"   {name}: {len(table)} kluczy")
+
+    out_path = Path(DATA_BUNDLE)
+    size = write_bundle(out_path, tables, fingerprint(sources))
+    print(f"Zapisano {out_path} ({size / 1024:.0f} KiB) w {time.perf_counter() - t0:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
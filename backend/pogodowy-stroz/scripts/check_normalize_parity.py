@@ -0,0 +1,105 @@
+# scripts/check_normalize_parity.py
+# Sprawdza, że normalizacja jest jedna i spójna:
+#   1. app.core.text.normalize == dawne DataService._normalize (kopia referencyjna poniżej),
+#   2. normalize jest idempotentne (klucz offline znormalizowany ponownie online się nie zmienia),
+#   3. skrypty offline (prepare_teryt / create_station_map / create_hydro_map) dają te same klucze co backend,
+#   4. wszystkie klucze załadowane przez DataService są już w postaci kanonicznej.
+# Uruchomienie: python scripts/check_normalize_parity.py  (kod wyjścia 1 przy niezgodności)
+import importlib
+import json
+import random
+import sys
+import unicodedata
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+sys.path.append(str(BASE_DIR / "scripts"))
+
+from app.core.text import normalize
+from app.services.data_service import DataService
+
+LEGACY_SUFFIXES = ['ach', 'ami', 'iem', 'owi', 'om', 'ie', 'iu', 'y', 'a', 'e', 'u', 'i']
+
+SAMPLES = [
+    "Gdańsk", "ŁÓDŹ", "Źródła", "Bielsko-Biała", "  Zielona Góra ", "Kędzierzyn-Koźle", "Świnoujście",
+    "Wrocławiu", "Krakowie", "Poznaniem", "Żółć", "Müller", "Ærø", "İstanbul", "é", "ǅ", "ß", "",
+    "Jez. Drużno", "powiat bolesławiecki", "Sanok-Olchowce", "Nowy Targ", "KOŁOBRZEG",
+]
+
+
+def legacy_normalize(text: str, stemming=False):
+    """Kopia DataService._normalize sprzed wydzielenia app.core.text."""
+    if not text: return ""
+    text = text.lower()
+    replacements = {'ą': 'a', 'ć': 'c', 'ę': 'e', 'ł': 'l', 'ń': 'n', 'ó': 'o', 'ś': 's', 'ź': 'z', 'ż': 'z'}
+    for k, v in replacements.items(): text = text.replace(k, v)
+    text = unicodedata.normalize("NFD", text)
+    text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+    text = text.strip()
+    if stemming and len(text) > 4:
+        for suffix in LEGACY_SUFFIXES:
+            if text.endswith(suffix): return text[:-len(suffix)]
+    return text
+
+
+def corpus() -> list[str]:
+    texts = list(SAMPLES)
+    for name in ("terc_dict.json", "simc_dict.json", "map_hydro.json", "station_coords.json"):
+        path = BASE_DIR / "app" / "data" / name
+        if not path.exists(): continue
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        texts.extend(data.keys())
+        texts.extend(v["name"] for v in data.values() if isinstance(v, dict) and v.get("name"))
+    rng = random.Random(9)
+    alphabet = "aąbcćdeęfghijklłmnńoóprsśtuwyzźżAĄCĆEĘŁŃÓŚŹŻ -.éüöçř̨́"
+    texts.extend("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 20))) for _ in range(20000))
+    return texts
+
+
+def script_normalizers() -> dict:
+    found = {}
+    for module, attr in (("prepare_teryt", "normalize_text"), ("create_station_map", "normalize_text"),
+                         ("create_hydro_map", "normalize")):
+        try:
+            found[module] = getattr(importlib.import_module(module), attr)
+        except ImportError as e:
+            print(f"   (pomijam {module}: {e})")
+    return found
+
+
+def main():
+    failures = 0
+    texts = corpus()
+    print(f"Korpus: {len(texts)} napisów")
+
+    def check(label, ok, detail):
+        nonlocal failures
+        if not ok:
+            failures += 1
+            if failures <= 20: print(f"   ❌ {label}: {detail}")
+
+    for t in texts:
+        for stem in (False, True):
+            check("legacy", normalize(t, stem) == legacy_normalize(t, stem), f"{t!r} stemming={stem}")
+        n = normalize(t)
+        check("idempotencja", normalize(n) == n, repr(t))
+
+    for module, fn in script_normalizers().items():
+        for t in texts:
+            check(module, fn(t) == DataService._normalize(t), repr(t))
+
+    ds = DataService()
+    for name in ("terc_index", "simc_index", "hydro_index", "synop_index"):
+        for key in getattr(ds, name).mapping:
+            check(f"klucz {name}", normalize(key) == key, repr(key))
+
+    if failures:
+        print(f"NIEZGODNOŚCI: {failures}")
+        sys.exit(1)
+    print("OK: normalizacja spójna (backend == skrypty == dawna implementacja).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 import httpx
 import json
-import unicodedata
+import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.text import normalize  # Ta sama normalizacja co w DataService
+
 # Ścieżka do zapisu
 SAVE_PATH = Path(__file__).parent.parent / "app" / "data" / "map_hydro.json"
+CATALOG_PATH = SAVE_PATH.parent / "hydro_catalog.json"
 
-def normalize(text):
-    if not text: return ""
-    text = text.lower()
-    text = "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
-    return text.strip()
+def parse_coordinate(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
 
 def main():
     print("Pobieranie stacji hydrologicznych z IMGW...")
@@ -23,6 +28,8 @@ def main():
         return
 
     hydro_map = {}
+    # Katalog: rzeka -> wszystkie jej wodowskazy (map_hydro trzyma dla rzeki tylko pierwszą stację)
+    rivers = {}
 
     print(f"Przetwarzanie {len(data)} stacji...")
 
@@ -32,8 +39,7 @@ def main():
         nazwa_stacji = normalize(station['stacja']) # np. annopol
         nazwa_rzeki = normalize(station['rzeka'])   # np. wisla
 
-        # Mapujemy RZEKĘ na ID stacji (uwaga: rzeka ma wiele stacji, nadpisujemy - to uproszczenie)
-        # Lepsza metoda: zapamiętać listę stacji dla rzeki, ale tutaj robimy prosto:
+        # Mapujemy RZEKĘ na ID stacji (pierwsza stacja; pełna lista jest w hydro_catalog.json)
         if nazwa_rzeki not in hydro_map:
             hydro_map[nazwa_rzeki] = stacja_id
 
@@ -43,6 +49,14 @@ def main():
         # Mapujemy "Rzeka Stacja" (np. "Wisła Annopol")
         hydro_map[f"{nazwa_rzeki} {nazwa_stacji}"] = stacja_id
 
+        river = rivers.setdefault(nazwa_rzeki, {"key": nazwa_rzeki, "name": station['rzeka'], "stations": []})
+        river["stations"].append({
+            "id": stacja_id,
+            "name": station['stacja'],
+            "lat": parse_coordinate(station.get('lat')),
+            "lon": parse_coordinate(station.get('lon')),
+        })
+
     # Zapis
     SAVE_PATH.parent.mkdir(parents=True, exist_ok=True)
     with open(SAVE_PATH, "w", encoding="utf-8") as f:
@@ -50,5 +64,15 @@ def main():
 
     print(f"Gotowe! Zapisano {len(hydro_map)} kluczy mapowania w {SAVE_PATH}")
 
+    # Kolejność wodowskazów ustala HydroCatalog przy ładowaniu; tu sortujemy dla czytelnego diffu
+    catalog = {"rivers": sorted(rivers.values(), key=lambda r: r["key"])}
+    for river in catalog["rivers"]: river["stations"].sort(key=lambda st: st["id"])
+    with open(CATALOG_PATH, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, indent=2, ensure_ascii=False)
+
+    located = sum(1 for r in rivers.values() for st in r["stations"] if st["lat"] is not None)
+    print(f"Zapisano katalog {len(rivers)} rzek w {CATALOG_PATH} ({located} wodowskazów ze współrzędnymi)")
+    if not located: print("UWAGA: feed IMGW nie zawiera współrzędnych - wyszukiwanie najbliższego wodowskazu nie zadziała.")
+
 if __name__ == "__main__":
     main()
@@ -1,18 +1,20 @@
 # scripts/create_station_map.py
 import httpx
 import json
-import unicodedata
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "app" / "data"
 
+sys.path.append(str(BASE_DIR))
+
+from app.core.text import normalize
+
 
 def normalize_text(text: str) -> str:
     if not isinstance(text, str): return ""
-    text = text.lower()
-    text = "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
-    return text.strip().replace("-", " ")  # Zamieniamy myślniki na spacje dla łatwiejszego porównania
+    return normalize(text)  # Ta sama normalizacja co w DataService
 
 
 def main():
@@ -35,7 +37,8 @@ def main():
         return
 
     with open(simc_path, "r", encoding="utf-8") as f:
-        simc_dict = json.load(f)
+        # Klucze przepuszczamy przez tę samą normalizację co backend (starsze pliki miały np. "ł")
+        simc_dict = {normalize_text(k): v for k, v in json.load(f).items()}
 
     # Odwracamy słownik SIMC, żeby szukać kodu po nazwie (nazwa -> id)
     # simc_dict jest teraz: { "warszawa": "0918123", ... }
@@ -48,7 +51,7 @@ def main():
     for station in stations:
         original_name = station['stacja']
         station_id = station['id_stacji']
-        norm_station = normalize_text(original_name)  # np. "poznan lawica"
+        norm_station = normalize_text(original_name)  # np. "poznan-lawica"
 
         # STRATEGIA 1: Dokładne dopasowanie
         # Sprawdzamy czy "poznan lawica" jest kluczem w SIMC (mało prawdopodobne)
@@ -56,8 +59,8 @@ def main():
 
         # STRATEGIA 2: Szukanie podciągów (Dla "Poznań-Ławica", "Wrocław-Strachowice")
         if not found_simc_id:
-            # Dzielimy nazwę stacji na słowa: ["poznan", "lawica"]
-            parts = norm_station.split()
+            # Dzielimy nazwę stacji na słowa: ["poznan", "lawica"] (myślnik traktujemy jak spację)
+            parts = norm_station.replace("-", " ").split()
             for part in parts:
                 # Jeśli człon nazwy (np. "poznan") jest w słowniku miast, bierzemy to!
                 # Warunek len(part) > 2 eliminuje krótkie śmieci
@@ -0,0 +1,174 @@
+# scripts/imgw_stub.py
+# Atrapa API IMGW dla benchmarków i testów obciążeniowych (bez sieci).
+#   build_fixture(service) - deterministyczne feedy SYNOP / hydro / ostrzeżeń dla stacji i powiatów
+#                            ze słowników DataService (wartości pseudolosowe, stałe między uruchomieniami),
+#   StubImgwClient         - ImgwApiClient, który zamiast HTTP odpowiada z fixture (cache, bezpiecznik
+#                            i liczniki klienta działają jak w produkcji),
+#   create_stub_app        - lokalny serwer HTTP udający danepubliczne.imgw.pl/api/data
+#                            z konfigurowalnym opóźnieniem i odsetkiem błędów.
+# Serwer: python scripts/imgw_stub.py --port 8765 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+#         (aplikacja: IMGW_BASE_URL=http://127.0.0.1:8765/api/data)
+import argparse
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from app.api.imgw_client import ImgwApiClient
+
+TRENDS = ("stała", "rosnąca", "malejąca")
+
+
+def _synop_record(station_id: str, name: str) -> dict:
+    rng = random.Random(f"synop-{station_id}")
+    return {
+        "id_stacji": station_id,
+        "stacja": name,
+        "data_pomiaru": "2026-10-17",
+        "godzina_pomiaru": "12",
+        "temperatura": f"{rng.uniform(-5, 25):.1f}",
+        "predkosc_wiatru": str(rng.randint(0, 15)),
+        "kierunek_wiatru": str(rng.randrange(0, 360, 10)),
+        "wilgotnosc_wzgledna": f"{rng.uniform(40, 100):.1f}",
+        "suma_opadu": f"{rng.choice((0, 0, 0, rng.uniform(0, 12))):.1f}",
+        "cisnienie": f"{rng.uniform(990, 1035):.1f}",
+    }
+
+
+def _hydro_record(station_id: str, name: str, river: str) -> dict:
+    rng = random.Random(f"hydro-{station_id}")
+    return {
+        "id_stacji": station_id,
+        "stacja": name,
+        "rzeka": river,
+        "stan_wody": str(rng.randint(50, 500)),
+        "stan_wody_data_pomiaru": "2026-10-17 11:00:00",
+        "przekroczenia": rng.choice(("0", "0", "0", "1", "2")),
+        "tendencja": rng.choice(TRENDS),
+    }
+
+
+def build_fixture(service) -> dict:
+    """{'synop': [...], 'hydro': [...], 'warnings': [...]} dla wszystkich stacji i co 7. powiatu."""
+    synop = [_synop_record(sid, meta.get('name', sid)) for sid, meta in sorted(service.station_coords.items())]
+    catalog = service.hydro_catalog
+    hydro = []
+    for sid in sorted(set(service.map_hydro.values())):
+        river_key = catalog.river_of(sid)
+        river = catalog.river_name(river_key) if river_key else None
+        hydro.append(_hydro_record(sid, catalog.station_name(sid) or sid, river or "Wisła"))
+    codes = sorted({code for code in service.terc_dict.values() if len(code) == 4})
+    warnings = [
+        {"id": str(i), "zjawisko": phenomenon, "stopien": str(level), "powiaty_kod": codes[i::7]}
+        for i, (phenomenon, level) in enumerate((("Silny wiatr", 1), ("Intensywne opady deszczu", 2), ("Burze", 1)))
+    ]
+    return {"synop": synop, "hydro": hydro, "warnings": warnings}
+
+
+class StubImgwClient(ImgwApiClient):
+    """ImgwApiClient odpowiadający z fixture; `requests` liczy "zapytania HTTP", które by poszły."""
+
+    def __init__(self, fixture: dict, **kwargs):
+        super().__init__(base_url="http://imgw-stub/api/data", **kwargs)
+        self.fixture = fixture
+        self.synop_by_id = {rec["id_stacji"]: rec for rec in fixture["synop"]}
+        self.hydro_by_id = {rec["id_stacji"]: rec for rec in fixture["hydro"]}
+        self.requests = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def _get(self, url: str, service_name: str):
+        self.requests += 1
+        path = url[len(self.base_url):].strip("/")
+        if path == "synop": return self.fixture["synop"]
+        if path == "hydro": return self.fixture["hydro"]
+        if path == "meteo/worn": return self.fixture["warnings"]
+        kind, _, station_id = path.partition("/id/")
+        if kind == "synop" and station_id in self.synop_by_id: return self.synop_by_id[station_id]
+        if kind == "hydro" and station_id in self.hydro_by_id: return [self.hydro_by_id[station_id]]
+        raise HTTPException(status_code=404, detail=f"Brak danych dla {service_name}.")
+
+
+def create_stub_app(fixture: dict, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                    seed: int | None = None) -> FastAPI:
+    """
+    Serwer z endpointami IMGW używanymi przez klienta. Każda odpowiedź czeka
+    latency_ms +/- jitter_ms, a z prawdopodobieństwem error_rate zwraca 503.
+    GET /stub/stats - liczniki zapytań i wstrzykniętych błędów.
+    """
+    stub = FastAPI(title="IMGW stub")
+    rng = random.Random(seed)
+    synop_by_id = {rec["id_stacji"]: rec for rec in fixture["synop"]}
+    hydro_by_id = {rec["id_stacji"]: rec for rec in fixture["hydro"]}
+    counters = {"requests": 0, "errors_injected": 0, "not_found": 0}
+
+    async def respond(payload):
+        counters["requests"] += 1
+        delay = max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000
+        if delay: await asyncio.sleep(delay)
+        if error_rate and rng.random() < error_rate:
+            counters["errors_injected"] += 1
+            return JSONResponse({"error": "stub: wstrzyknięty błąd"}, status_code=503)
+        if payload is None:
+            counters["not_found"] += 1
+            return JSONResponse({"status": False, "message": "Not found"}, status_code=404)
+        return payload
+
+    @stub.get("/api/data/synop")
+    async def synop_feed():
+        return await respond(fixture["synop"])
+
+    @stub.get("/api/data/synop/id/{station_id}")
+    async def synop_station(station_id: str):
+        return await respond(synop_by_id.get(station_id))
+
+    @stub.get("/api/data/hydro/")
+    async def hydro_feed():
+        return await respond(fixture["hydro"])
+
+    @stub.get("/api/data/hydro/id/{station_id}")
+    async def hydro_station(station_id: str):
+        record = hydro_by_id.get(station_id)
+        return await respond([record] if record else None)
+
+    @stub.get("/api/data/meteo/worn")
+    async def warnings():
+        return await respond(fixture["warnings"])
+
+    @stub.get("/stub/stats")
+    async def stats():
+        return counters
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokalna atrapa API IMGW.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    os.environ.setdefault("GEOCODER_FALLBACK", "0")
+    from app.services.data_service import DataService
+    fixture = build_fixture(DataService())
+    stub = create_stub_app(fixture, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"Atrapa IMGW: http://{args.host}:{args.port}/api/data ({len(fixture['synop'])} SYNOP, {len(fixture['hydro'])} hydro)")
+    uvicorn.run(stub, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# scripts/load_test.py
+# Test obciążeniowy end-to-end: aplikacja FastAPI (uvicorn, osobny proces) + lokalna atrapa IMGW
+# (scripts/imgw_stub.py, osobny proces) + generator wielu równoległych, wieloturowych rozmów na /chat.
+#   - rozmowy syntetyczne (szablony: pogoda / ostrzeżenia / hydro, z dopytywaniem o miejsce)
+#     albo odtwarzane z logu JSONL: {"session_id": "...", "message": "..."} w kolejności wiadomości,
+#   - --ramp 50,200,800: kolejne etapy z coraz większą liczbą równoległych sesji; zatrzymuje się na
+#     pierwszym etapie łamiącym SLO (--slo-p99-ms / --max-error-rate) i podaje punkt załamania,
+#   - raport: przepustowość, p50/p95/p99, kody odpowiedzi, lag pętli zdarzeń i RSS aplikacji
+#     (z /stats) oraz przyrost RSS na sesję.
+# Uruchomienie:
+#   python scripts/load_test.py --sessions 2000 --concurrency 500
+#   python scripts/load_test.py --ramp 100,400,1600 --imgw-latency-ms 80 --imgw-error-rate 0.02
+#   python scripts/load_test.py --replay scripts/corpus/conversations_sample.jsonl --sessions 1000
+#   python scripts/load_test.py --app-url http://127.0.0.1:8000 ...   (bez uruchamiania procesów)
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "app" / "data"
+
+
+def load_names() -> dict[str, list[str]]:
+    """Miasta (stacje SYNOP), powiaty i pary rzeka-wodowskaz do szablonów rozmów."""
+    def load(name):
+        path = DATA_DIR / name
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    cities = sorted({meta["name"] for meta in load("station_coords.json").values() if meta.get("name")})
+    powiaty = sorted(k for k in load("terc_dict.json") if k.startswith("powiat "))
+    gauges = sorted(k for k in load("map_hydro.json") if len(k.split()) == 2)
+    return {"city": cities or ["Kraków"], "powiat": powiaty or ["powiat krakowski"], "gauge": gauges or ["wisla krakow"]}
+
+
+TEMPLATES = (
+    lambda r, n: ["pogoda", r.choice(n["city"])],
+    lambda r, n: [f"pogoda {r.choice(n['city'])}"],
+    lambda r, n: [f"jaka jest pogoda w {r.choice(n['city'])}", f"pogoda {r.choice(n['city'])}"],
+    lambda r, n: ["ostrzeżenia", r.choice(n["powiat"])],
+    lambda r, n: [f"ostrzeżenia {r.choice(n['powiat'])}"],
+    lambda r, n: [f"stan wody {r.choice(n['gauge'])}"],
+    lambda r, n: ["cześć", f"pogoda {r.choice(n['city'])}", "dzięki"],
+)
+
+
+def synthetic_conversations(count: int, seed: int) -> list[list[str]]:
+    rng = random.Random(seed)
+    names = load_names()
+    return [rng.choice(TEMPLATES)(rng, names) for _ in range(count)]
+
+
+def replay_conversations(path: Path, count: int) -> list[list[str]]:
+    """Rozmowy z logu (kolejność wiadomości w sesji zachowana); powielane cyklicznie do `count`."""
+    sessions: dict[str, list[str]] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip(): continue
+        record = json.loads(line)
+        sessions.setdefault(str(record["session_id"]), []).append(record["message"])
+    recorded = list(sessions.values())
+    if not recorded: raise SystemExit(f"Pusty log: {path}")
+    return [recorded[i % len(recorded)] for i in range(count)]
+
+
+def percentile(sorted_values: list[float], p: float):
+    if not sorted_values: return None
+    return round(sorted_values[min(int(p * len(sorted_values)), len(sorted_values) - 1)] * 1000, 1)
+
+
+async def fetch_stats(client: httpx.AsyncClient) -> dict:
+    try:
+        return (await client.get("/stats", timeout=30)).json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+async def run_stage(client: httpx.AsyncClient, label: str, conversations: list[list[str]], concurrency: int,
+                    think_s: float, timeout: float) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    gate = asyncio.Semaphore(concurrency)
+
+    async def converse(i: int, messages: list[str]):
+        async with gate:
+            session_id = f"load-{label}-{i}"
+            for turn, message in enumerate(messages):
+                if turn and think_s: await asyncio.sleep(think_s)
+                started = time.perf_counter()
+                try:
+                    resp = await client.post("/chat", json={"message": message, "session_id": session_id}, timeout=timeout)
+                    key = str(resp.status_code)
+                except httpx.TimeoutException:
+                    key = "timeout"
+                except httpx.HTTPError as e:
+                    key = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[key] = statuses.get(key, 0) + 1
+
+    before = await fetch_stats(client)
+    started = time.perf_counter()
+    await asyncio.gather(*(converse(i, messages) for i, messages in enumerate(conversations)))
+    elapsed = time.perf_counter() - started
+    after = await fetch_stats(client)
+
+    latencies.sort()
+    requests = len(latencies)
+    failed = requests - statuses.get("200", 0)
+    loop = after.get("event_loop") or {}
+    rss_before = (before.get("event_loop") or {}).get("rss_mib")
+    rss_after = loop.get("rss_mib")
+    return {
+        "concurrency": concurrency,
+        "sessions": len(conversations),
+        "requests": requests,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99), "max": percentile(latencies, 1.0),
+            "mean": round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+        },
+        "statuses": statuses,
+        "error_rate": round(failed / requests, 4) if requests else 0.0,
+        "loop_lag_ms": loop.get("lag_ms"),
+        "rss_mib": rss_after,
+        "rss_kib_per_session": round((rss_after - rss_before) * 1024 / len(conversations), 2)
+        if rss_before is not None and rss_after is not None and conversations else None,
+        "app": {key: after.get(key) for key in ("sessions", "session_locks", "understanding", "serving", "imgw_client")},
+    }
+
+
+def print_stage(result: dict):
+    lat, lag = result["latency_ms"], result["loop_lag_ms"] or {}
+    print(
+        f"{result['concurrency']:>6} | {result['requests']:>7} | {result['throughput_rps']:>8} rps | "
+        f"{lat['p50']:>7} | {lat['p95']:>7} | {lat['p99']:>7} ms | "
+        f"błędy {result['error_rate']:>6.1%} | lag p99 {lag.get('p99')} / max {lag.get('max')} ms | "
+        f"RSS {result['rss_mib']} MiB ({result['rss_kib_per_session']} KiB/sesję)"
+    )
+    other = {k: v for k, v in result["statuses"].items() if k != "200"}
+    if other: print(f"{'':>6}   kody inne niż 200: {other}")
+
+
+def spawn(args_list: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args_list], cwd=BASE_DIR, env={**os.environ, **env})
+
+
+async def wait_ready(url: str, processes: list[subprocess.Popen], deadline_s: float = 120):
+    deadline = time.monotonic() + deadline_s
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if any(p.poll() is not None for p in processes): raise SystemExit("Proces atrapy / aplikacji zakończył się.")
+            try:
+                if (await client.get(url, timeout=2)).status_code == 200: return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.3)
+    raise SystemExit(f"Brak odpowiedzi: {url}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy /chat z atrapą IMGW.")
+    parser.add_argument("--sessions", type=int, default=1000, help="liczba rozmów na etap")
+    parser.add_argument("--concurrency", type=int, default=200, help="równoległe sesje (gdy brak --ramp)")
+    parser.add_argument("--ramp", default="", help="kolejne poziomy równoległości, np. 50,200,800")
+    parser.add_argument("--replay", type=Path, help="log JSONL rozmów do odtworzenia")
+    parser.add_argument("--think-ms", type=float, default=0, help="przerwa między wiadomościami w sesji")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--slo-p99-ms", type=float, default=2000)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-url", help="gotowa aplikacja (nie uruchamiamy aplikacji ani atrapy)")
+    parser.add_argument("--app-port", type=int, default=8400)
+    parser.add_argument("--stub-port", type=int, default=8765)
+    parser.add_argument("--imgw-latency-ms", type=float, default=50)
+    parser.add_argument("--imgw-jitter-ms", type=float, default=20)
+    parser.add_argument("--imgw-error-rate", type=float, default=0)
+    parser.add_argument("--json", type=Path, help="zapis wyników do pliku JSON")
+    args = parser.parse_args()
+
+    processes = []
+    base_url = args.app_url
+    try:
+        if not base_url:
+            stub_url = f"http://127.0.0.1:{args.stub_port}"
+            processes.append(spawn([
+                "scripts/imgw_stub.py", "--port", str(args.stub_port), "--latency-ms", str(args.imgw_latency_ms),
+                "--jitter-ms", str(args.imgw_jitter_ms), "--error-rate", str(args.imgw_error_rate), "--seed", str(args.seed),
+            ], {}))
+            await wait_ready(f"{stub_url}/stub/stats", processes)
+            base_url = f"http://127.0.0.1:{args.app_port}"
+            processes.append(spawn(
+                ["-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+                {"IMGW_BASE_URL": f"{stub_url}/api/data", "GEOCODER_FALLBACK": "0"},
+            ))
+        await wait_ready(f"{base_url}/ready", processes)
+
+        levels = [int(x) for x in args.ramp.split(",") if x.strip()] or [args.concurrency]
+        limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+        results = []
+        breaking_point = None
+        print(f"{'sesje':>6} | {'zapytań':>7} | {'przepust.':>12} | {'p50':>7} | {'p95':>7} | {'p99':>10} |")
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+            for stage, concurrency in enumerate(levels):
+                if args.replay: conversations = replay_conversations(args.replay, args.sessions)
+                else: conversations = synthetic_conversations(args.sessions, args.seed + stage)
+                result = await run_stage(client, str(stage), conversations, concurrency, args.think_ms / 1000, args.timeout)
+                results.append(result)
+                print_stage(result)
+                if result["latency_ms"]["p99"] > args.slo_p99_ms or result["error_rate"] > args.max_error_rate:
+                    breaking_point = concurrency
+                    break
+
+        if breaking_point is not None:
+            print(f"\nPunkt załamania: {breaking_point} równoległych sesji "
+                  f"(SLO: p99 <= {args.slo_p99_ms:.0f} ms, błędy <= {args.max_error_rate:.1%}).")
+        elif len(levels) > 1:
+            print(f"\nSLO dotrzymane do {levels[-1]} równoległych sesji.")
+        if args.json:
+            args.json.write_text(json.dumps({"stages": results, "breaking_point": breaking_point}, ensure_ascii=False, indent=2),
+                                 encoding="utf-8")
+            print(f"Zapisano: {args.json}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
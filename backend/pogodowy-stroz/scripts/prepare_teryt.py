@@ -1,10 +1,16 @@
 # scripts/prepare_teryt.py
 import pandas as pd
 import json
-import unicodedata
+import re
+import sys
 import os
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from app.core.text import normalize
+from app.services.gazetteer import write_gazetteer
+
 # Konfiguracja ścieżek
 BASE_DIR = Path(__file__).resolve().parent.parent
 RAW_DATA_DIR = BASE_DIR / "raw_data"
@@ -13,6 +19,13 @@ DATA_DIR = BASE_DIR / "app" / "data"
 # Nazwy plików wejściowych (pobrane ze strony GUS TERYT)
 TERC_FILENAME = "TERC.csv"  # Nazwa przykładowa, dostosuj do posiadanego pliku
 SIMC_FILENAME = "SIMC.csv"  # Nazwa przykładowa, dostosuj do posiadanego pliku
+# Współrzędne miejscowości z PRNG (GUGiK, "PRNG - miejscowości", CSV)
+COORDS_FILENAME = "PRNG_MIEJSCOWOSCI.csv"  # Nazwa przykładowa, dostosuj do posiadanego pliku
+COORDS_COLUMNS = {
+    "simc": "IDENTYFIKATOR_SIMC",
+    "lat": "SZEROKOSC_GEOGRAFICZNA",
+    "lon": "DLUGOSC_GEOGRAFICZNA",
+}
 
 
 def normalize_text(text: str) -> str:
@@ -20,13 +33,11 @@ def normalize_text(text: str) -> str:
     Normalizuje tekst: zamienia na małe litery, usuwa polskie znaki diakrytyczne.
     Np. "Gdańsk" -> "gdansk", "Łódź" -> "lodz".
     Jest to kluczowe dla dopasowywania zapytań użytkownika[cite: 65].
+    Ta sama funkcja (app.core.text.normalize) normalizuje zapytania w backendzie.
     """
     if not isinstance(text, str):
         return ""
-    text = text.lower()
-    # Dekompozycja znaków (np. ą = a + ogonek) i usunięcie znaków łączących (ogonek)
-    text = "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
-    return text.strip()
+    return normalize(text)
 
 
 def prepare_terc():
@@ -100,6 +111,56 @@ def prepare_simc():
     return simc_dict
 
 
+def parse_coordinate(value) -> float | None:
+    """
+    Zamienia współrzędną z PRNG na stopnie dziesiętne.
+    Obsługuje zapis dziesiętny ("52,2297") i stopnie-minuty-sekundy ("52°13'47\" N").
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip().replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = [float(p) for p in re.findall(r"\d+(?:\.\d+)?", value)]
+    if not parts:
+        return None
+    degrees = parts[0] + (parts[1] / 60 if len(parts) > 1 else 0) + (parts[2] / 3600 if len(parts) > 2 else 0)
+    return -degrees if value[-1:].upper() in ("S", "W") else degrees
+
+
+def prepare_gazetteer(simc_dict: dict) -> dict:
+    """
+    Łączy miejscowości SIMC ze współrzędnymi z PRNG (po identyfikatorze SIMC).
+    Wynik: znormalizowana nazwa -> (lat, lon), dla tych samych nazw co simc_dict.
+    """
+    print(f"Przetwarzanie {COORDS_FILENAME}...")
+    file_path = RAW_DATA_DIR / COORDS_FILENAME
+
+    if not file_path.exists():
+        print(f"BŁĄD: Nie znaleziono pliku {file_path}. Pobierz PRNG (miejscowości) z gugik.gov.pl.")
+        return {}
+
+    df = pd.read_csv(file_path, sep=';', dtype=str, encoding='utf-8')
+
+    coords_by_simc = {}
+    for _, row in df.iterrows():
+        simc_id = row.get(COORDS_COLUMNS["simc"])
+        lat = parse_coordinate(row.get(COORDS_COLUMNS["lat"]))
+        lon = parse_coordinate(row.get(COORDS_COLUMNS["lon"]))
+        if isinstance(simc_id, str) and lat is not None and lon is not None:
+            coords_by_simc[simc_id.strip().zfill(7)] = (lat, lon)
+
+    gazetteer = {}
+    for nazwa, sym in simc_dict.items():
+        coords = coords_by_simc.get(sym)
+        if coords:
+            gazetteer[nazwa] = coords
+
+    return gazetteer
+
+
 def main():
     # Upewnij się, że katalog wyjściowy istnieje
     DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -120,6 +181,14 @@ def main():
             json.dump(simc_data, f, ensure_ascii=False, indent=2)
         print(f"Zapisano {len(simc_data)} miejscowości do {out_path}[cite: 49].")
 
+    # 3. Gazetteer offline (nazwa -> współrzędne) dla DataService.find_nearest_station
+    if simc_data:
+        gazetteer = prepare_gazetteer(simc_data)
+        if gazetteer:
+            out_path = DATA_DIR / "gazetteer.bin"
+            write_gazetteer(out_path, gazetteer)
+            print(f"Zapisano {len(gazetteer)} miejscowości ze współrzędnymi do {out_path}.")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
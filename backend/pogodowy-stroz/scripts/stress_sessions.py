@@ -0,0 +1,89 @@
+# scripts/stress_sessions.py
+# Równoległe wiadomości w TEJ SAMEJ sesji: czy odpowiedzi się nie krzyżują i FSM nie rzuca błędów.
+#   - "bez blokady": process_message wołane współbieżnie na jednym ChatbotLogic (dawne zachowanie /chat),
+#   - "z blokadą": te same wiadomości przez endpoint /chat (SessionLocks: po kolei w sesji, 429 ponad limit).
+# IMGW nie jest potrzebne: fetch_data zastępujemy powolnym "echem" lokalizacji (bez sieci).
+# Uruchomienie: python scripts/stress_sessions.py [sesji] [wiadomości_na_sesję]
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("UNDERSTANDING_EXECUTOR", "inline")
+os.environ.setdefault("GEOCODER_FALLBACK", "0")
+
+import httpx
+from app.logic.conversation import GLOBAL_DATA_SERVICE, ChatbotLogic
+from app.main import app
+from app.services.state_manager import SESSION_LOCKS
+
+POWIATY = ["krakowski", "tatrzański", "gorlicki", "nowosądecki", "wadowicki", "myślenicki", "bocheński", "limanowski"]
+
+
+async def slow_echo(intent: str, location_id: str, location_name: str = "") -> str:
+    # Czas "odpowiedzi IMGW" - okno, w którym inne żądanie tej sesji może nadpisać stan
+    await asyncio.sleep(0.02)
+    return f"{intent}|{location_name}"
+
+
+def expected(message: str) -> str:
+    return message.split()[-1]
+
+
+def check(message: str, response: str) -> bool:
+    """Odpowiedź musi dotyczyć powiatu z TEJ wiadomości (normalizacja jak w DataService)."""
+    return response.startswith("ostrzeżenia|") and GLOBAL_DATA_SERVICE._normalize(expected(message)) in response
+
+
+async def without_lock(sessions: int, per_session: int) -> dict:
+    crossed = errors = 0
+    for s in range(sessions):
+        logic = ChatbotLogic(f"nolock-{s}")
+        messages = [f"ostrzeżenia powiat {POWIATY[i % len(POWIATY)]}" for i in range(per_session)]
+        results = await asyncio.gather(*(logic.process_message(m) for m in messages), return_exceptions=True)
+        for message, result in zip(messages, results):
+            if isinstance(result, BaseException): errors += 1
+            elif not check(message, result): crossed += 1
+    return {"crossed": crossed, "errors": errors}
+
+
+async def with_lock(sessions: int, per_session: int) -> dict:
+    crossed = errors = rejected = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        async def send(session_id: str, message: str):
+            return message, await client.post("/chat", json={"message": message, "session_id": session_id})
+
+        jobs = [
+            send(f"lock-{s}", f"ostrzeżenia powiat {POWIATY[i % len(POWIATY)]}")
+            for s in range(sessions) for i in range(per_session)
+        ]
+        t0 = time.perf_counter()
+        for message, resp in await asyncio.gather(*jobs):
+            if resp.status_code == 429: rejected += 1
+            elif resp.status_code != 200: errors += 1
+            elif not check(message, resp.json()["response"]): crossed += 1
+        elapsed = time.perf_counter() - t0
+    return {"crossed": crossed, "errors": errors, "rejected_429": rejected, "elapsed_s": round(elapsed, 2)}
+
+
+async def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    per_session = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    if not GLOBAL_DATA_SERVICE:
+        print("Brak DataService - nie da się uruchomić testu.")
+        sys.exit(1)
+    GLOBAL_DATA_SERVICE.fetch_data = slow_echo
+
+    print(f"{sessions} sesji x {per_session} równoległych wiadomości")
+    print("bez blokady:", await without_lock(sessions, per_session))
+    result = await with_lock(sessions, per_session)
+    print("z blokadą:  ", result, "| blokady:", SESSION_LOCKS.stats())
+    # Przy per_session <= SESSION_MAX_PENDING + 1 nic nie powinno zostać odrzucone
+    if result["crossed"] or result["errors"]: sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,32 +11,39 @@ from pathlib import Path
 # So I should probably import `app` directly by adding `pogodowy-stroz` to path.
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent))
 
-from app.logic.conversation import ChatbotLogic
+from app.logic.conversation import GLOBAL_DATA_SERVICE, ChatbotLogic
 
 async def main():
+    # --offline: odpowiedzi IMGW z atrapy (scripts/imgw_stub.py) zamiast z sieci
+    if "--offline" in sys.argv and GLOBAL_DATA_SERVICE:
+        from imgw_stub import StubImgwClient, build_fixture
+        client = StubImgwClient(build_fixture(GLOBAL_DATA_SERVICE))
+        GLOBAL_DATA_SERVICE.imgw_client = GLOBAL_DATA_SERVICE.snapshot.client = GLOBAL_DATA_SERVICE.warnings_index.client = client
+
     print("Initializing ChatbotLogic...")
     bot = ChatbotLogic("test_session")
 
     print("\n--- Test 1: Greeting ---")
-    response = await bot.handle_message("Cześć")
+    response = await bot.process_message("Cześć")
     print(f"User: Cześć\nBot: {response}")
 
     print("\n--- Test 2: Weather without location ---")
-    response = await bot.handle_message("Pogoda")
+    response = await bot.process_message("Pogoda")
     print(f"User: Pogoda\nBot: {response}")
 
     print("\n--- Test 3: Providing location for weather ---")
-    response = await bot.handle_message("Wrocław")
+    response = await bot.process_message("Wrocław")
     print(f"User: Wrocław\nBot: {response}")
 
     print("\n--- Test 4: Warnings with location ---")
-    response = await bot.handle_message("Ostrzeżenia Poznań")
+    response = await bot.process_message("Ostrzeżenia Poznań")
     print(f"User: Ostrzeżenia Poznań\nBot: {response}")
 
     print("\n--- Test 5: Hydro ---")
     # "Stan wody Wisła" -> "Wisła" is the river.
-    response = await bot.handle_message("Stan wody Wisła")
+    response = await bot.process_message("Stan wody Wisła")
     print(f"User: Stan wody Wisła\nBot: {response}")
 
 if __name__ == "__main__":
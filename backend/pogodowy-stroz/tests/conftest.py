@@ -0,0 +1,10 @@
+# tests/conftest.py
+# Uruchomienie (z backend/pogodowy-stroz): python -m pytest -q
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Testy nigdy nie pytają Nominatim
+os.environ.setdefault("GEOCODER_FALLBACK", "0")
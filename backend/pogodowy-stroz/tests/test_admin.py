@@ -0,0 +1,33 @@
+# tests/test_admin.py
+import asyncio
+
+import httpx
+import pytest
+
+from app import main
+
+
+def admin_get(headers: list) -> int:
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/admin/profile/slow", headers=headers)).status_code
+    return asyncio.run(scenario())
+
+
+def test_admin_endpoints_hidden_without_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+    assert admin_get([("X-Admin-Token", "cokolwiek")]) == 404
+
+
+@pytest.mark.parametrize("token", [None, b"zly", "łw".encode()])
+def test_wrong_admin_token_is_forbidden(monkeypatch, token):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    # Nagłówek spoza ASCII (bajty UTF-8) nie może skończyć się błędem 500
+    headers = [] if token is None else [(b"X-Admin-Token", token)]
+    assert admin_get(headers) == 403
+
+
+def test_correct_admin_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert admin_get([("X-Admin-Token", "s3cret")]) == 200
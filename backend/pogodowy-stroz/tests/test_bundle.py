@@ -0,0 +1,17 @@
+# tests/test_bundle.py
+from app.services.bundle import DataBundle, fingerprint, write_bundle
+
+
+def test_stale_bundle_is_closed(tmp_path, monkeypatch):
+    source = tmp_path / "terc.json"
+    source.write_text('{"krakow": "1261"}', encoding="utf-8")
+    path = tmp_path / "data_bundle.bin"
+    write_bundle(path, {"terc": {"krakow": "1261"}}, fingerprint([source]))
+    assert DataBundle.open_if_fresh(path, [source]).fuzzy_index("terc").mapping["krakow"] == "1261"
+
+    opened = []
+    init = DataBundle.__init__
+    monkeypatch.setattr(DataBundle, "__init__", lambda self, p: (init(self, p), opened.append(self))[0])
+    source.write_text('{"krakow": "1261", "tarnow": "1263"}', encoding="utf-8")
+    assert DataBundle.open_if_fresh(path, [source]) is None
+    assert len(opened) == 1 and opened[0]._mmap.closed
@@ -0,0 +1,107 @@
+# tests/test_cache.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.cache import AsyncTTLCache
+
+
+def fetcher(values: list, calls: list, delay: float = 0):
+    """Zwraca kolejne wartości z `values` (wyjątek - rzucany), licząc wywołania w `calls`."""
+    async def fetch():
+        calls.append(1)
+        if delay: await asyncio.sleep(delay)
+        value = values.pop(0)
+        if isinstance(value, BaseException): raise value
+        return value
+    return fetch
+
+
+def test_ttl_hit_then_expiry():
+    async def scenario():
+        cache, calls = AsyncTTLCache(), []
+        fetch = fetcher(["a", "b"], calls)
+        assert await cache.get_or_fetch("k", 0.05, fetch) == "a"
+        assert await cache.get_or_fetch("k", 0.05, fetch) == "a"
+        assert (cache.hits, cache.misses, len(calls)) == (1, 1, 1)
+        await asyncio.sleep(0.07)
+        assert await cache.get_or_fetch("k", 0.05, fetch) == "b"
+        assert cache.misses == 2
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_are_coalesced():
+    async def scenario():
+        cache, calls = AsyncTTLCache(), []
+        fetch = fetcher(["a"], calls, delay=0.02)
+        results = await asyncio.gather(*(cache.get_or_fetch("k", 10, fetch) for _ in range(5)))
+        assert results == ["a"] * 5
+        assert len(calls) == 1
+        assert (cache.misses, cache.coalesced) == (1, 4)
+    asyncio.run(scenario())
+
+
+def test_errors_are_not_cached():
+    async def scenario():
+        cache, calls = AsyncTTLCache(), []
+        fetch = fetcher([HTTPException(status_code=503), "a"], calls)
+        with pytest.raises(HTTPException):
+            await cache.get_or_fetch("k", 10, fetch)
+        assert await cache.get_or_fetch("k", 10, fetch) == "a"
+        assert len(calls) == 2
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_fetch():
+    async def scenario():
+        cache, calls = AsyncTTLCache(), []
+        fetch = fetcher(["a"], calls, delay=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cache.get_or_fetch("k", 10, fetch), 0.01)
+        assert await cache.get_or_fetch("k", 10, fetch) == "a"
+        assert len(calls) == 1
+    asyncio.run(scenario())
+
+
+def test_stale_if_error_serves_old_value():
+    async def scenario():
+        cache, calls = AsyncTTLCache(), []
+        unavailable = lambda e: isinstance(e, HTTPException) and e.status_code >= 500
+        fetch = fetcher(["a", HTTPException(status_code=503), HTTPException(status_code=404)], calls)
+        kwargs = {"stale_ttl": 10, "stale_wait": 1, "stale_if": unavailable}
+        assert await cache.get_or_fetch("k", 0.01, fetch, **kwargs) == "a"
+        await asyncio.sleep(0.02)
+        assert await cache.get_or_fetch("k", 0.01, fetch, **kwargs) == "a"
+        assert cache.stale_served == 1
+        # 404 to odpowiedź, nie awaria - stara wartość jej nie zasłania
+        with pytest.raises(HTTPException) as e:
+            await cache.get_or_fetch("k", 0.01, fetch, **kwargs)
+        assert e.value.status_code == 404
+    asyncio.run(scenario())
+
+
+def test_stale_served_while_slow_refresh_completes_in_background():
+    async def scenario():
+        cache, calls = AsyncTTLCache(), []
+        fetch = fetcher(["a", "b"], calls, delay=0.05)
+        assert await cache.get_or_fetch("k", 0.01, fetch) == "a"
+        await asyncio.sleep(0.02)
+        assert await cache.get_or_fetch("k", 10, fetch, stale_ttl=10, stale_wait=0.01) == "a"
+        await asyncio.sleep(0.08)
+        assert await cache.get_or_fetch("k", 10, fetch) == "b"
+        assert cache.hits == 1
+    asyncio.run(scenario())
+
+
+def test_lru_eviction():
+    async def scenario():
+        cache = AsyncTTLCache(maxsize=2)
+        async def value(key): return await cache.get_or_fetch(key, 10, lambda: asyncio.sleep(0, result=key))
+        await value("a")
+        await value("b")
+        await value("a")  # "a" świeżo użyte - wypada "b"
+        await value("c")
+        assert cache.evictions == 1
+        assert list(cache._entries) == ["a", "c"]
+    asyncio.run(scenario())
@@ -0,0 +1,64 @@
+# tests/test_data_service.py
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.api.imgw_client import CircuitBreaker, ImgwApiClient
+from app.services import data_service
+from app.services.data_service import DataService
+
+
+@pytest.fixture(scope="module")
+def service():
+    return DataService()
+
+
+def hydro_client(feed: list, delay: float) -> ImgwApiClient:
+    async def handler(request: httpx.Request):
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json=feed)
+    client = ImgwApiClient(base_url="http://imgw.test/api/data")
+    client.async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_river_summary_timeout_does_not_cancel_half_open_trial(service, monkeypatch):
+    monkeypatch.setattr(data_service, "LIVE_FETCH_TIMEOUT", 0.05)
+    river = service.hydro_catalog.river_keys[0]
+    sid, name = service.hydro_catalog.gauges(river)[0]
+    feed = [{"id_stacji": sid, "stacja": name, "rzeka": river, "stan_wody": "123", "przekroczenia": "0"}]
+
+    async def scenario():
+        client = service.imgw_client = hydro_client(feed, delay=0.15)
+        client.breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+        client.breaker.record_failure()
+        await asyncio.sleep(0.02)
+        assert client.breaker.state == "half_open"
+        with pytest.raises(asyncio.TimeoutError):
+            await service._river_summary(river)
+        # Zapytanie próbne kończy się w tle i zamyka bezpiecznik; wynik zostaje w cache
+        await asyncio.sleep(0.2)
+        assert client.breaker.state == "closed"
+        assert "123 cm" in await service._river_summary(river)
+    asyncio.run(scenario())
+
+
+def test_station_missing_from_fresh_snapshot_falls_back_to_live_fetch(service):
+    live = {"id_stacji": "99999", "stacja": "Nowa", "temperatura": "7.5"}
+    calls = []
+
+    async def fetch_one(station_id):
+        calls.append(station_id)
+        return [live]
+
+    async def scenario():
+        service.snapshot.tables['synop'].clear()
+        service.snapshot.updated_at['synop'] = time.monotonic()
+        data, age = await service._station_data('synop', 'pogoda', "99999", fetch_one)
+        assert calls == ["99999"] and data == [live] and age is None
+        # Rekord zapamiętany w migawce - kolejne pytanie nie idzie do IMGW
+        assert (await service._station_data('synop', 'pogoda', "99999", fetch_one))[0] == live
+        assert calls == ["99999"]
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+# tests/test_gazetteer.py
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import build_data_bundle
+import prepare_teryt
+from app.services.gazetteer import Gazetteer
+
+
+def test_build_gazetteer_from_simc_and_prng(tmp_path, monkeypatch):
+    (tmp_path / "simc_dict.json").write_text(json.dumps({"skrzynice": "0123456", "bez wspolrzednych": "0999999"}))
+    (tmp_path / prepare_teryt.COORDS_FILENAME).write_text(
+        "IDENTYFIKATOR_SIMC;SZEROKOSC_GEOGRAFICZNA;DLUGOSC_GEOGRAFICZNA\n0123456;51,1;22,6\n", encoding="utf-8"
+    )
+    out = tmp_path / "gazetteer.bin"
+    monkeypatch.setattr(build_data_bundle, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(build_data_bundle, "GAZETTEER_PATH", out)
+    monkeypatch.setattr(prepare_teryt, "RAW_DATA_DIR", tmp_path)
+
+    build_data_bundle.build_gazetteer()
+    gazetteer = Gazetteer.load(out)
+    assert len(gazetteer) == 1
+    lat, lon = gazetteer.lookup("skrzynice")
+    assert abs(lat - 51.1) < 1e-4 and abs(lon - 22.6) < 1e-4
+    assert gazetteer.lookup("bez wspolrzednych") is None
+
+
+def test_missing_prng_leaves_no_gazetteer(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(build_data_bundle, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(build_data_bundle, "GAZETTEER_PATH", tmp_path / "gazetteer.bin")
+    monkeypatch.setattr(prepare_teryt, "RAW_DATA_DIR", tmp_path)
+    build_data_bundle.build_gazetteer()
+    assert not (tmp_path / "gazetteer.bin").exists()
+    assert "UWAGA" in capsys.readouterr().out
@@ -0,0 +1,72 @@
+# tests/test_geocoder.py
+# Bez sieci: zapytanie do Nominatim (_geocode_blocking) jest podmienione.
+import asyncio
+import threading
+import time
+
+from app.services import geocoder
+from app.services.geocoder import CachedGeocoder
+
+
+def make_geocoder(path, answers: dict, calls: list, **kwargs) -> CachedGeocoder:
+    gc = CachedGeocoder(path, **kwargs)
+
+    def lookup(query):
+        calls.append(query)
+        return answers.get(query)
+    gc._geocode_blocking = lookup
+    return gc
+
+
+def test_unwritable_cache_path_falls_back_to_memory(tmp_path):
+    async def scenario():
+        calls = []
+        gc = make_geocoder(tmp_path / "brak" / "katalogu" / "cache.sqlite", {"Kraków": (50.06, 19.94)}, calls)
+        assert await gc.geocode("krakow", "Kraków") == (50.06, 19.94)
+        gc._memo.clear()
+        assert await gc.geocode("krakow", "Kraków") == (50.06, 19.94)
+        assert len(calls) == 1 and gc.stats["db_hits"] == 1
+        gc.close()
+    asyncio.run(scenario())
+
+
+def test_memo_is_bounded_lru(tmp_path):
+    gc = CachedGeocoder(tmp_path / "cache.sqlite", memo_size=2)
+    now = time.time()
+    for key in ("a", "b", "c"): gc._remember(key, (1.0, 2.0), now)
+    assert list(gc._memo) == ["b", "c"]
+    gc.close()
+
+
+def test_negative_results_expire(tmp_path, monkeypatch):
+    monkeypatch.setattr(geocoder, "NEGATIVE_TTL", 0.05)
+
+    async def scenario():
+        calls, answers = [], {}
+        gc = make_geocoder(tmp_path / "cache.sqlite", answers, calls)
+        assert await gc.geocode("nowe", "Nowe Miejsce") is None
+        assert await gc.geocode("nowe", "Nowe Miejsce") is None
+        assert len(calls) == 1
+        await asyncio.sleep(0.06)
+        answers["Nowe Miejsce"] = (52.0, 21.0)
+        gc._next_slot = 0.0
+        assert await gc.geocode("nowe", "Nowe Miejsce") == (52.0, 21.0)
+        assert len(calls) == 2
+        gc.close()
+    asyncio.run(scenario())
+
+
+def test_slow_nominatim_does_not_block_cache_hits(tmp_path):
+    async def scenario():
+        release = threading.Event()
+        gc = CachedGeocoder(tmp_path / "cache.sqlite", max_workers=1)
+        gc._geocode_blocking = lambda query: release.wait(5) and (50.0, 20.0)
+        gc._db_put("krakow", (50.06, 19.94))
+        slow = asyncio.create_task(gc.geocode("wolne", "Wolne"))
+        await asyncio.sleep(0.05)
+        # Jedyny wątek sieciowy czeka na Nominatim, a trafienie w SQLite wraca od razu
+        assert await asyncio.wait_for(gc.geocode("krakow", "Kraków"), 0.5) == (50.06, 19.94)
+        release.set()
+        assert await slow == (50.0, 20.0)
+        gc.close()
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+# tests/test_hydro_catalog.py
+import json
+
+import pytest
+
+from app.services import data_service
+from app.services.data_service import DataService
+from app.services.hydro_catalog import HydroCatalog
+
+RIVERS = [{"key": "wisla", "name": "Wisła", "stations": [
+    {"id": "1", "name": "Kraków-Bielany", "lat": 50.04, "lon": 19.84},
+    {"id": "2", "name": "Sandomierz", "lat": 50.68, "lon": 21.75},
+    {"id": "3", "name": "Bez współrzędnych"},
+]}]
+
+
+def test_nearest_gauge_uses_catalog_coordinates():
+    catalog = HydroCatalog(RIVERS)
+    assert catalog.located() == 2
+    gauge_id, name, km = catalog.nearest_gauge("wisla", 50.06, 19.94)  # Kraków
+    assert (gauge_id, name) == ("1", "Kraków-Bielany") and km < 10
+    assert catalog.nearest_gauge("odra", 50.06, 19.94) is None
+
+
+def test_catalog_rebuilt_from_hydro_map_has_no_coordinates():
+    catalog = HydroCatalog.from_hydro_map({"wisla": "1", "krakow": "1", "wisla krakow": "1"})
+    assert catalog.gauges("wisla") == [("1", "Krakow")]
+    assert catalog.located() == 0 and catalog.nearest_gauge("wisla", 50.0, 20.0) is None
+
+
+def test_nearest_stations_hydro_uses_located_gauges(tmp_path, monkeypatch):
+    path = tmp_path / "hydro_catalog.json"
+    path.write_text(json.dumps({"rivers": RIVERS}), encoding="utf-8")
+    monkeypatch.setattr(data_service, "HYDRO_CATALOG_PATH", path)
+    service = DataService()
+    assert [sid for sid, _, _ in service.nearest_stations(50.06, 19.94, k=5, kind="hydro")] == ["1", "2"]
+    assert [sid for sid, _, _ in service.stations_within(50.06, 19.94, 50, kind="hydro")] == ["1"]
+    # Domyślnie stacje SYNOP - wodowskazy się w nich nie mieszają
+    assert not {"1", "2"} & {sid for sid, _, _ in service.nearest_stations(50.06, 19.94, k=5)}
+    with pytest.raises(ValueError):
+        service.nearest_stations(50.06, 19.94, kind="meteo")
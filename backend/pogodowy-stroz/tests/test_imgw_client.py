@@ -0,0 +1,129 @@
+# tests/test_imgw_client.py
+# Klient IMGW na atrapie transportu httpx (bez sieci): cache, ponowienia, bezpiecznik.
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api import imgw_client
+from app.api.imgw_client import CircuitBreaker, ImgwApiClient
+
+
+def make_client(handler, **kwargs) -> ImgwApiClient:
+    client = ImgwApiClient(base_url="http://imgw.test/api/data", **kwargs)
+    client.async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def responder(statuses: list, calls: list, delay: float = 0):
+    """Kolejne kody odpowiedzi z `statuses` (ostatni się powtarza); 200 -> [{"id_stacji": ...}]."""
+    async def handler(request: httpx.Request):
+        calls.append(request.url.path)
+        if delay: await asyncio.sleep(delay)
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        return httpx.Response(status, json=[{"id_stacji": "1"}] if status == 200 else {"error": status})
+    return handler
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(imgw_client, "RETRY_BASE_DELAY", 0.001)
+
+
+def test_breaker_opens_after_threshold_and_closes_after_successful_trial():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # tylko jedno zapytanie próbne naraz
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_breaker_reopens_after_failed_trial():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.opened == 2
+
+
+def test_retries_then_succeeds_and_caches():
+    async def scenario():
+        calls = []
+        client = make_client(responder([503, 200], calls))
+        assert await client.get_synop_data("1") == [{"id_stacji": "1"}]
+        assert await client.get_synop_data("1") == [{"id_stacji": "1"}]
+        assert len(calls) == 2
+        assert client.counters["retries"] == 1
+        assert client.cache_stats()["hits"] == 1
+    asyncio.run(scenario())
+
+
+def test_404_is_not_retried_and_does_not_trip_breaker():
+    async def scenario():
+        calls = []
+        client = make_client(responder([404], calls))
+        client.breaker = CircuitBreaker(threshold=1)
+        with pytest.raises(HTTPException) as e:
+            await client.get_hydro_data("x")
+        assert e.value.status_code == 404
+        assert len(calls) == 1 and client.breaker.state == "closed"
+    asyncio.run(scenario())
+
+
+def test_open_breaker_short_circuits_and_stale_value_is_served():
+    async def scenario():
+        calls = []
+        client = make_client(responder([200, 503], calls), ttl={"synop": 0.01})
+        client.breaker = CircuitBreaker(threshold=1, cooldown=60)
+        assert await client.get_synop_data("1") == [{"id_stacji": "1"}]
+        await asyncio.sleep(0.02)
+        # IMGW zwraca 503 (bezpiecznik się otwiera) - dostajemy starą odpowiedź z cache
+        assert await client.get_synop_data("1") == [{"id_stacji": "1"}]
+        assert client.breaker.state == "open"
+        requests = len(calls)
+        with pytest.raises(HTTPException) as e:
+            await client.get_synop_feed()
+        assert e.value.status_code == 503
+        assert len(calls) == requests and client.counters["short_circuited"] == 1
+    asyncio.run(scenario())
+
+
+def test_cancelled_half_open_trial_releases_breaker():
+    async def scenario():
+        calls = []
+        client = make_client(responder([200], calls, delay=0.5))
+        client.breaker = CircuitBreaker(threshold=1, cooldown=0.01)
+        client.breaker.record_failure()
+        await asyncio.sleep(0.02)
+        assert client.breaker.state == "half_open"
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get_hydro_feed(), 0.05)
+        # Anulowana próba nie blokuje kolejnych: następne zapytanie znów może być próbą
+        assert not client.breaker.trial_in_flight
+        assert client.breaker.allow()
+    asyncio.run(scenario())
+
+
+def test_request_budget_bounds_a_running_attempt(monkeypatch):
+    monkeypatch.setattr(imgw_client, "REQUEST_BUDGET", 0.1)
+
+    async def scenario():
+        calls = []
+        client = make_client(responder([200], calls, delay=5))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with pytest.raises(HTTPException) as e:
+            await client.get_synop_feed()
+        assert e.value.status_code == 503
+        assert loop.time() - started < 0.5
+        assert client.in_flight == 0
+    asyncio.run(scenario())
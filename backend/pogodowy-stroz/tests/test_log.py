@@ -0,0 +1,21 @@
+# tests/test_log.py
+import json
+import logging
+import queue
+
+from app.core.log import DeferredQueueHandler, JsonFormatter
+
+
+def test_exception_stays_structured_through_the_queue():
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger("pogodowy-test.queue")
+    logger.propagate = False
+    logger.addHandler(DeferredQueueHandler(log_queue))
+    try:
+        raise ValueError("zły stan")
+    except ValueError:
+        logger.error("boom", exc_info=True, extra={"fields": {"station": "12566"}})
+    payload = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+    assert payload["event"] == "boom"
+    assert payload["station"] == "12566"
+    assert "ValueError: zły stan" in payload["exc"]
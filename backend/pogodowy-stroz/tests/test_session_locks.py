@@ -0,0 +1,92 @@
+# tests/test_session_locks.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app import main
+from app.logic.conversation import ChatbotLogic
+from app.services.state_manager import SessionLocks
+
+
+def test_messages_of_one_session_are_serialized_in_arrival_order():
+    async def scenario():
+        locks = SessionLocks(max_pending=10, timeout=5)
+        active, order = [], []
+
+        async def handle(i: int):
+            async with locks.hold("s"):
+                active.append(i)
+                assert len(active) == 1
+                await asyncio.sleep(0.005)
+                order.append(i)
+                active.remove(i)
+
+        await asyncio.gather(*(handle(i) for i in range(6)))
+        assert order == list(range(6))
+        assert locks.waited == 5 and locks.stats()["active"] == 0
+    asyncio.run(scenario())
+
+
+def test_other_sessions_are_not_blocked():
+    async def scenario():
+        locks = SessionLocks()
+        async with locks.hold("a"):
+            await asyncio.wait_for(_enter(locks, "b"), 0.1)
+    asyncio.run(scenario())
+
+
+async def _enter(locks: SessionLocks, session_id: str):
+    async with locks.hold(session_id): pass
+
+
+def test_overflow_and_wait_timeout_are_rejected_with_429():
+    async def scenario():
+        locks = SessionLocks(max_pending=1, timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold_until_released():
+            async with locks.hold("s"): await release.wait()
+
+        holder = asyncio.create_task(hold_until_released())
+        waiter = asyncio.create_task(_enter(locks, "s"))
+        await asyncio.sleep(0)
+        # Trzymający + jeden czekający = pełna kolejka
+        with pytest.raises(HTTPException) as e:
+            await _enter(locks, "s")
+        assert e.value.status_code == 429 and locks.rejected == 1
+        # Czekający nie doczekał się w timeout sekund
+        with pytest.raises(HTTPException) as e:
+            await waiter
+        assert e.value.status_code == 429 and locks.timeouts == 1
+        release.set()
+        await holder
+        assert locks.stats()["active"] == 0
+    asyncio.run(scenario())
+
+
+def test_chat_endpoint_serializes_a_session_and_returns_429_on_overflow(monkeypatch):
+    monkeypatch.setattr(main, "SESSION_LOCKS", SessionLocks(max_pending=2, timeout=5))
+    active, peak = [0], [0]
+
+    async def slow_process(self, text: str) -> str:
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.05)
+        active[0] -= 1
+        return text
+    monkeypatch.setattr(ChatbotLogic, "process_message", slow_process)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(
+                client.post("/chat", json={"message": f"m{i}", "session_id": "jedna"}) for i in range(6)
+            ))
+        return [r.status_code for r in responses]
+
+    statuses = asyncio.run(scenario())
+    assert peak[0] == 1
+    # Przechodzi trzymający + max_pending czekających, reszta dostaje 429
+    assert statuses.count(200) == 3 and statuses.count(429) == 3
@@ -0,0 +1,43 @@
+# tests/test_session_store.py
+import asyncio
+
+import pytest
+
+from app.services.state_manager import MemorySessionStore, SnapshotSessionStore, SqliteSessionStore
+
+
+def test_snapshot_store_is_abstract():
+    with pytest.raises(TypeError):
+        SnapshotSessionStore()
+
+
+def test_workers_saving_the_same_session_do_not_keep_stale_objects(tmp_path):
+    async def scenario():
+        # Dwa "workery" na wspólnym pliku SQLite
+        a = SqliteSessionStore(tmp_path / "sessions.sqlite")
+        b = SqliteSessionStore(tmp_path / "sessions.sqlite")
+        logic = await a.get("s")
+        await a.save(logic)
+        # Oba mają lokalnie tę samą wersję i oba zapisują kolejną
+        logic_a, logic_b = await a.get("s"), await b.get("s")
+        logic_a.last_city_context = "kraków"
+        await a.save(logic_a)
+        logic_b.last_city_context = "gdańsk"
+        await b.save(logic_b)
+        # Ostatni zapis wygrał - worker A musi to zobaczyć zamiast własnego obiektu
+        assert (await a.get("s")).last_city_context == "gdańsk"
+        assert (await b.get("s")) is logic_b
+        await a.close()
+        await b.close()
+    asyncio.run(scenario())
+
+
+def test_memory_store_sweeps_expired_sessions_on_save():
+    async def scenario():
+        store = MemorySessionStore(max_size=100, ttl=0.05)
+        for i in range(10): await store.get(f"old-{i}")
+        await asyncio.sleep(0.07)
+        await store.save(await store.get("new"))
+        assert store.stats()["size"] == 1
+        assert store.expired == 10
+    asyncio.run(scenario())
@@ -0,0 +1,28 @@
+# tests/test_snapshot.py
+import asyncio
+
+from app.services.snapshot import StationSnapshot
+
+
+class FeedClient:
+    def __init__(self, synop, hydro):
+        self.synop, self.hydro = synop, hydro
+
+    async def get_synop_feed(self): return self.synop
+    async def get_hydro_feed(self): return self.hydro
+
+
+def test_bad_payload_keeps_previous_feed_and_refreshes_the_other():
+    async def scenario():
+        client = FeedClient([{"id_stacji": "1", "temperatura": "5"}], [{"id_stacji": "9", "stan_wody": "100"}])
+        snapshot = StationSnapshot(client)
+        await snapshot.refresh()
+        synop_at = snapshot.updated_at["synop"]
+
+        client.synop = {"status": "error", "message": "Przekroczony limit"}
+        client.hydro = [{"id_stacji": "9", "stan_wody": "120"}, "śmieci"]
+        await snapshot.refresh()
+        assert snapshot.get("synop", "1") == {"id_stacji": "1", "temperatura": "5"}
+        assert snapshot.updated_at["synop"] == synop_at
+        assert snapshot.get("hydro", "9")["stan_wody"] == "120"
+    asyncio.run(scenario())
@@ -0,0 +1,30 @@
+# tests/test_understanding.py
+from app.logic import understanding
+from app.logic.understanding import UnderstandingStage, understand
+from app.services.data_service import DataService
+
+
+def test_worker_without_data_reports_unavailable(monkeypatch):
+    monkeypatch.setattr(understanding, "_worker_data_service", lambda: None)
+    result = understand("pogoda w Krakowie", "pogoda", None, need_intent=False)
+    assert result.location is None and result.data_unavailable
+
+
+def test_reload_recycles_process_pool():
+    stage = UnderstandingStage(mode="process", workers=1)
+    stage.start()  # procesy startują dopiero przy pierwszym zadaniu
+    old = stage._executor
+    service = DataService()
+    service.on_reload(stage.recycle)
+    service.reload_data()
+    assert stage._executor is not None and stage._executor is not old and stage.recycled == 1
+    stage.shutdown()
+
+
+def test_thread_pool_shares_parent_data():
+    stage = UnderstandingStage(mode="thread", workers=1)
+    stage.start()
+    old = stage._executor
+    stage.recycle()
+    assert stage._executor is old and stage.recycled == 0
+    stage.shutdown()